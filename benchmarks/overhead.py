@@ -0,0 +1,373 @@
+#!/usr/bin/env python
+"""
+Measures the overhead of pyspecs itself (stepping into and out of steps,
+creating them, asserting, reporting and finding spec files) on synthetic
+suites: deep nesting, wide fan-out, heavy output and trees of many spec
+files. Results are written as JSON, which later runs can be compared with.
+
+    $ python benchmarks/overhead.py --output before.json
+    $ python benchmarks/overhead.py --compare before.json
+
+Every benchmark runs once to warm up and then `--repeat` times; the best
+round counts. `--scale` multiplies the size of every synthetic suite, and
+only results of the same scale are compared.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyspecs  # noqa
+from pyspecs._discovery import SpecFinder  # noqa
+from pyspecs._fixtures import FixtureStats  # noqa
+from pyspecs._registry import Registry  # noqa
+from pyspecs._reporting import ConsoleReporter  # noqa
+from pyspecs._runner import _StepRunner  # noqa
+from pyspecs.framework import given, when, then, the  # noqa
+
+try:
+    from time import perf_counter as clock
+except ImportError:
+    clock = time.time
+
+FORMAT = 1
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(function):
+    """
+    Registers `function(scale)`, which prepares a round and returns the
+    number of operations it performs and a function performing them.
+    """
+    BENCHMARKS[function.__name__] = function
+    return function
+
+
+@benchmark
+def wide_fan_out(scale):
+    thens = 20000 * scale
+
+    def run():
+        Registry().reset(retain=False)
+        with given.a_scenario:
+            with when.it_fans_out:
+                for _ in range(thens):
+                    with then.an_outcome_holds:
+                        pass
+    return thens + 2, run
+
+
+@benchmark
+def deep_nesting(scale):
+    depth, scenarios = 100, 200 * scale
+
+    def nest(level):
+        with then.a_nested_step:
+            if level:
+                nest(level - 1)
+
+    def run():
+        Registry().reset(retain=False)
+        for _ in range(scenarios):
+            with given.a_deep_scenario:
+                nest(depth - 1)
+    return scenarios * (depth + 1), run
+
+
+@benchmark
+def retained_scenarios(scale):
+    scenarios = 5000 * scale
+
+    def run():
+        Registry().reset()
+        for _ in range(scenarios):
+            with given.a_retained_scenario:
+                with when.it_is_exercised:
+                    with then.it_holds:
+                        pass
+                    with then.it_holds_too:
+                        pass
+    return scenarios * 4, run
+
+
+@benchmark
+def step_factory_getattr(scale):
+    lookups = 100000 * scale
+
+    def run():
+        for _ in range(lookups):
+            given.a_step_created_by_name
+    return lookups, run
+
+
+@benchmark
+def should_passing(scale):
+    assertions = 25000 * scale
+    values = [1, 2, 3]
+
+    def run():
+        for _ in range(assertions // 5):
+            the(1).should.equal(1)
+            the(values).should.contain(2)
+            the(3).should.be_greater_than(2)
+            the(None).should.be(None)
+            the(values).should_not.be_empty()
+    return assertions // 5 * 5, run
+
+
+@benchmark
+def should_failing(scale):
+    assertions = 10000 * scale
+    values = list(range(10))
+
+    def run():
+        for _ in range(assertions):
+            try:
+                the(values).should.equal([])
+            except AssertionError:
+                pass
+    return assertions, run
+
+
+@benchmark
+def heavy_output(scale):
+    lines = 50000 * scale
+    line = 'a line of output from a step that prints a lot\n'
+
+    def run():
+        Registry().reset(retain=False)
+        with given.a_chatty_scenario:
+            for number in range(lines // 100):
+                with then.it_prints:
+                    for _ in range(100):
+                        sys.stdout.write(line)
+    return lines // 100 * 100, run
+
+
+@benchmark
+def console_events(scale):
+    scenarios = 2000 * scale
+
+    def run():
+        reporter = ConsoleReporter(out=io.StringIO())
+        Registry().reset(retain=False).subscribe(reporter)
+        _failing_suite(scenarios)
+    return scenarios * 3, run
+
+
+@benchmark
+def console_render(scale):
+    scenarios = 2000 * scale
+    runner = _ReportedRunner()
+
+    def run():
+        reporter = ConsoleReporter(out=io.StringIO())
+        registry = Registry().reset(retain=False).subscribe(reporter)
+        _failing_suite(scenarios)
+        registry.listeners.remove(reporter)
+        start = clock()
+        reporter.render(runner)
+        return clock() - start
+    return scenarios, run
+
+
+@benchmark
+def discovery_cold(scale):
+    return _discovery(scale, cached=False)
+
+
+@benchmark
+def discovery_warm(scale):
+    return _discovery(scale, cached=True)
+
+
+@benchmark
+def many_files(scale):
+    tree = _SpecTree(files=200 * scale, scenarios=5)
+    runner = _StepRunner()
+
+    def run():
+        Registry().reset(retain=False)
+        runner.load_steps(tree.root)
+    run.cleanup = tree.remove
+    return tree.files, run
+
+
+def _failing_suite(scenarios):
+    for number in range(scenarios):
+        with given.a_reported_scenario:
+            with when.it_is_exercised:
+                print('some output')
+                if number % 10 == 0:
+                    the(number).should.equal(-1)
+
+
+class _ReportedRunner(object):
+    """
+    Just what ConsoleReporter.render asks of a step runner.
+    """
+    deselected = 0
+    profiler = None
+    fixtures = FixtureStats()
+
+    class cache(object):
+        enabled = False
+
+
+def _discovery(scale, cached):
+    tree = _SpecTree(files=2000 * scale, scenarios=0)
+    finder = SpecFinder(cached=cached)
+    if cached:
+        # a fresh tree is too recent for the index to trust
+        tree.backdate(finder.RACY + 1)
+        finder.find([tree.root])
+
+    def run():
+        finder.find([tree.root])
+    run.cleanup = tree.remove
+    return tree.files, run
+
+
+class _SpecTree(object):
+    """
+    A temporary tree of spec files, 20 to a directory and four directories
+    deep, next to as many files that are not specs.
+    """
+    def __init__(self, files, scenarios):
+        self.root = tempfile.mkdtemp(prefix='pyspecs-benchmark-')
+        self.files = files
+        spec = ''.join(
+            'with given.scenario_{0}:\n'
+            '    with then.it_holds:\n'
+            '        the({0}).should.equal({0})\n'.format(number)
+            for number in range(scenarios))
+        for number in range(files):
+            directory = os.path.join(
+                self.root, *['d{0}'.format(number // 20 // 10 ** level % 10)
+                             for level in range(4)])
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            name = os.path.join(directory, 'spec{0}'.format(number))
+            with open(name + '.pyspecs', 'w') as stream:
+                stream.write(spec)
+            with open(name + '.txt', 'w') as stream:
+                stream.write('not a spec')
+
+    def backdate(self, seconds):
+        then = time.time() - seconds
+        for directory, _, _ in os.walk(self.root):
+            os.utime(directory, (then, then))
+
+    def remove(self):
+        shutil.rmtree(self.root)
+
+
+def measure(name, scale, repeat):
+    operations, run = BENCHMARKS[name](scale)
+    rounds = []
+    try:
+        for _ in range(repeat + 1):
+            start = clock()
+            measured = run()
+            rounds.append(measured if measured is not None
+                          else clock() - start)
+    finally:
+        Registry().reset()
+        getattr(run, 'cleanup', lambda: None)()
+    rounds = sorted(rounds[1:])
+    return OrderedDict([
+        ('operations', operations),
+        ('best', rounds[0]),
+        ('median', rounds[len(rounds) // 2]),
+        ('ns_per_operation', rounds[0] / operations * 1e9),
+    ])
+
+
+def run_all(names, scale, repeat, out):
+    results = OrderedDict([
+        ('format', FORMAT),
+        ('pyspecs', pyspecs.__version__),
+        ('python', '{0} {1}'.format(platform.python_implementation(),
+                                    platform.python_version())),
+        ('platform', platform.platform()),
+        ('created', time.strftime('%Y-%m-%dT%H:%M:%S')),
+        ('scale', scale),
+        ('repeat', repeat),
+        ('benchmarks', OrderedDict()),
+    ])
+    for name in names:
+        result = measure(name, scale, repeat)
+        results['benchmarks'][name] = result
+        out.write('{0:24} {1:12.1f} ns/op {2:10} ops {3:9.4f}s best\n'
+                  .format(name, result['ns_per_operation'],
+                          result['operations'], result['best']))
+    return results
+
+
+def compare(baseline, results, tolerance, out):
+    """
+    Prints how every benchmark fared against the `baseline` results and
+    returns the names of those that got slower by more than `tolerance`.
+    """
+    if baseline.get('scale') != results['scale']:
+        out.write('not comparing results of scale {0} with scale {1}\n'
+                  .format(baseline.get('scale'), results['scale']))
+        return []
+    slower = []
+    out.write('\nagainst {0} ({1}):\n'.format(
+        baseline.get('created'), baseline.get('python')))
+    for name, result in results['benchmarks'].items():
+        before = baseline['benchmarks'].get(name)
+        if before is None:
+            continue
+        ratio = result['ns_per_operation'] / before['ns_per_operation']
+        regressed = ratio > 1 + tolerance
+        if regressed:
+            slower.append(name)
+        out.write('{0:24} {1:12.1f} -> {2:12.1f} ns/op {3:7.2f}x{4}\n'.format(
+            name, before['ns_per_operation'], result['ns_per_operation'],
+            ratio, '  SLOWER' if regressed else ''))
+    return slower
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('names', nargs='*', metavar='benchmark',
+                        help='benchmarks to run (default: all of {0})'
+                             .format(', '.join(BENCHMARKS)))
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', metavar='PATH',
+                        help='write the results as JSON to PATH')
+    parser.add_argument('--compare', metavar='PATH',
+                        help='compare with the JSON results at PATH, exiting '
+                             'with 1 if any benchmark got slower')
+    parser.add_argument('--tolerance', type=float, default=.2,
+                        help='how much slower (as a fraction) a benchmark '
+                             'may get before it counts as slower')
+    args = parser.parse_args()
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error('unknown benchmarks: {0}'.format(', '.join(unknown)))
+    results = run_all(args.names or list(BENCHMARKS), args.scale,
+                      args.repeat, sys.stderr)
+    if args.output:
+        with open(args.output, 'w') as stream:
+            json.dump(results, stream, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    if args.compare:
+        with open(args.compare) as stream:
+            slower = compare(json.load(stream), results, args.tolerance,
+                             sys.stderr)
+        sys.exit(1 if slower else 0)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+"""
+Measures how many bytes each retained Step costs, by running a synthetic
+suite of `--steps` steps (scenarios of one given, one when and several
+thens, nearly all passing and silent) and tracing the allocations that
+survive the run.
+
+    $ python benchmarks/step_memory.py --steps 100000
+"""
+
+import os
+import sys
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyspecs._registry import Registry  # noqa
+from pyspecs.framework import given, when, then  # noqa
+
+
+THENS_PER_SCENARIO = 8
+STEPS_PER_SCENARIO = THENS_PER_SCENARIO + 2
+
+
+def synthetic_suite(scenarios):
+    for number in range(scenarios):
+        with given.a_generated_scenario:
+            with when.it_is_exercised:
+                for then_number in range(THENS_PER_SCENARIO):
+                    with then('outcome %d holds' % then_number):
+                        if number % 1000 == 0 and then_number == 0:
+                            raise AssertionError('an occasional failure')
+
+
+def measure(steps):
+    registry = Registry().reset()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    synthetic_suite(steps // STEPS_PER_SCENARIO)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return registry.total_steps, retained
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--steps', type=int, default=100000)
+    args = parser.parse_args()
+
+    total, retained = measure(args.steps)
+    print('{0} steps retained {1} bytes: {2:.1f} bytes per step'.format(
+        total, retained, float(retained) / total))
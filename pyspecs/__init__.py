@@ -15,4 +15,5 @@ from .framework import (  # noqa
     it,
     this,
     that,
+    fixture,
 )
@@ -0,0 +1,289 @@
+"""
+Tolerant comparisons of numbers and of whole numeric sequences, registered
+on _Should through `should_expectation`:
+
+    the(0.1 + 0.2).should.be_close_to(0.3)
+    the(outputs).should.be_close_to(expected, rel=1e-3, abs=1e-9)
+    the(probabilities).should.each_be_between(0, 1)
+
+NumPy arrays are compared with vectorized NumPy operations. Other sequences
+and buffers (lists, array.array, memoryview) are compared by mapping C
+functions over them into a bytearray of flags, so that no Python code runs,
+and nothing is kept, per element; only the mismatches are looked at again.
+"""
+import sys
+import math
+import operator
+from array import array
+from functools import partial
+from itertools import repeat
+
+from ._should import should_expectation
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+if sys.version < '3':
+    from itertools import imap as map  # stops with the shortest iterable
+    number_types = (int, long, float)  # noqa
+else:
+    number_types = (int, float)
+
+REL = 1e-6
+ABS = 1e-12
+
+
+@should_expectation
+def be_close_to(self, expected, rel=REL, abs=ABS):
+    """
+    Expects the value to differ from `expected` by at most `rel` times the
+    larger of their magnitudes, or by `abs` (whichever is more), as
+    math.isclose has it. Sequences are compared item by item, with each
+    other or with a single `expected` number.
+    """
+    mismatches = compare_close(self._value, expected, rel, abs)
+    self._assert(
+        action=lambda: not mismatches.count,
+        report=lambda: (self._expect + BE_CLOSE_TO).format(
+            self._shown(self._value), self._shown(expected), rel, abs) +
+        mismatches.describe(self.limits.items)
+    )
+
+
+@should_expectation
+def each_be_between(self, first, last):
+    """
+    Expects every item of the value to be between `first` and `last`
+    (exclusive, like `be_between`).
+    """
+    mismatches = compare_between(self._value, first, last)
+    self._assert(
+        action=lambda: not mismatches.count,
+        report=lambda: (self._expect + EACH_BETWEEN).format(
+            self._shown(self._value), first, last) +
+        mismatches.describe(self.limits.items)
+    )
+
+
+def compare_close(actual, expected, rel=REL, abs=ABS):
+    if _is_number(actual) and _is_number(expected):
+        close = _isclose(actual, expected, rel_tol=rel, abs_tol=abs)
+        return Mismatches(None, [] if close else [None], None)
+    if _is_array(actual) or _is_array(expected):
+        return _numpy_close(actual, expected, rel, abs)
+    if _is_number(actual):
+        return _Lengths(None, len(_items(expected)))
+
+    actual = _items(actual)
+    if _is_number(expected):
+        expected_items = repeat(expected)
+    else:
+        expected = expected_items = _items(expected)
+        if len(actual) != len(expected):
+            return _Lengths(len(actual), len(expected))
+    flags = bytearray(map(partial(_isclose, rel_tol=rel, abs_tol=abs),
+                          actual, expected_items))
+
+    def detail(index):
+        wanted = expected if _is_number(expected) else expected[index]
+        return actual[index], wanted, _excess(actual[index], wanted, rel, abs)
+    return Mismatches.of_flags(flags, detail)
+
+
+def compare_between(actual, first, last):
+    if _is_array(actual):
+        return _numpy_between(actual, first, last)
+    actual = _items(actual)
+    flags = bytearray(map(operator.and_,
+                          map(operator.lt, repeat(first), actual),
+                          map(operator.lt, actual, repeat(last))))
+
+    def detail(index):
+        return actual[index], None, _outside(actual[index], first, last)
+    return Mismatches.of_flags(flags, detail)
+
+
+class Mismatches(object):
+    """
+    The items of `total` that a comparison failed for, by `indices`, and
+    `detail(index)`: the (actual, expected, excess) of one of them, where
+    excess is how far beyond the tolerance it is. The worst of them is the
+    one with the largest excess (NaN counting as infinitely far). A
+    `total` of None stands for two numbers compared.
+    """
+    def __init__(self, total, indices, detail, count=None, worst=None,
+                 position=None):
+        self.total = total
+        self.indices = indices
+        self.detail = detail
+        self.count = len(indices) if count is None else count
+        self.position = position or (lambda index: index)
+        self._worst = worst
+
+    @classmethod
+    def of_flags(cls, flags, detail):
+        """
+        From the 1 (passed) or 0 (failed) of every item.
+        """
+        count = len(flags) - flags.count(b'\x01')
+        return cls(len(flags), _FailedIndices(flags), detail, count=count)
+
+    @property
+    def worst(self):
+        if self._worst is None:
+            self._worst = max(self.indices, key=lambda index: _ordered(
+                self.detail(index)[2]))
+        return self._worst
+
+    def describe(self, shown):
+        if not self.count or self.total is None:
+            return ''
+        actual, expected, excess = self.detail(self.worst)
+        first = [self._position(index)
+                 for index in _first(self.indices, shown)]
+        return MISMATCHES.format(
+            self.count, self.total, self._position(self.worst),
+            actual if expected is None
+            else '{0} instead of {1}'.format(actual, expected),
+            excess, ', '.join(first) + (', ...' if self.count > shown
+                                        else ''))
+
+    def _position(self, index):
+        return str(self.position(index))
+
+
+class _Lengths(object):
+    """
+    Sequences (or arrays) of different lengths (shapes) compared, or (with
+    an `actual` of None) a number compared with a sequence.
+    """
+    count = 1
+
+    def __init__(self, actual, expected):
+        self.actual = actual
+        self.expected = expected
+
+    def describe(self, shown):
+        if self.actual is None:
+            return NUMBER_LENGTH.format(self.expected)
+        return LENGTHS.format(self.actual, self.expected)
+
+
+class _FailedIndices(object):
+    """
+    The indices of the 0 flags, found as they are iterated.
+    """
+    def __init__(self, flags):
+        self.flags = flags
+
+    def __iter__(self):
+        index = self.flags.find(b'\x00')
+        while index != -1:
+            yield index
+            index = self.flags.find(b'\x00', index + 1)
+
+
+def _numpy_close(actual, expected, rel, abs):
+    actual, expected = numpy.asarray(actual), numpy.asarray(expected)
+    if expected.ndim and actual.shape != expected.shape:
+        return _Lengths(actual.shape, expected.shape)
+    actual, expected = numpy.broadcast_arrays(actual, expected)
+    with numpy.errstate(invalid='ignore', over='ignore'):
+        difference = numpy.abs(actual - expected)
+        tolerance = numpy.maximum(
+            rel * numpy.maximum(numpy.abs(actual), numpy.abs(expected)), abs)
+        failed = ~((actual == expected) | (difference <= tolerance))
+        return _numpy_mismatches(actual, expected, failed,
+                                 difference - tolerance)
+
+
+def _numpy_between(actual, first, last):
+    actual = numpy.asarray(actual)
+    with numpy.errstate(invalid='ignore'):
+        failed = ~((first < actual) & (actual < last))
+        return _numpy_mismatches(actual, None, failed, numpy.maximum(
+            first - actual, actual - last))
+
+
+def _numpy_mismatches(actual, expected, failed, excess):
+    indices = numpy.flatnonzero(failed)
+    if not indices.size:
+        return Mismatches(actual.size, indices, None)
+    excesses = excess.ravel()[indices]
+    excesses = numpy.where(numpy.isnan(excesses), numpy.inf, excesses)
+    worst = indices[numpy.argmax(excesses)]
+
+    def position(index):
+        position = numpy.unravel_index(index, actual.shape)
+        return tuple(int(part) for part in position) \
+            if actual.ndim > 1 else int(index)
+
+    def detail(index):
+        position = numpy.unravel_index(index, actual.shape)
+        return (actual[position],
+                None if expected is None else expected[position],
+                excess[position])
+    return Mismatches(actual.size, indices, detail, worst=worst,
+                      position=position)
+
+
+def _items(values):
+    """
+    `values` as a sequence of numbers that can be indexed.
+    """
+    if isinstance(values, memoryview):
+        if not hasattr(values, 'cast'):  # Python 2
+            return values.tolist()
+        if values.ndim != 1:
+            values = values.cast('B').cast(values.format)
+        return values
+    if isinstance(values, (list, tuple, array)):
+        return values
+    return list(values)
+
+
+def _is_number(value):
+    return isinstance(value, number_types) and not isinstance(value, bool)
+
+
+def _is_array(value):
+    return numpy is not None and isinstance(value, numpy.ndarray)
+
+
+if hasattr(math, 'isclose'):
+    _isclose = math.isclose
+else:
+    def _isclose(a, b, rel_tol=REL, abs_tol=ABS):
+        return a == b or _excess(a, b, rel_tol, abs_tol) <= 0
+
+
+def _excess(actual, expected, rel, abs_):
+    return abs(actual - expected) - max(
+        rel * max(abs(actual), abs(expected)), abs_)
+
+
+def _outside(value, first, last):
+    return max(first - value, value - last)
+
+
+def _ordered(excess):
+    return float('inf') if excess != excess else excess
+
+
+def _first(indices, count):
+    first = []
+    for index in indices:
+        if len(first) == count:
+            break
+        first.append(index)
+    return first
+
+
+BE_CLOSE_TO = "to be close to '{1}' (rel={2}, abs={3})."
+EACH_BETWEEN = "to have each item between '{1}' and '{2}'."
+MISMATCHES = "\n{0} of {1} items are not: the worst at [{2}] ({3}, off " + \
+             "by {4:.4g}), the first at [{5}]."
+LENGTHS = "\nThe lengths differ: {0} instead of {1}."
+NUMBER_LENGTH = "\nThe lengths differ: a single number instead of {0}."
@@ -0,0 +1,169 @@
+import ast
+import sys
+
+if sys.version < '3':
+    import __builtin__ as builtins
+else:
+    import builtins
+
+EXPLAIN = '__pyspecs_explain__'
+NamedExpr = getattr(ast, 'NamedExpr', None)
+MAX_REPR = 240
+
+
+def rewrite_asserts(tree, source):
+    """
+    Rewrites the `assert` statements of a spec module so that a failing
+    one explains itself, listing the values of its sub-expressions (see
+    `explain`), as pytest does. The values of calls, attributes,
+    subscripts and operations are kept in temporaries as the test is
+    evaluated, with assignment expressions, so nothing is evaluated twice
+    and short-circuiting is left alone; names and constants are looked up
+    only once the assertion failed. Passing assertions cost no more than a
+    store per kept value. Lambdas and comprehensions are left as they are.
+
+    Needs assignment expressions (Python 3.8); other versions, and
+    optimized runs (-O, which strip asserts), keep plain asserts.
+    """
+    if NamedExpr is None or sys.flags.optimize:
+        return tree
+    if isinstance(source, bytes):
+        source = source.decode('utf-8', 'replace')
+    _AssertRewriter(source).visit(tree)
+    return tree
+
+
+def explain(test, message, entries, local, module):
+    """
+    The message of a failed assertion on `test` (its source): `message`,
+    if the assert had one, then every (source, name) of `entries` with the
+    value `name` had in the `local` or `module` namespace, if it was
+    evaluated at all.
+    """
+    lines = []
+    if message is not None:
+        lines.append(str(message))
+    lines.append('assert {0}'.format(test))
+    shown = set()
+    for text, name in entries:
+        if text in shown:
+            continue
+        for namespace in (local, module, vars(builtins)):
+            if name in namespace:
+                lines.append('  {0} = {1}'.format(
+                    text, _repr(namespace[name])))
+                shown.add(text)
+                break
+    return '\n'.join(lines)
+
+
+def _repr(value):
+    try:
+        text = repr(value)
+    except Exception as e:
+        return '<repr failed: {0!r}>'.format(e)
+    if len(text) > MAX_REPR:
+        text = text[:MAX_REPR // 2] + '...' + text[-MAX_REPR // 2:]
+    return text
+
+
+class _AssertRewriter(ast.NodeTransformer):
+    KEPT = (ast.Call, ast.Attribute, ast.Subscript, ast.BinOp, ast.UnaryOp,
+            getattr(ast, 'Await', ast.Call))
+    OPAQUE = (ast.Lambda, ast.ListComp, ast.SetComp, ast.DictComp,
+              ast.GeneratorExp)
+
+    def __init__(self, source):
+        self.source = source
+        self.temporaries = 0
+
+    def visit_Assert(self, node):
+        entries = []
+        test = self._keep(node.test, entries)
+        explained = ast.Call(
+            func=ast.Name(id=EXPLAIN, ctx=ast.Load()),
+            args=[ast.Constant(value=self._text(node.test)),
+                  node.msg or ast.Constant(value=None),
+                  ast.Tuple(elts=[
+                      ast.Tuple(elts=[ast.Constant(value=text),
+                                      ast.Constant(value=name)],
+                                ctx=ast.Load())
+                      for text, name in entries], ctx=ast.Load()),
+                  _call('locals'), _call('globals')],
+            keywords=[])
+        failure = ast.Raise(
+            exc=ast.Call(func=ast.Name(id='AssertionError', ctx=ast.Load()),
+                         args=[explained], keywords=[]),
+            cause=None)
+        # the rest is located by ast.fix_missing_locations
+        return ast.copy_location(ast.If(
+            test=ast.UnaryOp(op=ast.Not(), operand=test),
+            body=[failure], orelse=[]), node)
+
+    def _keep(self, node, entries):
+        """
+        `node` with the values of its sub-expressions kept in temporaries,
+        added to `entries` in the order they are listed in.
+        """
+        if isinstance(node, self.OPAQUE):
+            return node
+        if isinstance(node, ast.Name):
+            entries.append((node.id, node.id))
+            return node
+        if isinstance(node, ast.Compare):
+            node.left = self._keep(node.left, entries)
+            node.comparators = [self._keep(comparator, entries)
+                                for comparator in node.comparators]
+            return node
+        if isinstance(node, ast.BoolOp):
+            node.values = [self._keep(value, entries)
+                           for value in node.values]
+            return node
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            node.operand = self._keep(node.operand, entries)
+            return node
+        if not isinstance(node, self.KEPT):
+            return node
+
+        text = self._text(node)
+        children = []
+        self._keep_children(node, children)
+        self.temporaries += 1
+        name = '@pyspecs_{0}'.format(self.temporaries)
+        entries.append((text, name))
+        entries.extend(children)
+        kept = NamedExpr(target=ast.Name(id=name, ctx=ast.Store()),
+                         value=node)
+        ast.copy_location(kept, node)
+        ast.copy_location(kept.target, node)
+        return kept
+
+    def _keep_children(self, node, children):
+        if isinstance(node, ast.Call):
+            node.args = [arg if isinstance(arg, ast.Starred)
+                         else self._keep(arg, children) for arg in node.args]
+            for keyword in node.keywords:
+                keyword.value = self._keep(keyword.value, children)
+        elif isinstance(node, (ast.Attribute, ast.Subscript)):
+            node.value = self._keep(node.value, children)
+        elif isinstance(node, ast.BinOp):
+            node.left = self._keep(node.left, children)
+            node.right = self._keep(node.right, children)
+        elif isinstance(node, ast.UnaryOp):
+            node.operand = self._keep(node.operand, children)
+        elif isinstance(node.value, self.KEPT):
+            # the awaitable itself is of no interest
+            self._keep_children(node.value, children)
+        else:
+            node.value = self._keep(node.value, children)
+
+    def _text(self, node):
+        text = ast.get_source_segment(self.source, node)
+        if text is None and hasattr(ast, 'unparse'):
+            text = ast.unparse(node)
+        return ' '.join((text or '?').split())
+
+
+def _call(name):
+    return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=[],
+                    keywords=[])
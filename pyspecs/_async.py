@@ -0,0 +1,201 @@
+import ast
+import logging
+from collections import deque
+
+from ._budget import Watchdog
+from ._capture import OutputCapture
+from ._context import copy_context
+from ._registry import Registry
+
+log = logging.getLogger(__name__)
+
+SCENARIOS = '__pyspecs_scenarios__'
+RUN = '__pyspecs_run__'
+FLAGS = getattr(ast, 'PyCF_ALLOW_TOP_LEVEL_AWAIT', 0)
+CO_COROUTINE = 0x0080
+
+
+def is_async(source):
+    return bool(FLAGS) and (b'async' in source or b'await' in source)
+
+
+def hoist_scenarios(tree):
+    """
+    Prepares the tree of a spec module that uses `async with` (or `await`)
+    at the top level to be compiled (with FLAGS) into a module coroutine.
+    Each run of consecutive top-level `async with` statements becomes a
+    batch of scenarios: every statement turns into an `async def` of its
+    own (declaring the names it binds global, as they would be at module
+    level) and the batch is awaited through RUN, which may run its
+    scenarios concurrently.
+    """
+    body = []
+    for node in tree.body:
+        if isinstance(node, ast.AsyncWith):
+            if body and getattr(body[-1], _BATCH, False):
+                body.pop()
+            body.extend(_scenario(node))
+        else:
+            body.append(node)
+    tree.body = body
+    return tree
+
+
+_BATCH = '_pyspecs_batch'
+
+
+def _scenario(node):
+    function, register, run = ast.parse(
+        'async def __pyspecs_scenario__():\n'
+        '    pass\n'
+        '{0}.append(__pyspecs_scenario__)\n'
+        'await {1}({0})\n'.format(SCENARIOS, RUN)).body
+    names = sorted(_bound_names(node))
+    function.body = [ast.Global(names=names)] if names else []
+    function.body.append(node)
+    for created in [function, function.args] + function.body[:-1] + \
+            list(ast.walk(register)) + list(ast.walk(run)):
+        ast.copy_location(created, node)
+    setattr(run, _BATCH, True)
+    return function, register, run
+
+
+def _bound_names(node):
+    finder = _BoundNames()
+    finder.visit(node)
+    return finder.names
+
+
+class _BoundNames(ast.NodeVisitor):
+    """
+    Collects the names a statement binds in its own scope, without looking
+    into the nested scopes of functions, classes and comprehensions.
+    """
+    def __init__(self):
+        self.names = set()
+
+    def visit_Name(self, node):
+        if not isinstance(node.ctx, ast.Load):
+            self.names.add(node.id)
+
+    def visit_alias(self, node):
+        name = node.asname or node.name.split('.')[0]
+        if name != '*':
+            self.names.add(name)
+
+    def visit_ExceptHandler(self, node):
+        if node.name:
+            self.names.add(node.name)
+        self.generic_visit(node)
+
+    def _define(self, node):
+        self.names.add(node.name)
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_ClassDef = _define
+
+    def _skip(self, node):
+        pass
+
+    visit_Lambda = visit_ListComp = visit_SetComp = visit_DictComp = \
+        visit_GeneratorExp = _skip
+
+
+def new_event_loop():
+    import asyncio
+    return asyncio.new_event_loop()
+
+
+class ScenarioBatch(object):
+    """
+    Runs the scenarios of one batch on the event loop, as tasks; `done` is
+    a future that completes once all of them have finished. One at a time,
+    the scenarios record straight into the current Registry. Otherwise up
+    to `concurrency` of them run at once, each in a context with a Registry
+    state (and so an output capture) of its own, and their steps are
+    replayed into the current Registry in definition order as soon as they
+    and all scenarios before them are done.
+    """
+    def __init__(self, loop, scenarios, concurrency=1,
+                 capture_limit=OutputCapture.LIMIT):
+        if concurrency > 1 and copy_context is None:
+            log.warning('Running async scenarios one at a time: contextvars '
+                        'is not available')
+            concurrency = 1
+        self.loop = loop
+        self.concurrency = concurrency
+        self.capture_limit = capture_limit
+        self.done = loop.create_future()
+        self._waiting = deque(scenarios)
+        self._started = deque()
+        self._running = set()
+        self._start_more()
+
+    def _start_more(self):
+        while self._waiting and len(self._running) < self.concurrency:
+            scenario = self._waiting.popleft()
+            if self.concurrency == 1:
+                context, task = None, self.loop.create_task(scenario())
+            else:
+                context = copy_context()
+                task = context.run(self._start_isolated, scenario)
+            task.add_done_callback(self._finished)
+            self._started.append((context, task))
+            self._running.add(task)
+        if not self._running and not self.done.done():
+            self.done.set_result(None)
+
+    def _start_isolated(self, scenario):
+        registry = Registry()
+        selector = registry.selector
+        # the watchdog has to see steps as they run, not as they are replayed
+        watchdogs = [listener for listener in registry.listeners
+                     if isinstance(listener, Watchdog)]
+        registry.reset(capture_limit=self.capture_limit,
+                       close=False).select(selector)
+        for watchdog in watchdogs:
+            registry.subscribe(watchdog)
+        return self.loop.create_task(scenario())
+
+    def _finished(self, task):
+        self._running.discard(task)
+        if self.done.done():
+            return
+        while self._started and self._started[0][1].done():
+            context, task = self._started.popleft()
+            if task.cancelled() or task.exception() is not None:
+                self._fail(task)
+                return
+            if context is not None:
+                for step in context.run(_root_steps):
+                    Registry().replay(step)
+                Registry().deselect(context.run(_deselected))
+        self._start_more()
+
+    def _fail(self, task):
+        for running in self._running:
+            running.cancel()
+        if task.cancelled():
+            self.done.cancel()
+        else:
+            self.done.set_exception(task.exception())
+
+
+def scenario_runner(loop, concurrency=1, capture_limit=OutputCapture.LIMIT):
+    """
+    The RUN function of a spec module: awaiting `run(scenarios)` runs (and
+    empties) the list of scenarios collected so far.
+    """
+    def run(scenarios):
+        batch = ScenarioBatch(loop, list(scenarios), concurrency,
+                              capture_limit)
+        del scenarios[:]
+        return batch.done
+    return run
+
+
+def _root_steps():
+    return Registry().root_steps
+
+
+def _deselected():
+    return Registry().deselected
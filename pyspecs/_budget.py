@@ -0,0 +1,295 @@
+import sys
+import time
+import signal
+import logging
+import threading
+import weakref
+
+from ._reporting import Reporter
+
+log = logging.getLogger(__name__)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class StepTimeout(Exception):
+    """
+    Raised into a step whose time budget, or that of one of its ancestors
+    (`owner`), ran out; its traceback is where the step was stuck. Steps
+    record it as a TIMEOUT and pass it on until it reaches its owner, so
+    the rest of the scenario carries on. An `owner` of None stands for the
+    run, or for the limits of a spec file, and ends the file. `recorded`
+    tells whether any step recorded it at all.
+    """
+    def __init__(self, message, owner=None):
+        super(StepTimeout, self).__init__(message)
+        self.owner = owner
+        self.recorded = False
+
+
+class Watchdog(Reporter):
+    """
+    Enforces wall-clock budgets while steps run: every step may take
+    `step` seconds at most, or the budget given to it with `Step.within`,
+    and the run has to be over by `deadline` (a time.time()). Once the
+    budget of a step runs out, StepTimeout is raised wherever the step is
+    stuck; `async with` steps get their task cancelled instead, which they
+    turn into the StepTimeout. Running out of the whole run's budget also
+    stops the run.
+
+    Budgets are enforced with SIGALRM, so only in the main thread of a
+    process (serial runs and worker processes). The signal is held off
+    while the framework itself is recording a step, and steps replayed
+    from workers are left alone. Given a `cpu` limit in seconds, the
+    process (a worker) also gets a StepTimeout once the spec file it
+    runs used that much CPU time.
+
+    The steps open in every task (concurrent async scenarios each run in a
+    task, and subscribe the watchdog in their own Registry context) are
+    tracked separately, and the budget running out first is armed.
+    """
+    RETRY = .01
+
+    def __init__(self, step=None, deadline=None, cpu=None):
+        self.step = step
+        self.deadline = deadline
+        self.cpu = cpu
+        self.started = False
+        self._open = {}
+        self._handlers = {}
+
+    @classmethod
+    def available(cls):
+        return hasattr(signal, 'setitimer') and isinstance(
+            threading.current_thread(), threading._MainThread)
+
+    def start(self):
+        if not self.available():
+            log.warning('Time budgets are only enforced in the main thread '
+                        'on platforms with SIGALRM')
+            return self
+        self._handlers[signal.SIGALRM] = signal.signal(
+            signal.SIGALRM, self._expired)
+        if self.cpu and hasattr(signal, 'SIGXCPU'):
+            self._handlers[signal.SIGXCPU] = signal.signal(
+                signal.SIGXCPU, self._exhausted)
+        self.started = True
+        self._arm()
+        return self
+
+    def stop(self):
+        if not self.started:
+            return
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        for signum, handler in self._handlers.items():
+            signal.signal(signum, handler)
+        self._handlers.clear()
+        self._open.clear()
+        self.started = False
+
+    def step_entered(self, step):
+        if not self.started or step.start is not None:
+            return
+        now = time.time()
+        task = _current_task()
+        stack = self._open.setdefault(task, [])
+        if stack:
+            deadline, owner = stack[-1][1:3]
+        else:
+            deadline, owner = self.deadline, None
+        own = None
+        if step.budget is not None:
+            if deadline is None or now + step.budget < deadline:
+                deadline, owner = now + step.budget, step
+        elif self.step is not None:
+            own = now + self.step
+        stack.append([own, deadline, owner, step, task, now])
+        self._arm()
+
+    def step_exited(self, step):
+        task = _current_task()
+        stack = self._open.get(task)
+        if stack and stack[-1][3] is step:
+            entered = stack.pop()[5]
+            if stack and stack[-1][0] is not None:
+                # the default budget only counts the time of a step itself
+                stack[-1][0] += time.time() - entered
+            if not stack:
+                del self._open[task]
+            self._arm()
+
+    def _current(self):
+        current = self.deadline, None
+        for stack in self._open.values():
+            own, deadline, owner, step = stack[-1][:4]
+            if own is not None and (deadline is None or own < deadline):
+                deadline, owner = own, step
+            if deadline is not None and (current[0] is None or
+                                         deadline < current[0]):
+                current = deadline, owner
+        return current
+
+    def _arm(self):
+        if not self.started:
+            return
+        deadline, owner = self._current()
+        if deadline is None:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        else:
+            signal.setitimer(signal.ITIMER_REAL,
+                             max(deadline - time.time(), self.RETRY))
+
+    def _expired(self, signum, frame):
+        deadline, owner = self._current()
+        if deadline is None:
+            return
+        if deadline > time.time() or _shielded(frame):
+            self._arm()
+            return
+        if owner is None:
+            from ._registry import Registry
+            Registry().stop()
+            message = 'the run ran out of its time budget'
+        else:
+            message = '{0} ran out of its time budget of {1}s'.format(
+                owner, owner.budget if owner.budget is not None
+                else self.step)
+        timeout = StepTimeout(message, owner)
+        if not self._cancel(timeout):
+            raise timeout
+
+    def _exhausted(self, signum, frame):
+        if _shielded(frame):
+            return  # SIGXCPU comes back every second
+        timeout = StepTimeout('the spec file used up its CPU time limit of '
+                              '{0}s'.format(self.cpu))
+        if not self._cancel(timeout):
+            raise timeout
+
+    def _cancel(self, timeout):
+        """
+        Cancels the tasks to raise `timeout` in, if an event loop is running.
+        """
+        loop = _running_loop()
+        if loop is None:
+            return False
+        if timeout.owner is not None:
+            tasks = [record[4] for stack in self._open.values()
+                     for record in stack if record[3] is timeout.owner]
+        else:
+            tasks = [task for task in _all_tasks(loop)
+                     if not _runs_module(task)]
+        for task in tasks:
+            if task is not None:
+                _pending[task] = timeout
+                loop.call_soon_threadsafe(task.cancel)
+        return True
+
+
+# tasks cancelled by a Watchdog, and the StepTimeout to raise in them
+_pending = weakref.WeakKeyDictionary()
+
+
+def take_timeout():
+    """
+    The StepTimeout a Watchdog cancelled the current task for, if any; it
+    is only handed out once, and the cancellation is taken back.
+    """
+    task = _current_task()
+    if task is None:
+        return None
+    timeout = _pending.pop(task, None)
+    if timeout is not None and hasattr(task, 'uncancel'):
+        task.uncancel()
+    return timeout
+
+
+def limit_resources(cpu=None, memory=None):
+    """
+    Limits the CPU seconds and the address space (in bytes) this process
+    may use from now on, such as for running one spec file in a worker.
+    Returns a function restoring the previous limits.
+    """
+    if resource is None:
+        if cpu or memory:
+            log.warning('CPU and memory limits are not supported here')
+        return lambda: None
+    previous = []
+    if cpu:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        used = usage.ru_utime + usage.ru_stime
+        previous.append(_set_limit(resource.RLIMIT_CPU,
+                                   int(used + cpu + .999)))
+    if memory:
+        previous.append(_set_limit(resource.RLIMIT_AS, int(memory)))
+
+    def restore():
+        for limit, limits in previous:
+            if limits is not None:
+                resource.setrlimit(limit, limits)
+    return restore
+
+
+def _set_limit(limit, soft):
+    limits = resource.getrlimit(limit)
+    hard = limits[1]
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    try:
+        resource.setrlimit(limit, (soft, hard))
+    except (ValueError, OSError) as e:
+        log.warning('Could not limit resources: %s', e)
+        return limit, None
+    return limit, limits
+
+
+def _shielded(frame):
+    """
+    Whether `frame` is running the framework's bookkeeping for a step,
+    which must not be interrupted halfway.
+    """
+    if not _SHIELDED:
+        from ._registry import Registry
+        from ._step import Step
+        _SHIELDED.update(function.__code__ for function in (
+            Registry.publish, Registry.replay, Registry.push, Registry.pop,
+            Step._enter, Step.__exit__, Step.__aexit__, Step._exit,
+            Step._exit_timed_out))
+    while frame is not None:
+        if frame.f_code in _SHIELDED:
+            return True
+        frame = frame.f_back
+    return False
+
+
+_SHIELDED = set()
+
+
+def _running_loop():
+    asyncio = sys.modules.get('asyncio')
+    if asyncio is None:
+        return None
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _current_task():
+    loop = _running_loop()
+    if loop is None:
+        return None
+    return sys.modules['asyncio'].current_task(loop)
+
+
+def _all_tasks(loop):
+    return sys.modules['asyncio'].all_tasks(loop)
+
+
+def _runs_module(task):
+    # the task of a spec module itself only awaits its scenarios, which
+    # pass the StepTimeout on to it
+    code = getattr(task.get_coro(), 'cr_code', None)
+    return code is not None and code.co_name == '<module>'
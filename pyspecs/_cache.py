@@ -0,0 +1,177 @@
+import os
+import ast
+import sys
+import time
+import marshal
+import logging
+import tempfile
+from types import CodeType
+
+from ._assertions import rewrite_asserts
+from ._async import FLAGS, is_async, hoist_scenarios
+from ._selection import guard_bodies
+
+log = logging.getLogger(__name__)
+if sys.version < '3':
+    import imp
+    MAGIC = imp.get_magic()
+    CACHE_TAG = 'py%d%d' % sys.version_info[:2]
+else:
+    from importlib.util import MAGIC_NUMBER as MAGIC
+    CACHE_TAG = sys.implementation.cache_tag
+
+try:
+    from _imp import _fix_co_filename as _fix_in_place
+except ImportError:
+    _fix_in_place = None
+
+
+def _fix_co_filename(code, path):
+    if _fix_in_place is not None:
+        _fix_in_place(code, path)
+        return code
+    if str is not bytes or code.co_filename == path:
+        return code
+    # Python 2 cannot fix code objects in place, so they are rebuilt
+    consts = tuple(
+        _fix_co_filename(const, path) if isinstance(const, CodeType) else const
+        for const in code.co_consts)
+    return CodeType(
+        code.co_argcount, code.co_nlocals, code.co_stacksize, code.co_flags,
+        code.co_code, consts, code.co_names, code.co_varnames, path,
+        code.co_name, code.co_firstlineno, code.co_lnotab, code.co_freevars,
+        code.co_cellvars)
+
+
+class CodeCache(object):
+    """
+    A __pycache__-style store of compiled .pyspecs files. Each entry is
+    keyed by the spec's path, mtime, size and the interpreter's magic
+    number, so any change to the file (or the interpreter) recompiles it.
+    FORMAT is part of the key as well and changes whenever pyspecs starts
+    compiling specs differently. Unless `rewrite` is off, `assert`
+    statements are rewritten to explain their failures (see
+    rewrite_asserts). With `select`, the bodies of `with`
+    statements are guarded so that deselected steps can skip them (see
+    Registry.skip). Each such variant is stored in a file of its own (see
+    `location`), so runs alternating between them keep hitting the cache.
+    The compile time of every entry is stored with it, which lets a hit
+    report how much compiling it saved.
+    """
+    DIRECTORY = '__pycache__'
+    FORMAT = 2
+
+    def __init__(self, enabled=True, select=False, rewrite=True):
+        self.enabled = enabled
+        self.select = select
+        self.rewrite = rewrite
+        self.hits = 0
+        self.misses = 0
+        self.compile_seconds = 0
+        self.saved_seconds = 0
+
+    def compile(self, path):
+        stats = os.stat(path)
+        key = (MAGIC, self.FORMAT, self.select, self.rewrite,
+               os.path.abspath(path),
+               stats.st_mtime, stats.st_size)
+
+        if self.enabled:
+            started = time.time()
+            entry = self._load(path, key)
+            if entry is not None:
+                compile_seconds, code = entry
+                # the entry may have been compiled through another (relative)
+                # spelling of the path, as importlib also accounts for
+                code = _fix_co_filename(code, path)
+                self.hits += 1
+                self.saved_seconds += max(
+                    0, compile_seconds - (time.time() - started))
+                return code
+
+        started = time.time()
+        with open(path, 'rb') as fd:
+            code = self._compile(fd.read(), path)
+        compile_seconds = time.time() - started
+        self.misses += 1
+        self.compile_seconds += compile_seconds
+
+        if self.enabled and not sys.dont_write_bytecode:
+            self._store(path, key, compile_seconds, code)
+        return code
+
+    def _compile(self, source, path):
+        transforms = []
+        if self.rewrite and b'assert' in source:
+            transforms.append(lambda tree: rewrite_asserts(tree, source))
+        if self.select:
+            transforms.append(guard_bodies)
+        if is_async(source):
+            transforms.append(hoist_scenarios)
+        if not transforms:
+            return compile(source, path, 'exec')
+        tree = compile(source, path, 'exec', ast.PyCF_ONLY_AST | FLAGS)
+        for transform in transforms:
+            tree = transform(tree)
+        return compile(ast.fix_missing_locations(tree), path, 'exec', FLAGS)
+
+    def stats(self):
+        return self.hits, self.misses, self.compile_seconds, \
+            self.saved_seconds
+
+    def merge(self, stats):
+        hits, misses, compile_seconds, saved_seconds = stats
+        self.hits += hits
+        self.misses += misses
+        self.compile_seconds += compile_seconds
+        self.saved_seconds += saved_seconds
+
+    def __str__(self):
+        return (
+            'bytecode cache: {0} hits, {1} misses, {2:.4f} seconds '
+            'compiling, ~{3:.4f} seconds saved'.format(*self.stats())
+        )
+
+    def _load(self, path, key):
+        try:
+            with open(self.location(path), 'rb') as fd:
+                entry = marshal.loads(fd.read())
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            return None
+        if tuple(entry[:len(key)]) != key:
+            log.debug('Stale cache entry for %s', path)
+            return None
+        return entry[len(key):]
+
+    def _store(self, path, key, compile_seconds, code):
+        location = self.location(path)
+        directory = os.path.dirname(location)
+        try:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            # written aside and renamed so concurrent workers never read
+            # a half-written entry
+            fd, temporary = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, 'wb') as stream:
+                stream.write(marshal.dumps(key + (compile_seconds, code)))
+            _replace(temporary, location)
+        except (IOError, OSError) as e:
+            log.debug('Could not cache %s: %s', path, e)
+
+    def location(self, path):
+        directory, name = os.path.split(path)
+        variant = ''.join(
+            suffix for suffix, applies in (('.select', self.select),
+                                           ('.plain', not self.rewrite))
+            if applies)
+        return os.path.join(directory, self.DIRECTORY, '{0}.{1}{2}.pyc'.format(
+            name, CACHE_TAG, variant))
+
+
+if sys.version < '3':
+    def _replace(source, destination):
+        if os.name == 'nt' and os.path.exists(destination):
+            os.remove(destination)
+        os.rename(source, destination)
+else:
+    _replace = os.replace
@@ -0,0 +1,89 @@
+import io
+import logging
+import tempfile
+
+log = logging.getLogger(__name__)
+
+
+class OutputCapture(object):
+    """
+    The single stdout replacement shared by all steps of a run. Output is
+    appended (utf-8 encoded) to one buffer and steps only remember the
+    offsets they started and stopped at, so a step's output is a slice of
+    the buffer. The buffer moves to a temporary file once it holds more than
+    `spill` bytes, and each scenario may write at most `limit` bytes (None
+    for no limit); anything beyond is dropped behind a truncation marker.
+    """
+    LIMIT = 10 * 1024 * 1024
+    SPILL = 1024 * 1024
+    MARKER = u'\n[... output truncated at {0} bytes ...]\n'
+    encoding = 'utf-8'
+
+    def __init__(self, limit=LIMIT, spill=SPILL):
+        self.limit = limit
+        self.spill = spill
+        self.dropped = 0
+        self._buffer = io.BytesIO()
+        self._spilled = False
+        self._position = 0
+        self._scenario_start = 0
+        self._truncated = False
+
+    def start_scenario(self):
+        self._scenario_start = self._position
+        self._truncated = False
+
+    def tell(self):
+        return self._position
+
+    def write(self, text):
+        data = text.encode(self.encoding) if not isinstance(
+            text, bytes) else text
+        if self.limit is not None:
+            room = self.limit - (self._position - self._scenario_start)
+            if len(data) > room:
+                self._truncate(data, room)
+                return
+        self._append(data)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+    def read(self, start, stop=None):
+        stop = self._position if stop is None else stop
+        if stop <= start:
+            return u''
+        self._buffer.seek(start)
+        data = self._buffer.read(stop - start)
+        self._buffer.seek(0, io.SEEK_END)
+        return data.decode(self.encoding, 'replace')
+
+    def close(self):
+        self._buffer.close()
+
+    def _truncate(self, data, room):
+        if self._truncated:
+            self.dropped += len(data)
+            return
+        self._truncated = True
+        # cut on a character boundary so slices stay decodable
+        kept = data[:max(room, 0)].decode(self.encoding, 'ignore').encode(
+            self.encoding)
+        self.dropped += len(data) - len(kept)
+        self._append(kept + self.MARKER.format(self.limit).encode(
+            self.encoding))
+
+    def _append(self, data):
+        self._buffer.write(data)
+        self._position += len(data)
+        if not self._spilled and self._position > self.spill:
+            log.debug('Spilling %d bytes of captured output to disk',
+                      self._position)
+            spilled = tempfile.TemporaryFile()
+            spilled.write(self._buffer.getvalue())
+            self._buffer.close()
+            self._buffer = spilled
+            self._spilled = True
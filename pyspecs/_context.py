@@ -0,0 +1,88 @@
+import sys
+import threading
+
+try:
+    from contextvars import ContextVar, copy_context
+except ImportError:
+    copy_context = None
+    _MISSING = object()
+
+    class ContextVar(object):
+        """
+        Thread-local stand-in for contextvars.ContextVar on interpreters that
+        lack it; tokens are simply the previous values.
+        """
+        def __init__(self, name):
+            self.name = name
+            self._local = threading.local()
+
+        def get(self, *default):
+            value = getattr(self._local, 'value', _MISSING)
+            if value is not _MISSING:
+                return value
+            if default:
+                return default[0]
+            raise LookupError(self.name)
+
+        def set(self, value):
+            token = getattr(self._local, 'value', _MISSING)
+            self._local.value = value
+            return token
+
+        def reset(self, token):
+            if token is _MISSING:
+                del self._local.value
+            else:
+                self._local.value = token
+
+
+_stdout = ContextVar('pyspecs_stdout')
+_lock = threading.Lock()
+_redirections = [None, 0]  # the installed proxy, active redirections
+
+
+class _ContextStdout(object):
+    """
+    Stands in for sys.stdout while any step is capturing and forwards every
+    write to the stream redirected to in the writer's own context (thread or
+    task), or to the original stdout outside of steps.
+    """
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+    def _target(self):
+        return _stdout.get(None) or self.fallback
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        return self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+
+def redirect_stdout(stream):
+    """
+    Sends the current context's stdout to `stream` until `restore_stdout`
+    is called with the returned token, leaving other contexts alone.
+    """
+    with _lock:
+        proxy, active = _redirections
+        if not active or sys.stdout is not proxy:
+            proxy = _ContextStdout(sys.stdout)
+            sys.stdout = proxy
+            active = 0
+        _redirections[:] = [proxy, active + 1]
+    return _stdout.set(stream)
+
+
+def restore_stdout(token):
+    _stdout.reset(token)
+    with _lock:
+        proxy, active = _redirections
+        active = max(active - 1, 0)
+        if not active and sys.stdout is proxy:
+            sys.stdout = proxy.fallback
+        _redirections[1] = active
@@ -0,0 +1,161 @@
+import os
+import sys
+import logging
+import threading
+from contextlib import contextmanager
+
+from ._context import ContextVar
+
+log = logging.getLogger(__name__)
+if sys.version < '3':
+    import __builtin__ as builtins
+else:
+    import builtins
+
+
+class DependencyGraph(object):
+    """
+    Records which project files import which other project files while
+    specs are executed, so that a change to one module only re-runs the spec
+    files that (transitively) depend on it. Only files under `root` and
+    outside site-packages are tracked.
+    """
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.imports = {}
+
+    @contextmanager
+    def recording(self):
+        """
+        Records every import statement executed in the block (including
+        imports of modules that are already loaded) as an edge from the
+        importing file to the imported one.
+        """
+        edges = set()
+        token = _recording.set((self, edges))
+        _install_hook()
+        try:
+            yield edges
+        finally:
+            _uninstall_hook()
+            _recording.reset(token)
+            self.add(edges)
+
+    def _record(self, edges, name, module, globals, fromlist, level):
+        importer = self._project_file((globals or {}).get('__file__'))
+        if importer is not None:
+            for imported in self._imported_files(name, module, fromlist,
+                                                 level):
+                edges.add((importer, imported))
+
+    def add(self, edges):
+        for importer, imported in edges:
+            self.imports.setdefault(importer, set()).add(imported)
+
+    def drain(self):
+        edges = [(importer, imported)
+                 for importer, files in self.imports.items()
+                 for imported in files]
+        self.imports = {}
+        return edges
+
+    def dependencies(self, path):
+        return self._closure([os.path.abspath(path)], self.imports)
+
+    def dependents(self, paths):
+        importers = {}
+        for importer, files in self.imports.items():
+            for imported in files:
+                importers.setdefault(imported, set()).add(importer)
+        return self._closure([os.path.abspath(p) for p in paths], importers)
+
+    def affected(self, specs, changed):
+        """
+        The subset of `specs` that must re-run after `changed` files
+        changed, preserving order. A changed directory (the watcher's way of
+        saying it lost track) selects every spec.
+        """
+        changed = set(os.path.abspath(path) for path in changed)
+        if any(os.path.isdir(path) for path in changed):
+            return list(specs)
+        impacted = self.dependents(changed)
+        return [spec for spec in specs if os.path.abspath(spec) in impacted]
+
+    def evict(self, changed):
+        """
+        Unloads the changed modules and everything importing them so the
+        next run imports fresh copies (and records their edges again).
+        """
+        stale = self.dependents(changed)
+        for name, module in list(sys.modules.items()):
+            if self._project_file(getattr(module, '__file__', None)) in stale:
+                log.debug('Unloading %s', name)
+                del sys.modules[name]
+        for path in stale:
+            self.imports.pop(path, None)
+
+    def _imported_files(self, name, module, fromlist, level):
+        if not fromlist and not level:
+            module = sys.modules.get(name, module)
+        modules = [module]
+        for item in fromlist or ():
+            value = getattr(module, item, None)
+            if value is not None and type(value) is type(module):
+                modules.append(value)
+        for imported in modules:
+            path = self._project_file(getattr(imported, '__file__', None))
+            if path is not None:
+                yield path
+
+    def _project_file(self, path):
+        if not path:
+            return None
+        path = os.path.abspath(path)
+        if path.endswith(('.pyc', '.pyo')):
+            path = path[:-1]
+        if not path.startswith(self.root + os.sep) or \
+                'site-packages' in path.split(os.sep):
+            return None
+        return path
+
+    @staticmethod
+    def _closure(paths, edges):
+        seen = set(paths)
+        pending = list(paths)
+        while pending:
+            for neighbour in edges.get(pending.pop(), ()):
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    pending.append(neighbour)
+        return seen
+
+
+# The __import__ hook is shared by every recording; each thread or task
+# records into the graph it set up in its own context.
+_recording = ContextVar('pyspecs_import_recording')
+_hook_lock = threading.Lock()
+_hook = [None, 0]  # the original __import__, active recordings
+
+
+def _recording_import(name, globals=None, locals=None, fromlist=(), level=0):
+    module = _hook[0](name, globals, locals, fromlist, level)
+    active = _recording.get(None)
+    if active is not None:
+        graph, edges = active
+        graph._record(edges, name, module, globals, fromlist, level)
+    return module
+
+
+def _install_hook():
+    with _hook_lock:
+        if not _hook[1]:
+            _hook[0] = builtins.__import__
+            builtins.__import__ = _recording_import
+        _hook[1] += 1
+
+
+def _uninstall_hook():
+    with _hook_lock:
+        _hook[1] -= 1
+        if not _hook[1]:
+            builtins.__import__ = _hook[0]
@@ -0,0 +1,269 @@
+import re
+import sys
+import difflib
+from array import array
+from itertools import islice
+from collections import deque
+
+if sys.version < '3':
+    from repr import Repr
+    from collections import Mapping, Set
+    from itertools import izip as zip
+    string_types = basestring  # noqa
+else:
+    from reprlib import Repr
+    from collections.abc import Mapping, Set
+    string_types = str
+
+SEQUENCES = (list, tuple, deque)
+CONTAINERS = SEQUENCES + (Mapping, Set)
+SCALARS = (bool, int, float, complex, type(None))
+HUNK = re.compile(r'([-+])(\d+)')
+
+
+class DiffLimits(object):
+    """
+    How much of the values of a failed expectation its message shows:
+    values are cut to `width` characters (nested containers to `items`
+    items each and `depth` levels), and differences list at most `items`
+    keys or items and `lines` lines in all, with `context` lines (or
+    `width` // 4 characters) around differing strings.
+    """
+    def __init__(self, width=240, items=10, depth=4, lines=40, context=3):
+        self.width = width
+        self.items = items
+        self.depth = depth
+        self.lines = lines
+        self.context = context
+
+
+def shorten(value, limits):
+    """
+    `value` as formatting it would show it, but bounded by `limits`
+    without ever formatting all of a large container or string.
+    """
+    if isinstance(value, string_types):
+        if value.count('\n') > 2 * limits.context:
+            value = '\n'.join(
+                value[:limits.width].split('\n')[:limits.context] + ['...'] +
+                value[-limits.width:].split('\n')[-limits.context:])
+        return _cut(value, limits.width)
+    if isinstance(value, CONTAINERS + (array,)):
+        return _cut(_repr(limits).repr(value), limits.width)
+    return _cut(str(value), limits.width)
+
+
+def describe_difference(actual, expected, limits):
+    """
+    Lines locating where `actual` differs from `expected`: the first
+    differing index of sequences, missing, extra and differing keys of
+    mappings, missing and extra items of sets (descending into nested
+    containers) and a unified diff of the differing lines of long
+    strings. Only the region around the difference is looked at closely.
+    """
+    lines = []
+    _difference(actual, expected, '', limits, lines, 0)
+    if len(lines) > limits.lines:
+        lines = lines[:limits.lines] + ['...']
+    return lines
+
+
+def _difference(actual, expected, path, limits, lines, depth):
+    if isinstance(actual, string_types) and \
+            isinstance(expected, string_types):
+        _strings(actual, expected, path, limits, lines)
+    elif depth >= limits.depth:
+        return
+    elif isinstance(actual, SEQUENCES) and isinstance(expected, SEQUENCES):
+        _sequences(actual, expected, path, limits, lines, depth)
+    elif isinstance(actual, Mapping) and isinstance(expected, Mapping):
+        _mappings(actual, expected, path, limits, lines, depth)
+    elif isinstance(actual, Set) and isinstance(expected, Set):
+        _sets(actual, expected, path, limits, lines)
+    elif type(actual) is not type(expected) and path:
+        lines.append('{0}: {1} != {2} ({3} != {4})'.format(
+            path, _show(actual, limits), _show(expected, limits),
+            type(actual).__name__, type(expected).__name__))
+    elif path:
+        lines.append('{0}: {1} != {2}'.format(
+            path, _show(actual, limits), _show(expected, limits)))
+
+
+def _sequences(actual, expected, path, limits, lines, depth):
+    # iterated rather than indexed: indexing a deque is linear
+    common = min(len(actual), len(expected))
+    for index, (left, right) in enumerate(zip(actual, expected)):
+        if left != right:
+            _element(left, right, '{0}[{1}]'.format(path, index), limits,
+                     lines, depth)
+            break
+    if len(actual) != len(expected):
+        longer, kind = (actual, 'extra') if len(actual) > len(expected) \
+            else (expected, 'missing')
+        lines.append('{0}{1} instead of {2}, {3} {4}:'.format(
+            _prefix(path), _count(len(actual), 'item'), len(expected),
+            len(longer) - common, kind))
+        for position, item in enumerate(
+                islice(longer, common, common + limits.items), common):
+            lines.append('  {0}[{1}] {2}'.format(
+                path, position, _show(item, limits)))
+        if len(longer) > common + limits.items:
+            lines.append('  ...')
+    if type(actual) is not type(expected):
+        lines.append('{0}a {1} instead of a {2}'.format(
+            _prefix(path), type(actual).__name__,
+            type(expected).__name__))
+
+
+def _mappings(actual, expected, path, limits, lines, depth):
+    missing = [key for key in expected if key not in actual]
+    extra = [key for key in actual if key not in expected]
+    _keys(missing, 'missing', expected, path, limits, lines)
+    _keys(extra, 'extra', actual, path, limits, lines)
+    differing = 0
+    for key in expected:
+        if key in actual and actual[key] != expected[key]:
+            if differing == limits.items:
+                lines.append('{0}... more differing keys'.format(
+                    _prefix(path)))
+                break
+            differing += 1
+            _element(actual[key], expected[key],
+                     '{0}[{1}]'.format(path, _show(key, limits)),
+                     limits, lines, depth)
+
+
+def _keys(keys, kind, mapping, path, limits, lines):
+    if not keys:
+        return
+    lines.append('{0}{1} {2}:'.format(
+        _prefix(path), _count(len(keys), 'key'), kind))
+    for key in keys[:limits.items]:
+        lines.append('  [{0}]: {1}'.format(
+            _show(key, limits), _show(mapping[key], limits)))
+    if len(keys) > limits.items:
+        lines.append('  ...')
+
+
+def _sets(actual, expected, path, limits, lines):
+    for kind, items in (('missing', expected - actual),
+                        ('extra', actual - expected)):
+        if not items:
+            continue
+        lines.append('{0}{1} {2}:'.format(
+            _prefix(path), _count(len(items), 'item'), kind))
+        for count, item in enumerate(items):
+            if count == limits.items:
+                lines.append('  ...')
+                break
+            lines.append('  {0}'.format(_show(item, limits)))
+
+
+def _element(actual, expected, path, limits, lines, depth):
+    if isinstance(actual, CONTAINERS + (string_types,)) and \
+            isinstance(expected, CONTAINERS + (string_types,)):
+        _difference(actual, expected, path, limits, lines, depth + 1)
+    else:
+        lines.append('{0}: {1} != {2}'.format(
+            path, _show(actual, limits), _show(expected, limits)))
+
+
+def _strings(actual, expected, path, limits, lines):
+    prefix = _prefix(path)
+    if '\n' in actual or '\n' in expected:
+        _text_lines(actual, expected, prefix, limits, lines)
+        return
+    if max(len(actual), len(expected)) <= limits.width // 4:
+        if path:
+            lines.append('{0}{1} != {2}'.format(
+                prefix, _show(actual, limits), _show(expected, limits)))
+        return
+    index = _common_prefix(actual, expected)
+    around = max(limits.width // 4, 1)
+    start = max(index - around, 0)
+    lines.append('{0}strings differ at index {1} (lengths {2} and {3}):'
+                 .format(prefix, index, len(actual), len(expected)))
+    for text in (actual, expected):
+        lines.append('  {0}{1!r}{2}'.format(
+            '...' if start else '', text[start:index + around],
+            '...' if index + around < len(text) else ''))
+
+
+def _text_lines(actual, expected, prefix, limits, lines):
+    actual_lines = actual.splitlines(True)
+    expected_lines = expected.splitlines(True)
+    start = _common_prefix(actual_lines, expected_lines)
+    end = _common_suffix(actual_lines, expected_lines, start)
+    start = max(start - limits.context, 0)
+    end = max(end - limits.context, 0)
+    # at most `lines` lines of each side go through difflib
+    actual_region = actual_lines[start:len(actual_lines) - end][
+        :limits.lines]
+    expected_region = expected_lines[start:len(expected_lines) - end][
+        :limits.lines]
+    lines.append('{0}lines differ from line {1}:'.format(prefix, start + 1))
+    for line in difflib.unified_diff(expected_region, actual_region,
+                                     'expected', 'actual',
+                                     n=limits.context, lineterm=''):
+        if line.startswith('@@'):
+            line = HUNK.sub(lambda match: '{0}{1}'.format(
+                match.group(1), int(match.group(2)) + start), line)
+        lines.append(_cut(line.rstrip('\n'), limits.width))
+
+
+def _common_prefix(first, second):
+    index = 0
+    common = min(len(first), len(second))
+    while index < common and first[index] == second[index]:
+        index += 1
+    return index
+
+
+def _common_suffix(first, second, prefix):
+    count = 0
+    common = min(len(first), len(second)) - prefix
+    while count < common and first[-1 - count] == second[-1 - count]:
+        count += 1
+    return count
+
+
+def _repr(limits):
+    key = limits.width, limits.items, limits.depth
+    if key not in _REPRS:
+        _REPRS.clear()
+        _REPRS[key] = _new_repr(limits)
+    return _REPRS[key]
+
+
+_REPRS = {}
+
+
+def _new_repr(limits):
+    shortened = Repr()
+    shortened.maxlevel = limits.depth
+    shortened.maxlist = shortened.maxtuple = shortened.maxset = \
+        shortened.maxfrozenset = shortened.maxdeque = shortened.maxarray = \
+        shortened.maxdict = limits.items
+    shortened.maxstring = shortened.maxother = shortened.maxlong = \
+        limits.width
+    return shortened
+
+
+def _prefix(path):
+    return '{0}: '.format(path) if path else ''
+
+
+def _count(number, noun):
+    return '{0} {1}{2}'.format(number, noun, '' if number == 1 else 's')
+
+
+def _show(value, limits):
+    if isinstance(value, SCALARS):
+        return _cut(repr(value), limits.width)
+    return _cut(_repr(limits).repr(value), limits.width)
+
+
+def _cut(text, width):
+    if len(text) <= width:
+        return text
+    return text[:width // 2] + '...' + text[-(width // 2):]
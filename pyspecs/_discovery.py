@@ -0,0 +1,215 @@
+import os
+import re
+import sys
+import time
+import fnmatch
+import marshal
+import logging
+import tempfile
+
+from ._watcher import IGNORED
+
+log = logging.getLogger(__name__)
+if str is bytes:
+    _replace = os.rename
+else:
+    _replace = os.replace
+
+
+class SpecFinder(object):
+    """
+    Finds the spec files under one or more roots with os.scandir, never
+    descending into directories whose name matches an `ignore` pattern or a
+    pattern of an ignore file (IGNORE_FILES) in that directory or above.
+    Ignore files hold one glob per line: a glob without a slash matches
+    names at any depth, one with a slash matches paths relative to the
+    ignore file, and a trailing slash only matches directories. Negations
+    (`!glob`) are not supported and skipped.
+
+    Each root's listing is cached in an index under its __pycache__, keyed
+    by the mtime of every directory (and the stamp of its ignore files):
+    later runs only list the directories that changed since, and stat the
+    others. Directories modified within the last RACY seconds are not
+    trusted to the index, since they may still change within the same
+    mtime tick.
+    """
+    EXTENSION = '.pyspecs'
+    IGNORE_FILES = ('.pyspecsignore', '.gitignore')
+    INDEX = os.path.join('__pycache__', 'pyspecs-index')
+    FORMAT = 1
+    RACY = 2
+
+    def __init__(self, ignore=IGNORED, cached=True):
+        self.ignore = tuple(ignore)
+        self._ignore = _compile(self.ignore)
+        self.cached = cached
+        self.listed = 0
+        self.reused = 0
+
+    def find(self, roots):
+        found = []
+        for root in roots:
+            root = os.path.abspath(root)
+            index = self._load(root) if self.cached else {}
+            fresh = {}
+            self._walk(root, '.', (), index, fresh, found)
+            if self.cached and fresh != index:
+                self._store(root, fresh)
+        log.debug('Listed %d directories, reused %d from the index',
+                  self.listed, self.reused)
+        return found
+
+    def _walk(self, directory, relative, rules, index, fresh, found):
+        entry = self._entry(directory, index.get(relative))
+        fresh[relative] = entry
+        mtime, stamps, files, directories, patterns = entry
+        if patterns:
+            rules += tuple(_rule(relative, pattern) for pattern in patterns)
+        prefix = '' if relative == '.' else relative + '/'
+
+        for name in files:
+            if not self._ignored(name, prefix + name, False, rules):
+                found.append(directory + os.sep + name)
+        for name in directories:
+            if not self._ignored(name, prefix + name, True, rules):
+                self._walk(directory + os.sep + name, prefix + name, rules,
+                           index, fresh, found)
+
+    def _entry(self, directory, cached):
+        try:
+            mtime = _mtime(os.stat(directory))
+        except OSError:
+            return (None, (), (), (), ())
+        if cached is not None and cached[0] == mtime and \
+                _stamps(directory, [stamp[0] for stamp in cached[1]]) == \
+                cached[1]:
+            self.reused += 1
+            return cached
+
+        self.listed += 1
+        files, directories, ignore_files = [], [], []
+        for name, is_directory in _list(directory):
+            if is_directory:
+                directories.append(name)
+            elif name.endswith(self.EXTENSION):
+                files.append(name)
+            elif name in self.IGNORE_FILES:
+                ignore_files.append(name)
+        patterns = []
+        for name in sorted(ignore_files):
+            patterns.extend(_read_patterns(os.path.join(directory, name)))
+        if time.time() - mtime / 1e9 < self.RACY:
+            mtime = None
+        return (mtime, _stamps(directory, sorted(ignore_files)),
+                tuple(sorted(files)), tuple(sorted(directories)),
+                tuple(patterns))
+
+    def _ignored(self, name, relative, is_directory, rules):
+        if self._ignore(name):
+            return True
+        for base, matches, directories_only, by_path in rules:
+            if directories_only and not is_directory:
+                continue
+            if by_path:
+                if relative.startswith(base) and \
+                        matches(relative[len(base):]):
+                    return True
+            elif matches(name):
+                return True
+        return False
+
+    def _load(self, root):
+        try:
+            with open(os.path.join(root, self.INDEX), 'rb') as stream:
+                version, index = marshal.loads(stream.read())
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            return {}
+        return index if version == self.FORMAT else {}
+
+    def _store(self, root, index):
+        location = os.path.join(root, self.INDEX)
+        directory = os.path.dirname(location)
+        try:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            fd, temporary = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, 'wb') as stream:
+                stream.write(marshal.dumps((self.FORMAT, index)))
+            _replace(temporary, location)
+        except (IOError, OSError) as e:
+            log.debug('Could not store the spec index of %s: %s', root, e)
+
+
+def _compile(patterns):
+    if not patterns:
+        return lambda name: None
+    return re.compile('|'.join(
+        fnmatch.translate(pattern) for pattern in patterns)).match
+
+
+def _rule(relative, pattern):
+    """
+    (base, matches, directories only, matched by path) for an ignore file
+    pattern found in the directory at `relative`.
+    """
+    directories_only = pattern.endswith('/')
+    pattern = pattern.rstrip('/')
+    by_path = '/' in pattern
+    base = '' if relative == '.' else relative + '/'
+    return (base, _compile([pattern.lstrip('/')]), directories_only,
+            by_path)
+
+
+def _read_patterns(path):
+    patterns = []
+    try:
+        with open(path) as stream:
+            for line in stream:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                if line.startswith('!'):
+                    log.debug('Ignoring unsupported negation %r in %s',
+                              line, path)
+                    continue
+                patterns.append(line)
+    except (IOError, OSError) as e:
+        log.debug('Could not read %s: %s', path, e)
+    return patterns
+
+
+def _stamps(directory, names):
+    stamps = []
+    for name in names:
+        try:
+            stats = os.stat(os.path.join(directory, name))
+        except OSError:
+            stamps.append((name, None, None))
+        else:
+            stamps.append((name, _mtime(stats), stats.st_size))
+    return tuple(stamps)
+
+
+def _mtime(stats):
+    return getattr(stats, 'st_mtime_ns', None) or int(stats.st_mtime * 1e9)
+
+
+if sys.version_info >= (3, 6):
+    def _list(directory):
+        try:
+            with os.scandir(directory) as entries:
+                return [(entry.name, entry.is_dir(follow_symlinks=False))
+                        for entry in entries]
+        except OSError as e:
+            log.debug('Could not list %s: %s', directory, e)
+            return []
+else:
+    def _list(directory):
+        try:
+            names = os.listdir(directory)
+        except OSError as e:
+            log.debug('Could not list %s: %s', directory, e)
+            return []
+        return [(name, os.path.isdir(os.path.join(directory, name)) and
+                 not os.path.islink(os.path.join(directory, name)))
+                for name in names]
@@ -0,0 +1,250 @@
+"""
+Expensive setup shared by the spec files of a session (a run, or every run
+of an auto-test loop, in one process):
+
+    @fixture
+    def dataset(name):
+        data = load(name)
+        yield data
+        data.close()
+
+    with given.a_large_dataset:
+        data = dataset('large.csv')
+
+A fixture is set up the first time it is called with some arguments, and
+later calls with the same arguments, from any spec file, get the same value.
+Generator fixtures are torn down after their `yield`: when they are evicted,
+when their source changes, and when the process exits.
+"""
+import sys
+import time
+import atexit
+import hashlib
+import inspect
+import logging
+import marshal
+import threading
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+
+def fixture(function=None, maxsize=None, weight=None):
+    """
+    Declares `function` a fixture of the session. At most `maxsize` of its
+    values (by their arguments) are kept, the least recently used going
+    first; the session as a whole keeps values weighing up to its
+    `capacity`, where a value weighs `weight(value)`, or 1.
+    """
+    if function is None:
+        return lambda function: fixture(function, maxsize, weight)
+    return FIXTURES.declare(function, maxsize, weight)
+
+
+class Fixture(object):
+    """
+    A declared fixture; calling it gets the value for the arguments.
+    """
+    def __init__(self, function, name, fingerprint, maxsize, weight,
+                 session):
+        self.function = function
+        self.name = name
+        self.fingerprint = fingerprint
+        self.maxsize = maxsize
+        self.weight = weight
+        self.session = session
+        self.generator = inspect.isgeneratorfunction(function)
+        self.__name__ = function.__name__
+        self.__doc__ = function.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.session.get(self, args, kwargs)
+
+    def __repr__(self):
+        return '<fixture {0}>'.format(self.name[1])
+
+
+class FixtureStats(object):
+    """
+    How many fixture values were set up and reused, the seconds setting
+    them up took and the seconds reusing them saved.
+    """
+    def __init__(self):
+        self.setups = 0
+        self.reuses = 0
+        self.setup_seconds = 0
+        self.saved_seconds = 0
+
+    def stats(self):
+        return self.setups, self.reuses, self.setup_seconds, \
+            self.saved_seconds
+
+    def merge(self, stats):
+        setups, reuses, setup_seconds, saved_seconds = stats
+        self.setups += setups
+        self.reuses += reuses
+        self.setup_seconds += setup_seconds
+        self.saved_seconds += saved_seconds
+
+    def __nonzero__(self):
+        return bool(self.setups or self.reuses)
+
+    __bool__ = __nonzero__
+
+    def __str__(self):
+        return (
+            'fixtures: {0} set up in {2:.4f} seconds, {1} reused, '
+            '~{3:.4f} seconds saved'.format(*self.stats())
+        )
+
+
+class _Entry(object):
+    __slots__ = ('value', 'generator', 'weight', 'seconds')
+
+    def __init__(self, value, generator, weight, seconds):
+        self.value = value
+        self.generator = generator
+        self.weight = weight
+        self.seconds = seconds
+
+
+class Fixtures(object):
+    """
+    The fixture values of a session, least recently used first. Declaring
+    a fixture again with different source drops the values of the old one.
+    Threads share the session; a value is set up by one of them at most,
+    while the others wait for it but go on setting up or reusing other
+    values.
+    """
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+        self.totals = FixtureStats()
+        self._entries = OrderedDict()
+        self._fingerprints = {}
+        self._weight = 0
+        self._lock = threading.RLock()
+        # one per value being (or having been) set up, guarded by _lock
+        self._setups = {}
+
+    def declare(self, function, maxsize=None, weight=None):
+        code = function.__code__
+        name = code.co_filename, getattr(
+            function, '__qualname__', function.__name__)
+        fingerprint = _fingerprint(function)
+        with self._lock:
+            previous = self._fingerprints.get(name)
+            if previous is not None and previous != fingerprint:
+                log.debug('Fixture %s changed', name[1])
+                self._drop(lambda key: key[0] == name)
+            self._fingerprints[name] = fingerprint
+        return Fixture(function, name, fingerprint, maxsize, weight, self)
+
+    def get(self, fixture, args, kwargs):
+        key = (fixture.name, fixture.fingerprint, args,
+               tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            raise TypeError(
+                'Fixture {0} was called with unhashable arguments {1!r} '
+                '{2!r}; its values are kept by their arguments'.format(
+                    fixture.name[1], args, kwargs))
+        while True:
+            with self._lock:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._entries[key] = entry
+                    self.totals.reuses += 1
+                    self.totals.saved_seconds += entry.seconds
+                    return entry.value
+                setup = self._setups.setdefault(key, threading.Lock())
+            with setup:
+                with self._lock:
+                    # set up by another thread meanwhile, or failed there
+                    if key in self._entries or \
+                            self._setups.get(key) is not setup:
+                        continue
+                try:
+                    entry = self._set_up(fixture, args, kwargs)
+                except BaseException:
+                    with self._lock:
+                        del self._setups[key]
+                    raise
+                with self._lock:
+                    self.totals.setups += 1
+                    self.totals.setup_seconds += entry.seconds
+                    self._entries[key] = entry
+                    self._weight += entry.weight
+                    self._evict(fixture, key)
+                    return entry.value
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """
+        Tears down every value, the most recently used first.
+        """
+        with self._lock:
+            self._drop(lambda key: True)
+
+    def _set_up(self, fixture, args, kwargs):
+        started = time.time()
+        value = generator = fixture.function(*args, **kwargs)
+        if fixture.generator:
+            value = next(generator)
+        else:
+            generator = None
+        seconds = time.time() - started
+        weight = fixture.weight(value) if fixture.weight else 1
+        return _Entry(value, generator, weight, seconds)
+
+    def _evict(self, fixture, kept):
+        if fixture.maxsize is not None:
+            own = [key for key in self._entries if key[0] == fixture.name]
+            for key in own[:max(len(own) - fixture.maxsize, 0)]:
+                if key != kept:
+                    self._remove(key)
+        if self.capacity is None:
+            return
+        for key in list(self._entries):
+            if self._weight <= self.capacity:
+                break
+            if key != kept:
+                self._remove(key)
+
+    def _drop(self, matches):
+        for key in reversed(list(self._entries)):
+            if matches(key):
+                self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._setups.pop(key, None)
+        self._weight -= entry.weight
+        log.debug('Tearing down fixture %s%r', key[0][1], key[2])
+        if entry.generator is None:
+            return
+        try:
+            next(entry.generator)
+        except StopIteration:
+            pass
+        except Exception:
+            log.warning('Tearing down fixture %s failed', key[0][1],
+                        exc_info=True)
+        else:
+            log.warning('Fixture %s yielded more than once', key[0][1])
+
+
+def _fingerprint(function):
+    try:
+        source = inspect.getsource(function)
+    except Exception:
+        return hashlib.sha1(marshal.dumps(function.__code__)).hexdigest()
+    if sys.version >= '3':
+        source = source.encode('utf-8')
+    return hashlib.sha1(source).hexdigest()
+
+
+FIXTURES = Fixtures()
+atexit.register(FIXTURES.clear)
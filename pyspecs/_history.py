@@ -0,0 +1,210 @@
+import os
+import sys
+import math
+import time
+import logging
+
+from ._reporting import Reporter
+
+log = logging.getLogger(__name__)
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    duration REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run INTEGER NOT NULL REFERENCES runs (id),
+    file TEXT NOT NULL,
+    path TEXT NOT NULL,
+    duration REAL NOT NULL,
+    self_duration REAL NOT NULL,
+    result TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    run INTEGER NOT NULL REFERENCES runs (id),
+    file TEXT NOT NULL,
+    duration REAL NOT NULL,
+    result TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS steps_by_run ON steps (run);
+CREATE INDEX IF NOT EXISTS files_by_run ON files (run);
+CREATE INDEX IF NOT EXISTS steps_by_path ON steps (file, path, run);
+CREATE INDEX IF NOT EXISTS files_by_file ON files (file, run);
+'''
+
+
+class TimingHistory(Reporter):
+    """
+    Saves the duration and result of every step and spec file of a run
+    into a SQLite database, and (with `compare`) reports the passing steps
+    and files that took longer than their history says they should: more
+    than `threshold` standard deviations above their mean over the last
+    WINDOW runs they passed in, and by at least MIN_DELTA seconds and
+    MIN_RATIO of the mean, which keeps very steady timings from turning
+    noise into regressions. Steps are
+    compared by self time, so a regression shows up where it happens
+    rather than in every step around it. Steps are identified by their
+    file and the names of their ancestors.
+
+    The last duration of every spec file (see `file_durations`) is what
+    sharded runs balance their shards by. Only the last RETAIN runs are
+    kept, so the database stops growing.
+    """
+    FILENAME = '.pyspecs_history.sqlite'
+    WINDOW = 20
+    RETAIN = 10 * WINDOW
+    MIN_RUNS = 5
+    MIN_DELTA = .001
+    MIN_RATIO = .1
+    SEPARATOR = ' / '
+
+    def __init__(self, working, path=None, compare=False, threshold=3.0,
+                 out=None):
+        self.working = os.path.abspath(working)
+        self.path = path or os.path.join(working, self.FILENAME)
+        self.compare = compare
+        self.threshold = threshold
+        self.out = out or sys.stdout
+        self.started = time.time()
+        self.regressions = []
+        self._steps = []
+        self._files = {}
+
+    def step_exited(self, step):
+        name = self._relative(step.filename)
+        result = step.result.kind
+        self._steps.append((name, self.SEPARATOR.join(step.hierarchy),
+                            step.duration, step.self_duration, result))
+        if step.parent is None:
+            duration, previous = self._files.get(name, (0, None))
+            self._files[name] = (duration + step.duration,
+                                 result if previous in (None, 'success')
+                                 else previous)
+
+    def render(self, step_runner):
+        if sqlite3 is None:
+            log.warning('sqlite3 is not available; timings are not saved')
+            return
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            connection.executescript(SCHEMA)
+            if self.compare:
+                self.regressions = self._regressions(connection)
+                self._print_regressions()
+            with connection:
+                self._save(connection)
+        finally:
+            connection.close()
+
+    def _save(self, connection):
+        total = sum(duration for duration, result in self._files.values())
+        run = connection.execute(
+            'INSERT INTO runs (started, duration) VALUES (?, ?)',
+            (self.started, total)).lastrowid
+        connection.executemany(
+            'INSERT INTO steps (run, file, path, duration, self_duration, '
+            'result) VALUES (?, ?, ?, ?, ?, ?)',
+            [(run,) + row for row in self._steps])
+        connection.executemany(
+            'INSERT INTO files (run, file, duration, result) '
+            'VALUES (?, ?, ?, ?)',
+            [(run, name, duration, result)
+             for name, (duration, result) in sorted(self._files.items())])
+        oldest = connection.execute(
+            'SELECT id FROM runs ORDER BY id DESC LIMIT 1 OFFSET ?',
+            (self.RETAIN - 1,)).fetchone()
+        if oldest is not None:
+            for table, column in (('steps', 'run'), ('files', 'run'),
+                                  ('runs', 'id')):
+                connection.execute('DELETE FROM {0} WHERE {1} < ?'.format(
+                    table, column), oldest)
+
+    def file_durations(self):
+        """
+        The duration every spec file took the last time it ran, by name
+        relative to the working directory (for sharding).
+        """
+        if sqlite3 is None or not os.path.exists(self.path):
+            return {}
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            connection.executescript(SCHEMA)
+            return dict(connection.execute(
+                'SELECT file, duration FROM files WHERE rowid IN '
+                '(SELECT MAX(rowid) FROM files GROUP BY file)'))
+        finally:
+            connection.close()
+
+    def _regressions(self, connection):
+        regressions = []
+        for name, path, duration, own, result in self._steps:
+            if result != 'success':
+                continue
+            regression = self._check(self._history(
+                connection,
+                "SELECT self_duration FROM steps WHERE file = ? AND path = ? "
+                "AND result = 'success' ORDER BY run DESC LIMIT ?",
+                name, path), own)
+            if regression:
+                regressions.append((path, name) + regression)
+        for name, (duration, result) in sorted(self._files.items()):
+            if result != 'success':
+                continue
+            regression = self._check(self._history(
+                connection,
+                "SELECT duration FROM files WHERE file = ? "
+                "AND result = 'success' ORDER BY run DESC LIMIT ?",
+                name), duration)
+            if regression:
+                regressions.append((name, 'whole file') + regression)
+        return sorted(regressions, key=lambda entry: -entry[-1])
+
+    def _history(self, connection, query, *key):
+        """
+        The last WINDOW passing durations of a step or file, which the
+        indexes let SQLite find without reading the older runs.
+        """
+        return [duration for duration, in
+                connection.execute(query, key + (self.WINDOW,))]
+
+    def _check(self, history, duration):
+        if not history or len(history) < self.MIN_RUNS:
+            return None
+        mean = sum(history) / len(history)
+        deviation = math.sqrt(sum((value - mean) ** 2 for value in history) /
+                              (len(history) - 1))
+        if duration - mean <= max(self.threshold * deviation,
+                                  self.MIN_DELTA, self.MIN_RATIO * mean):
+            return None
+        sigmas = (duration - mean) / deviation if deviation else float('inf')
+        return duration, mean, deviation, sigmas
+
+    def _print_regressions(self):
+        if not self.regressions:
+            self._print('\nno timing regressions against the last {0} runs'
+                        .format(self.WINDOW))
+            return
+        self._print('\n{0} timing regressions against the last {1} runs '
+                    '(> {2} standard deviations):'.format(
+                        len(self.regressions), self.WINDOW, self.threshold))
+        for path, name, duration, mean, deviation, sigmas in \
+                self.regressions:
+            self._print('  {0:9.4f}s vs {1:9.4f}s +/- {2:.4f}s ({3:+.1f} '
+                        'sigma)  {4}  ({5})'.format(
+                            duration, mean, deviation, sigmas, path, name))
+
+    def _relative(self, filename):
+        if not filename:
+            return ''
+        return os.path.relpath(os.path.abspath(filename),
+                               self.working).replace(os.sep, '/')
+
+    def _print(self, text=''):
+        self.out.write('%s\n' % (text,))
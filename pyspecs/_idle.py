@@ -1,55 +1,139 @@
 import os
 import sys
-import time
 from ._runner import _StepRunner
-from ._reporting import ConsoleReporter
+from ._registry import Registry
+from ._capture import OutputCapture
+from ._dependencies import DependencyGraph
+from ._sharding import Sharder
+from ._history import TimingHistory
+from ._lastfailed import LastFailed
+from ._reporting import ConsoleReporter, DurationsReporter
+from ._writers import JUnitXmlReporter, JsonLinesReporter
+from ._watcher import create_watcher, IGNORED
 from ._decorators import wait_keyboard_interrupt
 
 
 @wait_keyboard_interrupt
-def watch(path):
+def watch(path, ignore=(), **options):
     working = os.path.abspath(path)
     os.chdir(working)
     sys.path.append(working)
-    repetitions = 0
-    state = 0
-    while True:
-        new_state = sum(_checksums(working))
-        if state != new_state:
+    watcher = create_watcher(working, ignore=IGNORED + tuple(ignore))
+    graph = DependencyGraph(working)
+    try:
+        repetitions = 1
+        _display_repetitions_banner(repetitions)
+        print('Running tests...')
+        run(working, graph=graph, ignore=ignore, **options)
+        while True:
+            changed = watcher.wait()
             repetitions += 1
             _display_repetitions_banner(repetitions)
+            _display_changes(working, changed)
             print('Running tests...')
-            run(working)
-            state = new_state
-        time.sleep(.75)
+            run(working, graph=graph, changed=changed, ignore=ignore,
+                **options)
+    finally:
+        watcher.close()
 
 
-def run(path):
+def run(path, workers=1, cache=True, graph=None, changed=None,
+        junit_xml=None, jsonl=None, durations=0, profile=None,
+        capture_limit=OutputCapture.LIMIT, threads=1, concurrency=1,
+        shard=None, history=None, compare=False,
+        compare_threshold=3.0, last_failed=False, failed_first=False,
+        maxfail=0, roots=(), ignore=(), select=(), timeout=None,
+        run_timeout=None, cpu_limit=None, memory_limit=None, rewrite=True,
+        trace_depth=None, fixture_capacity=None):
     sys.path.append(path)
 
     print('running', path)
+    reporters = [ConsoleReporter(trace_depth=trace_depth)]
+    if junit_xml:
+        reporters.append(JUnitXmlReporter(junit_xml))
+    if jsonl:
+        reporters.append(JsonLinesReporter(jsonl))
+    if durations:
+        reporters.append(DurationsReporter(durations))
+    timings = None
+    if history is not None or compare or shard:
+        timings = TimingHistory(path, history or None, compare=compare,
+                                threshold=compare_threshold)
+        reporters.append(timings)
+    failures = LastFailed(path)
+    reporters.append(failures)
+    only, first, scenarios = None, (), None
+    if last_failed and failures.failed:
+        scenarios = failures.scenarios()
+        print('running the {0} scenarios of {1} spec files that failed '
+              'last time'.format(sum(map(len, scenarios.values())),
+                                 len(scenarios)))
+        only = failures.paths()
+    elif last_failed:
+        print('no failures recorded; running everything')
+    if failed_first:
+        first = failures.paths()
+    sharder = None
+    if shard:
+        sharder = Sharder.parse(shard, timings.file_durations())
+    registry = Registry().reset(retain=False, capture_limit=capture_limit)
+    for reporter in reporters:
+        registry.subscribe(reporter)
 
-    step_runner = _StepRunner()
-    step_runner.load_steps(path)
+    step_runner = _StepRunner(workers=workers, cache=cache, graph=graph,
+                              profile=profile, capture_limit=capture_limit,
+                              threads=threads, concurrency=concurrency,
+                              shard=sharder, only=only, first=first,
+                              maxfail=maxfail, roots=roots,
+                              ignore=IGNORED + tuple(ignore), select=select,
+                              scenarios=scenarios,
+                              timeout=timeout, run_timeout=run_timeout,
+                              cpu_limit=cpu_limit,
+                              memory_limit=memory_limit, rewrite=rewrite,
+                              fixture_capacity=fixture_capacity)
+    step_runner.load_steps(path, changed=changed)
+    _display_skipped(path, step_runner.skipped)
+    _display_stopped(step_runner)
+    if sharder is not None:
+        print(sharder.describe())
 
-    reporter = ConsoleReporter()
-    reporter.render(step_runner)
+    for reporter in reporters:
+        reporter.render(step_runner)
+    # the reporters were the last to read the output of this run
+    registry.capture.close()
 
 
-def _checksums(working):
-    for root, dirs, files in os.walk(working):
-        if dirs.startswith('.'):
-            continue
-        for f in files:
-            if f.endswith('.py'):
-                stats = os.stat(os.path.join(root, f))
-                yield stats.st_mtime + stats.st_size
+def _display_changes(working, changed):
+    for path in sorted(changed):
+        print('changed: {0}'.format(os.path.relpath(path, working)))
+
+
+def _display_skipped(working, skipped):
+    if not skipped:
+        return
+    print('skipped {0} spec files unaffected by the change:'
+          .format(len(skipped)))
+    for path in skipped:
+        print('  {0}'.format(os.path.relpath(path, working)))
+
+
+def _display_stopped(step_runner):
+    if step_runner.out_of_time:
+        print('ran out of the time budget of {0}s; {1} spec files did not '
+              'run to the end'.format(step_runner.run_timeout,
+                                      len(step_runner.unfinished)))
+        return
+    if not step_runner.stopped:
+        return
+    print('stopped after {0} failed scenarios; {1} spec files did not run '
+          'to the end'.format(step_runner.maxfail,
+                              len(step_runner.unfinished)))
 
 
 def _display_repetitions_banner(repetitions):
     number = ' {} '.format(repetitions)
     half_delimiter = (EVEN if not repetitions % 2 else ODD) * \
-                     ((80 - len(number)) / 2)
+                     ((80 - len(number)) // 2)
     print('\n{0}{1}{0}\n'.format(half_delimiter, number))
 
 
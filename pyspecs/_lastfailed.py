@@ -0,0 +1,98 @@
+import os
+import json
+import logging
+import tempfile
+
+from ._reporting import Reporter
+
+log = logging.getLogger(__name__)
+if str is bytes:
+    _replace = os.rename
+else:
+    _replace = os.replace
+
+
+class LastFailed(Reporter):
+    """
+    Remembers which spec files, and which of their scenarios, failed, in a
+    JSON file next to the specs. Every file that ran to the end replaces
+    its entry with the scenarios that failed this time, except that, when
+    steps were selected, the scenarios that did not run keep theirs; files
+    that did not run to the end (not selected, or cut short by --maxfail)
+    keep their entry, adding any new failures, until they are deleted. The
+    file is only rewritten when its contents change.
+    """
+    FILENAME = '.pyspecs_lastfailed.json'
+
+    def __init__(self, working, path=None):
+        self.working = os.path.abspath(working)
+        self.path = path or os.path.join(working, self.FILENAME)
+        self.failed = self._load()
+        self._failing = {}
+        self._ran = {}
+
+    def paths(self):
+        return [os.path.join(self.working, name)
+                for name in sorted(self.failed)]
+
+    def scenarios(self):
+        """
+        The failed scenarios by the path of their spec file.
+        """
+        return dict((os.path.join(self.working, name), names)
+                    for name, names in self.failed.items())
+
+    def step_exited(self, step):
+        result = step.result
+        if step.parent is not None or result.is_abort:
+            return
+        name = self._relative(step.filename)
+        self._ran.setdefault(name, set()).add(str(step))
+        if not result.is_success:
+            self._failing.setdefault(name, []).append(str(step))
+
+    def render(self, step_runner):
+        executed = set(self._relative(path)
+                       for path in step_runner.executed)
+        failed = {}
+        for name, scenarios in self.failed.items():
+            if not os.path.exists(os.path.join(self.working, name)):
+                continue
+            if name in executed:
+                if step_runner.selector is None:
+                    continue
+                ran = self._ran.get(name, ())
+                scenarios = [scenario for scenario in scenarios
+                             if scenario not in ran]
+            if scenarios:
+                failed[name] = scenarios
+        for name, scenarios in self._failing.items():
+            failed[name] = sorted(set(failed.get(name, [])) |
+                                  set(scenarios))
+        self._failing = {}
+        self._ran = {}
+        if failed == self.failed:
+            return
+        self.failed = failed
+        self._save()
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            fd, temporary = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, 'w') as stream:
+                json.dump(self.failed, stream, indent=1, sort_keys=True)
+            _replace(temporary, self.path)
+        except (IOError, OSError) as e:
+            log.warning('Could not save failures to %s: %s', self.path, e)
+
+    def _load(self):
+        try:
+            with open(self.path) as stream:
+                return dict(json.load(stream))
+        except (IOError, OSError, ValueError, TypeError):
+            return {}
+
+    def _relative(self, filename):
+        return os.path.relpath(os.path.abspath(filename or ''),
+                               self.working).replace(os.sep, '/')
@@ -0,0 +1,187 @@
+"""
+Expectations about how fast a callable is and how much memory it takes,
+registered on _Should through `should_expectation`:
+
+    the(parse_payload).should.complete_within(5)
+    the(parse_payload).should.allocate_less_than(2 * 1024 * 1024)
+"""
+import gc
+import math
+
+from ._should import should_expectation
+
+try:
+    from time import perf_counter as clock
+except ImportError:
+    from timeit import default_timer as clock
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+MIN_SAMPLE = .001
+FENCE = 1.5
+
+
+@should_expectation
+def complete_within(self, ms, repeat=30, percentile=95, warmup=3):
+    """
+    Times `repeat` samples of calls to the value (after `warmup` calls),
+    drops outliers beyond FENCE interquartile ranges from the quartiles and
+    expects the `percentile` of the rest to be within `ms` milliseconds
+    per call. Calls faster than the clock can tell apart are timed in
+    batches of at least MIN_SAMPLE seconds.
+    """
+    function = self._value
+    timings = Timings(time_calls(function, repeat, warmup))
+    took = timings.percentile(percentile)
+    self._assert(
+        action=lambda: took <= ms / 1000.0,
+        report=lambda: (self._expect + COMPLETE_WITHIN).format(
+            _name(function), ms, _ordinal(percentile), took * 1000,
+            timings.describe())
+    )
+
+
+@should_expectation
+def allocate_less_than(self, limit, repeat=3, warmup=1):
+    """
+    Expects calls to the value to have less than `limit` bytes allocated
+    at any one time, as traced by tracemalloc, in the worst of `repeat`
+    calls (after `warmup` calls, which may fill caches).
+    """
+    function = self._value
+    peaks = trace_peaks(function, repeat, warmup)
+    self._assert(
+        action=lambda: max(peaks) < limit,
+        report=lambda: (self._expect + ALLOCATE_LESS_THAN).format(
+            _name(function), limit, max(peaks),
+            ', '.join(str(peak) for peak in peaks))
+    )
+
+
+def time_calls(function, repeat, warmup):
+    """
+    The seconds per call of `repeat` samples, timed with garbage collection
+    disabled.
+    """
+    for _ in range(warmup):
+        function()
+    start = clock()
+    function()
+    number = max(1, int(MIN_SAMPLE / max(clock() - start, 1e-9)))
+
+    samples = []
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = clock()
+            for _ in range(number):
+                function()
+            samples.append((clock() - start) / number)
+    finally:
+        if enabled:
+            gc.enable()
+    return samples
+
+
+def trace_peaks(function, repeat, warmup):
+    """
+    The most bytes allocated at once during each of `repeat` calls.
+    """
+    if tracemalloc is None:
+        raise RuntimeError('Tracing allocations needs tracemalloc '
+                           '(Python 3.4 or later)')
+    for _ in range(warmup):
+        function()
+    tracing = tracemalloc.is_tracing()
+    peaks = []
+    try:
+        for _ in range(repeat):
+            if not tracing:
+                tracemalloc.start()
+            elif hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            function()
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+            if not tracing:
+                tracemalloc.stop()
+    finally:
+        if not tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+    return peaks
+
+
+class Timings(object):
+    """
+    A sample of timings (in seconds) without its outliers: those further
+    than FENCE interquartile ranges below the first or above the third
+    quartile (Tukey's fences).
+    """
+    def __init__(self, samples):
+        samples = sorted(samples)
+        low, high = _percentile(samples, 25), _percentile(samples, 75)
+        spread = (high - low) * FENCE
+        self.samples = [sample for sample in samples
+                        if low - spread <= sample <= high + spread]
+        self.outliers = len(samples) - len(self.samples)
+
+    def percentile(self, percent):
+        return _percentile(self.samples, percent)
+
+    @property
+    def mean(self):
+        return sum(self.samples) / len(self.samples)
+
+    @property
+    def stdev(self):
+        if len(self.samples) < 2:
+            return 0.0
+        mean = self.mean
+        return math.sqrt(sum((sample - mean) ** 2 for sample in self.samples)
+                         / (len(self.samples) - 1))
+
+    def describe(self):
+        return DISTRIBUTION.format(
+            len(self.samples) + self.outliers, self.outliers,
+            *[value * 1000 for value in (
+                self.samples[0], self.percentile(25), self.percentile(50),
+                self.percentile(75), self.percentile(95), self.samples[-1],
+                self.mean, self.stdev)])
+
+
+def _percentile(ordered, percent):
+    """
+    Linearly interpolated between the closest ranks.
+    """
+    if not ordered:
+        raise ValueError('No samples')
+    position = (len(ordered) - 1) * percent / 100.0
+    lower = int(math.floor(position))
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * \
+        (position - lower)
+
+
+def _name(function):
+    return getattr(function, '__name__', function)
+
+
+def _ordinal(number):
+    if 10 <= number % 100 <= 20:
+        suffix = 'th'
+    else:
+        suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(number % 10, 'th')
+    return '{0}{1}'.format(number, suffix)
+
+
+COMPLETE_WITHIN = "to complete within {1}ms ({2} percentile), but took " + \
+                  "{3:.4g}ms.\n{4}"
+ALLOCATE_LESS_THAN = "to allocate less than {1} bytes, but allocated " + \
+                     "{2} (per call: {3})."
+DISTRIBUTION = "{0} samples ({1} outliers dropped), in ms: min {2:.4g}, " + \
+               "p25 {3:.4g}, median {4:.4g}, p75 {5:.4g}, p95 {6:.4g}, " + \
+               "max {7:.4g}; mean {8:.4g} +/- {9:.2g}"
@@ -0,0 +1,104 @@
+import os
+import re
+import glob
+import pstats
+import logging
+import cProfile
+
+from ._reporting import Reporter
+
+log = logging.getLogger(__name__)
+
+
+class ScenarioProfiler(Reporter):
+    """
+    Profiles every root step (scenario) from its __enter__ to its __exit__
+    and dumps one .pstats file per scenario into the SCENARIOS subdirectory
+    of `directory`. Only subscribed when profiling was asked for, so it
+    costs nothing otherwise. `merge` then combines the files of the whole
+    run (including those written by worker processes) into MERGED, in
+    `directory`. `clear` removes those files of a previous run and leaves
+    anything else in `directory` alone.
+    """
+    EXTENSION = '.pstats'
+    MERGED = 'run' + EXTENSION
+    SCENARIOS = 'scenarios'
+
+    def __init__(self, directory, top=10):
+        self.directory = directory
+        self.scenarios = os.path.join(directory, self.SCENARIOS)
+        self.top = top
+        self.stats = None
+        self._profile = None
+
+    def clear(self):
+        if not os.path.isdir(self.scenarios):
+            os.makedirs(self.scenarios)
+        for path in self._files() + [self._merged]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def step_entered(self, step):
+        # replayed steps (from concurrent async scenarios) already ran
+        if step.parent is None and step.stop is None:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def step_exited(self, step):
+        if step.parent is not None or self._profile is None:
+            return
+        self._profile.disable()
+        self._profile.dump_stats(self._path_for(step))
+        self._profile = None
+
+    def merge(self):
+        files = self._files()
+        if not files:
+            return None
+        self.stats = pstats.Stats(files[0])
+        for path in files[1:]:
+            self.stats.add(path)
+        self.stats.dump_stats(self._merged)
+        return self.stats
+
+    def summary(self):
+        if self.stats is None:
+            return 'profile: no scenarios were profiled'
+        lines = [
+            'profile: {0} scenarios merged into {1}'.format(
+                len(self._files()), self._merged),
+            '  {0:>10} {1:>10} {2:>8}  function'.format(
+                'tottime', 'cumtime', 'calls'),
+        ]
+        ranked = sorted(self.stats.stats.items(),
+                        key=lambda item: item[1][2], reverse=True)
+        for (filename, line, name), (cc, calls, tt, ct, callers) in \
+                ranked[:self.top]:
+            lines.append('  {0:10.4f} {1:10.4f} {2:8}  {3} ({4}:{5})'.format(
+                tt, ct, calls, name, filename, line))
+        return '\n'.join(lines)
+
+    @property
+    def _merged(self):
+        return os.path.join(self.directory, self.MERGED)
+
+    def _files(self):
+        return sorted(glob.glob(
+            os.path.join(self.scenarios, '*' + self.EXTENSION)))
+
+    def _path_for(self, step):
+        name = '{0}-{1}-{2}'.format(
+            _slug(os.path.relpath(step.filename or 'unknown')),
+            step.line, _slug(step.name)[:40])
+        path = os.path.join(self.scenarios, name + self.EXTENSION)
+        suffix = 1
+        while os.path.exists(path):
+            suffix += 1
+            path = os.path.join(
+                self.scenarios, '{0}-{1}{2}'.format(
+                    name, suffix, self.EXTENSION))
+        return path
+
+
+def _slug(text):
+    return re.sub(r'[^A-Za-z0-9]+', '_', text).strip('_')
@@ -1,8 +1,55 @@
+from ._capture import OutputCapture
+from ._context import ContextVar
+
+
+class _RegistryState(object):
+    __slots__ = ('current_step', 'root_steps', 'total_steps', 'listeners',
+                 'retain', 'capture', 'selector', 'deselected', 'skipping')
+
+    def __init__(self, retain=True, capture_limit=OutputCapture.LIMIT):
+        self.current_step = None
+        self.root_steps = []
+        self.total_steps = 0
+        self.listeners = []
+        self.retain = retain
+        self.capture = OutputCapture(limit=capture_limit)
+        self.selector = None
+        self.deselected = 0
+        self.skipping = False
+
+
+class StopRun(KeyboardInterrupt):
+    """
+    Raised by the next step entered once the run was stopped early (see
+    `Registry.stop`). Being a KeyboardInterrupt, it aborts the steps still
+    running rather than being recorded as their failure.
+    """
+
+
+_state = ContextVar('pyspecs_registry')
+_default_state = _RegistryState()
+
+
 class Registry(object):
+    """
+    Tracks the step currently being executed and publishes step events
+    (`step_entered`, `step_exited`) to subscribed listeners such as
+    reporters. Root steps are kept in `root_steps` unless the registry was
+    reset with `retain=False`, in which case listeners are the only ones
+    holding on to finished scenarios. All steps of a run print into the one
+    `capture` buffer.
+
+    Given a `selector`, steps it does not select are not registered at all:
+    they only count as `deselected`, and `skipping` tells the (guarded)
+    body of such a step not to run.
+
+    The registry is a singleton, but its state is context-local: `reset`
+    gives the calling thread (or task) a fresh state of its own, so spec
+    files can run concurrently in one interpreter. Stopping, on the other
+    hand, applies to every context at once.
+    """
     _instance = None
-    _current_step = None
-    root_steps = []
-    total_steps = 0
+    _stopped = False
 
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
@@ -10,23 +57,129 @@ class Registry(object):
                                 cls, *args, **kwargs)
         return cls._instance
 
-    def reset(self):
-        self._current_step = None
-        self.root_steps = []
-        self.total_steps = 0
+    @property
+    def _state(self):
+        return _state.get(_default_state)
+
+    @property
+    def root_steps(self):
+        return self._state.root_steps
+
+    @property
+    def total_steps(self):
+        return self._state.total_steps
+
+    @property
+    def listeners(self):
+        return self._state.listeners
+
+    @property
+    def retain(self):
+        return self._state.retain
+
+    @property
+    def capture(self):
+        return self._state.capture
+
+    @property
+    def current_step(self):
+        return self._state.current_step
+
+    @property
+    def selector(self):
+        return self._state.selector
+
+    @property
+    def deselected(self):
+        return self._state.deselected
+
+    @property
+    def skipping(self):
+        return self._state.skipping
+
+    def select(self, selector):
+        self._state.selector = selector
         return self
 
+    def selects(self, step):
+        current = self._state.current_step
+        path = current.hierarchy if current is not None else []
+        path.append(str(step))
+        return self._state.selector.selects(path, step.filename)
+
+    def deselect(self, count=1):
+        self._state.deselected += count
+
+    def skip(self):
+        """
+        Skips guarded bodies until `unskip` is called.
+        """
+        self._state.skipping = True
+
+    def unskip(self):
+        self._state.skipping = False
+
+    @property
+    def stopped(self):
+        return self._stopped
+
+    def stop(self):
+        self._stopped = True
+
+    def resume(self):
+        self._stopped = False
+
+    def reset(self, retain=True, capture_limit=OutputCapture.LIMIT,
+              close=True):
+        """
+        Starts over with a new state (and output capture) in this context.
+        The previous capture is closed unless `close` is off, which is for
+        contexts whose steps are still read by an enclosing one.
+        """
+        previous = self._state
+        _state.set(_RegistryState(retain, capture_limit))
+        if close and previous is not _default_state:
+            previous.capture.close()
+        return self
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+        return self
+
+    def publish(self, event, step):
+        for listener in self._state.listeners:
+            getattr(listener, event)(step)
+
     def push(self, step):
-        self.total_steps += 1
-        previous = self._current_step
-        self._current_step = step
+        if self._stopped:
+            raise StopRun()
+        state = self._state
+        state.total_steps += 1
+        previous = state.current_step
+        state.current_step = step
 
         if previous is None:
-            self.root_steps.append(step)
+            if state.retain:
+                state.root_steps.append(step)
         else:
-            previous.steps.append(step)
+            previous.add_step(step)
         return previous
 
     def pop(self):
-        self._current_step = self._current_step.parent \
-            if self._current_step else None
+        state = self._state
+        state.current_step = state.current_step.parent \
+            if state.current_step else None
+
+    def replay(self, step):
+        """
+        Registers a finished step (and its descendants), such as one sent
+        back by a worker, as if it had just been executed here.
+        """
+        state = self._state
+        state.total_steps += 1
+        if step.parent is None and state.retain:
+            state.root_steps.append(step)
+        self.publish('step_entered', step)
+        for child in step.steps:
+            self.replay(child)
+        self.publish('step_exited', step)
@@ -1,7 +1,9 @@
+import re
 import sys
-import traceback
+import time
+import heapq
 import logging
-from ._registry import Registry
+from collections import OrderedDict
 
 log = logging.getLogger(__name__)
 if sys.version < '3':
@@ -12,61 +14,140 @@ else:
     unicode = str
 
 
-class ConsoleReporter(object):
+class Reporter(object):
+    """
+    Receives step events from the Registry while specs run, and is asked to
+    `render` (or finish writing) its report once the run is over.
+    """
+    def step_entered(self, step):
+        pass
+
+    def step_exited(self, step):
+        pass
+
+    def render(self, step_runner):
+        pass
+
+
+class ConsoleReporter(Reporter):
     """
     Makes sure spec steps and aggregated statistics are reported to the
     console.
-    This service is managed and invoked by the framework.
+    This service is managed and invoked by the framework: it subscribes to
+    the Registry's step events, prints each successful scenario as soon as
+    it finishes (with a live progress count on terminals) and holds on to
+    failed scenarios until `render` prints them with the summary.
+
+    Failed steps are printed grouped by their signature (see `signature`),
+    each group once, with the steps it affected, and with the innermost
+    `trace_depth` entries of the traceback of its first step (all of them
+    for None); no other traceback is looked at.
     """
     LIST_ITEM = unichr(0x2022)  # bullet
     INDENT = '  '
+    PROGRESS_INTERVAL = .1
+    NUMBERS = re.compile(r'0x[0-9a-fA-F]+|\d+')
 
-    def __init__(self):
-        self.out = sys.__stdout__
+    def __init__(self, out=None, trace_depth=None):
+        self.out = out or sys.stdout
+        self.trace_depth = trace_depth
         self.duration = 0
-        self.steps = 0
+        self.scenarios = 0
+        self.total_steps = 0
         self._errors = 0
         self._failures = 0
         self._passed = 0
+        self._timeouts = 0
         self._problem_reports = []
         self.captured = StringIO()
+        self._progress = getattr(self.out, 'isatty', lambda: False)()
+        self._progress_shown = 0
+        self._progress_width = 0
 
-    def render(self, step_runner):
-        registry = Registry()
-        steps = registry.root_steps
-
-        for step in steps:
-            self._gather_stats(step)
-
-        success_steps = [x for x in steps if x.result.is_success]
-        failed_steps = [x for x in steps if not x.result.is_success]
+    def step_exited(self, step):
+        self._gather_stats(step)
+        if step.parent is None:
+            self._scenario_finished(step)
+        self._show_progress()
 
-        for step in success_steps:
+    def _scenario_finished(self, step):
+        self.scenarios += 1
+        self.duration += step.duration
+        if step.result.is_success:
+            self._clear_progress()
             self.render_step(step)
-            print('')
+            self._print()
+        else:
+            self._problem_reports.append(step)
 
-        if len(failed_steps):
-            print('\n********************* FAILURES *****************\n')
+    def render(self, step_runner):
+        self._clear_progress()
 
-        for step in failed_steps:
-            self.render_step(step)
-            print('')
+        if len(self._problem_reports):
+            self._print(
+                '\n********************* FAILURES *****************\n')
+
+        for steps in self._group_failures().values():
+            self.render_failure_group(steps)
+            self._print()
 
-        print(
-            '{steps} steps, {scenarios} scenarios in {duration} seconds'
+        self._print(
+            '{steps} steps, {scenarios} scenarios in {duration:.4f} seconds'
             .format(
-                scenarios=len(steps),
-                steps=registry.total_steps,
+                scenarios=self.scenarios,
+                steps=self.total_steps,
                 duration=self.duration,
             )
         )
+        self._print(
+            '{passed} passed, {failures} failed, {errors} errors'.format(
+                passed=self._passed,
+                failures=self._failures,
+                errors=self._errors,
+            )
+        )
+        if self._timeouts:
+            self._print('{0} steps timed out'.format(self._timeouts))
+        if step_runner.deselected:
+            self._print('{0} steps deselected'.format(step_runner.deselected))
+        if step_runner.cache.enabled:
+            self._print(step_runner.cache)
+        if step_runner.fixtures:
+            self._print(step_runner.fixtures)
+        if step_runner.profiler is not None:
+            self._print(step_runner.profiler.summary())
+
+    def _print(self, text=''):
+        self.out.write('%s\n' % (text,))
+
+    def _show_progress(self):
+        if not self._progress:
+            return
+        now = time.time()
+        if now - self._progress_shown < self.PROGRESS_INTERVAL:
+            return
+        self._progress_shown = now
+        status = '{0} steps, {1} scenarios, {2} failing...'.format(
+            self.total_steps, self.scenarios, len(self._problem_reports))
+        self._progress_width = len(status)
+        self.out.write('\r' + status)
+        self.out.flush()
+
+    def _clear_progress(self):
+        if self._progress_width:
+            self.out.write('\r{0}\r'.format(' ' * self._progress_width))
+            self._progress_width = 0
+            self._progress_shown = 0
 
     def _gather_stats(self, step):
-        self.steps += 1
-        self.duration += step.duration
-        self._errors += 1 if step.result.is_error else 0
-        self._failures += 1 if step.result.is_failure else 0
-        self._passed += 1 if step.result.is_success else 0
+        # a step whose children failed still completed its own body
+        result = step.result
+        self.total_steps += 1
+        self._errors += 1 if result.is_error else 0
+        self._failures += 1 if result.is_failure else 0
+        self._timeouts += 1 if result.is_timeout else 0
+        self._passed += 1 if (
+            result.is_success or result.has_children_errors) else 0
 
     def render_step(self, step, level=0):
         if step.result.is_success or step.result.has_children_errors:
@@ -76,43 +157,146 @@ class ConsoleReporter(object):
 
     def render_successful_step(self, step, level=0):
         indent = self.INDENT * level
-        print('  | %s%s %s' % (indent, self.LIST_ITEM, step))
+        self._print('  | %s%s %s' % (indent, self.LIST_ITEM, step))
         for child in step.steps:
             self.render_step(child, level+1)
 
     def render_step_error(self, step, level):
         indent = self.INDENT * level
         letter = self.get_letter(step)
-        print('%s | %s%s' % (letter, indent, step))
-        print('%s | %sERROR:   %s'
-              % (letter, indent, step.result.exc_type.__name__))
-        print('%s | %sMESSAGE: %s' % (letter, indent, step.result.exc_val))
-        print(self._format_traceback(step.result.exc_tb, letter, level))
+        self._print('%s | %s%s' % (letter, indent, step))
+        self._render_error(step, letter, indent)
+
+    def render_failure_group(self, steps):
+        """
+        Prints the failure the `steps` share once, after all their paths.
+        """
+        first = steps[0]
+        letter = self.get_letter(first)
+        paths = [' / '.join(str(ancestor) for ancestor in _lineage(step))
+                 for step in steps]
+        self._print('%s | STEPS:   %s' % (letter, paths[0]))
+        for path in paths[1:]:
+            self._print('%s |          %s' % (letter, path))
+        self._render_error(first, letter, '')
+
+    def _render_error(self, step, letter, indent):
+        self._print('%s | %sERROR:   %s'
+                    % (letter, indent, step.result.exc_name))
+        message = str(step.result.message).split('\n')
+        self._print('%s | %sMESSAGE: %s' % (letter, indent, message[0]))
+        for line in message[1:]:
+            self._print('%s | %s         %s' % (letter, indent, line))
+        self._print(self._format_traceback(
+            step.result.innermost(self.trace_depth), letter, indent))
 
         if step.output:
-            print('----- output -----')
-            print(step.output)
-            print('------------------\n')
+            self._print('----- output -----')
+            self._print(step.output)
+            self._print('------------------\n')
 
-    def _format_traceback(self, tb, letter, level):
-        if not tb:
+    def _format_traceback(self, trace, letter, indent):
+        if not trace:
             return ''
-        indent = self.INDENT * level
-        raw_trace = traceback.format_tb(tb)
-        template = '{0} |{1} TRACE>{{0}}\n'.format(letter, indent)
-        result = '{0} |\n'.format(letter)
+        template = '{0} |{1} TRACE>{{0}}'.format(letter, indent)
+        lines = ['{0} |'.format(letter)]
+        for filename, line_number, name, code in reversed(trace):
+            lines.append(template.format(
+                'File "{0}", line {1}, in {2}'.format(
+                    filename, line_number, name)))
+            lines.append(template.format(code or ''))
+        lines.append('')
+        return '\n'.join(lines)
 
-        for t in reversed(raw_trace):
-            line_number, code = t.strip().split('\n')
-            result += template.format(line_number)
-            result += template.format(code)
+    def signature(self, step):
+        """
+        What failures of the same cause have in common: the exception type,
+        the message and where, outside pyspecs, it was raised. Errors leave
+        the numbers (and addresses) of their message out; assertion
+        messages are kept whole, since they show the values compared.
+        """
+        result = step.result
+        message = str(result.message)
+        if not result.is_failure:
+            message = self.NUMBERS.sub('#', message)
+        return result.exc_name, message, result.location
 
-        return result
+    def _group_failures(self):
+        groups = OrderedDict()
+        for scenario in self._problem_reports:
+            for step in _failed_steps(scenario):
+                groups.setdefault(self.signature(step), []).append(step)
+        return groups
 
     def get_letter(self, step):
         return (
             ' ' if step.result.is_success else
             'F' if step.result.is_failure else
             '.' if step.result.is_abort else
+            'T' if step.result.is_timeout else
             'E'
             )
+
+
+def _failed_steps(step):
+    pending = [step]
+    while pending:
+        step = pending.pop()
+        result = step.result
+        if not (result.is_success or result.has_children_errors):
+            yield step
+        pending.extend(reversed(step.steps))
+
+
+def _lineage(step):
+    lineage = []
+    while step is not None:
+        lineage.append(step)
+        step = step.parent
+    return reversed(lineage)
+
+
+class DurationsReporter(Reporter):
+    """
+    Keeps the `count` slowest scenarios (by inclusive time) and steps (by
+    self time) in bounded heaps and lists them once the run is over.
+    """
+    def __init__(self, count, out=None):
+        self.count = count
+        self.out = out or sys.stdout
+        self._scenarios = []
+        self._steps = []
+        self._seen = 0
+
+    def step_exited(self, step):
+        self._seen += 1
+        location = '{0}:{1}'.format(step.filename, step.line)
+        total, own = step.duration, step.self_duration
+        self._keep(self._steps, (own, total, self._seen, str(step), location))
+        if step.parent is None:
+            self._keep(self._scenarios,
+                       (total, own, self._seen, str(step), location))
+
+    def _keep(self, heap, entry):
+        if len(heap) < self.count:
+            heapq.heappush(heap, entry)
+        else:
+            heapq.heappushpop(heap, entry)
+
+    def render(self, step_runner):
+        self._print('\nslowest {0} scenarios:'.format(self.count))
+        for total, own, seen, step, location in sorted(
+                self._scenarios, reverse=True):
+            self._print_entry(total, own, step, location)
+
+        self._print('\nslowest {0} steps (by self time):'.format(self.count))
+        for own, total, seen, step, location in sorted(
+                self._steps, reverse=True):
+            self._print_entry(total, own, step, location)
+
+    def _print_entry(self, total, own, step, location):
+        self._print('  {0:9.4f}s total {1:9.4f}s self  {2}  ({3})'.format(
+            total, own, step, location))
+
+    def _print(self, text=''):
+        self.out.write('%s\n' % (text,))
@@ -1,11 +1,35 @@
 import os
+import time
 import logging
+import threading
+import multiprocessing
+import multiprocessing.pool
+import multiprocessing.util
+from collections import namedtuple
 
 from .framework import framework
+from ._assertions import EXPLAIN, explain
+from ._async import (SCENARIOS, RUN, CO_COROUTINE, new_event_loop,
+                     scenario_runner)
+from ._budget import StepTimeout, Watchdog, limit_resources
+from ._cache import CodeCache
+from ._capture import OutputCapture
+from ._dependencies import DependencyGraph
+from ._discovery import SpecFinder
+from ._fixtures import FIXTURES, FixtureStats
+from ._profiling import ScenarioProfiler
+from ._registry import Registry, StopRun
+from ._selection import GUARD, Selector, body_selected
+from ._watcher import IGNORED
+from ._reporting import Reporter
 
 
 log = logging.getLogger(__name__)
 
+FileResult = namedtuple(
+    'FileResult',
+    'path root_steps total_steps cache edges stopped deselected fixtures')
+
 
 class _StepRunner(object):
     """
@@ -13,25 +37,401 @@ class _StepRunner(object):
     should either be at the top level of the module or in a function or class
     that is invoked from the top-level. This service is managed and invoked
     by the framework.
+
+    With more than one worker the files are spread across a process pool.
+    Each worker records into its own Registry and sends back the (detached)
+    root steps of every file, which are replayed into this process'
+    Registry in discovery order so listeners see the same events as in a
+    serial run.
+
+    Given a DependencyGraph, the runner records the project modules each
+    spec imports, and `load_steps(..., changed=...)` only runs the spec
+    files affected by the changed paths (the rest end up in `skipped`).
+
+    With more than one thread the files run on a thread pool instead. The
+    Registry and stdout capture are context-local, so every thread records
+    its own steps, and nothing has to be pickled; on free-threaded builds
+    of CPython this runs spec files on several cores at once.
+
+    Spec files using `async with` steps run on one event loop shared by the
+    whole run; up to `concurrency` root scenarios of a file run at once.
+
+    Spec files are found under the working directory and any other `roots`
+    by a SpecFinder, which skips `ignore`d names and keeps an index of the
+    tree unless caching is disabled.
+
+    Given `select` patterns, only the steps they select (see Selector) run,
+    and the number of steps skipped ends up in `deselected`. Given
+    `scenarios` names, only the scenarios so named run.
+
+    Given a Sharder as `shard`, only the spec files of that shard run.
+    Given `only`, only those of the spec files run; given `first`, those
+    run before the others. With `maxfail`, the run stops (cancelling work
+    still queued in or running on pools) once that many scenarios failed;
+    the files that did not run to the end are left in `unfinished`.
+
+    Given a `timeout`, every step may take that many seconds at most (see
+    Watchdog); given a `run_timeout`, the run stops once it took that long.
+    Steps running out of time are recorded as timed out, and a spec file
+    that is stuck outside of any step is given up on. Worker processes
+    can be limited to `cpu_limit` seconds of CPU time and `memory_limit`
+    bytes of address space per spec file.
+
+    The `assert` statements of spec files are rewritten to explain their
+    failures, unless `rewrite` is off.
+
+    Fixtures live for as long as the process (see Fixtures), which keeps
+    values weighing up to `fixture_capacity`; how many of them were set up
+    and reused during a run ends up in `fixtures`.
+
+    Given a `profile` directory, every scenario is profiled into it and the
+    profiles are merged once all files have run. Profiling cannot be
+    combined with threads or concurrent async scenarios.
     """
-    def load_steps(self, working):
-        for root, dirs, files in os.walk(working):
-            for f in files:
-                if self._is_test_module(f):
-                    path = os.path.join(root, f)
-                    self._exec_in(path)
+    GRACE = 1
+
+    def __init__(self, workers=1, cache=True, graph=None, profile=None,
+                 capture_limit=OutputCapture.LIMIT, threads=1,
+                 concurrency=1, shard=None, only=None, first=(),
+                 maxfail=0, roots=(), ignore=IGNORED, select=(),
+                 scenarios=None, timeout=None, run_timeout=None,
+                 cpu_limit=None, memory_limit=None, rewrite=True,
+                 fixture_capacity=None):
+        self.workers = self._resolve_workers(workers)
+        self.threads = self._resolve_workers(threads)
+        if self.workers > 1 and self.threads > 1:
+            raise ValueError('Use either worker processes or threads')
+        if profile and self.threads > 1:
+            # only one profiler can be active per process (Python 3.12+)
+            raise ValueError('Profiling is not supported with threads')
+        self.capture_limit = capture_limit
+        self.concurrency = max(1, int(concurrency))
+        if profile and self.concurrency > 1:
+            # interleaved scenarios cannot be told apart by a profiler
+            raise ValueError('Profiling is not supported with concurrent '
+                             'async scenarios')
+        self._loop = None
+        self.select = tuple(select)
+        self.scenarios = scenarios
+        self.selector = None
+        if self.select or scenarios is not None:
+            self.selector = Selector(self.select, scenarios)
+        self.rewrite = rewrite
+        self.cache = CodeCache(enabled=cache,
+                               select=self.selector is not None,
+                               rewrite=rewrite)
+        self.roots = tuple(roots)
+        self.finder = SpecFinder(ignore=ignore, cached=cache)
+        self.graph = graph
+        self.shard = shard
+        self.only = only
+        self.first = first
+        self.maxfail = maxfail
+        self.timeout = timeout
+        self.run_timeout = run_timeout
+        self.deadline = None
+        self.cpu_limit = cpu_limit
+        self.memory_limit = memory_limit
+        self.profiler = ScenarioProfiler(profile) if profile else None
+        self.skipped = []
+        self.executed = []
+        self.unfinished = []
+        self.stopped = False
+        self.out_of_time = False
+        self.deselected = 0
+        self.fixture_capacity = fixture_capacity
+        if fixture_capacity is not None:
+            FIXTURES.capacity = fixture_capacity
+        self.fixtures = FixtureStats()
+
+    def load_steps(self, working, changed=None):
+        paths = list(self.find_spec_files(working))
+        if self.shard is not None:
+            paths = self.shard.select(working, paths)
+        paths = self._prioritize(paths)
+        if changed is not None and self.graph is not None:
+            selected = self.graph.affected(paths, changed)
+            self.skipped = [path for path in paths if path not in selected]
+            self.graph.evict(changed)
+            paths = selected
+        if self.profiler is not None:
+            self.profiler.clear()
+        registry = Registry().select(self.selector)
+        registry.resume()
+        deselected = registry.deselected
+        limit = _FailureLimit(self.maxfail) if self.maxfail else None
+        if limit is not None:
+            registry.subscribe(limit)
+        if self.run_timeout:
+            self.deadline = time.time() + self.run_timeout
+        watchdog = self._watchdog()
+        if (self.cpu_limit or self.memory_limit) and self.workers == 1:
+            log.warning('CPU and memory limits only apply to worker '
+                        'processes')
+        self.executed = []
+        self.fixtures = FixtureStats()
+        fixtures = FIXTURES.totals.stats()
+        try:
+            if self.workers > 1 and len(paths) > 1:
+                self._exec_in_pool(paths)
+            elif self.threads > 1 and len(paths) > 1:
+                self._exec_in_threads(paths)
+            else:
+                self._exec_serially(paths)
+        except StopRun:
+            log.debug('Stopped early')
+        except StepTimeout as e:
+            log.debug('Stopped: %s', e)
+        finally:
+            if watchdog is not None:
+                watchdog.stop()
+                registry.listeners.remove(watchdog)
+            self.close()
+            self.stopped = registry.stopped
+            self.out_of_time = self.deadline is not None and \
+                time.time() >= self.deadline
+            registry.resume()
+            if limit is not None:
+                registry.listeners.remove(limit)
+        self.deselected = registry.deselected - deselected
+        self.fixtures.merge(_delta(FIXTURES.totals.stats(), fixtures))
+        executed = set(self.executed)
+        self.unfinished = [path for path in paths if path not in executed]
+        if self.profiler is not None:
+            self.profiler.merge()
+
+    def _watchdog(self, cpu=None):
+        if self.timeout is None and self.deadline is None and not cpu:
+            return None
+        if self.threads > 1 and self.timeout is not None:
+            log.warning('Step time budgets are not enforced in pool threads')
+        deadline = self.deadline
+        if deadline is not None and self.workers > 1:
+            # workers stop by themselves, and should get to send back what
+            # they have done by then
+            deadline += self.GRACE
+        watchdog = Watchdog(self.timeout, deadline, cpu)
+        # first in line, so it is not held up by reporters
+        Registry().listeners.insert(0, watchdog)
+        return watchdog.start()
 
-    def _is_test_module(self, f):
-        return f.endswith('.pyspecs')
+    def _exec_serially(self, paths):
+        registry = Registry()
+        if self.profiler is not None:
+            # first in line, so it stops before reporters handle the exit
+            registry.listeners.insert(0, self.profiler)
+        try:
+            for path in paths:
+                self._exec_in(path)
+                self.executed.append(path)
+        finally:
+            if self.profiler is not None:
+                registry.listeners.remove(self.profiler)
+
+    def _prioritize(self, paths):
+        if self.only is not None:
+            only = set(os.path.abspath(path) for path in self.only)
+            paths = [path for path in paths if os.path.abspath(path) in only]
+        first = set(os.path.abspath(path) for path in self.first)
+        ahead = [path for path in paths if os.path.abspath(path) in first]
+        chosen = set(ahead)
+        return ahead + [path for path in paths if path not in chosen]
+
+    def find_spec_files(self, working):
+        roots = [working] + [root for root in self.roots if root != working]
+        return self.finder.find(roots)
 
     def _exec_in(self, path):
         log.debug('Procesing file %s', path)
 
         config = framework()
-        with open(path) as fd:
-            source = ''
-            for line in fd.readlines():
-                source += line
-        code = compile(source, path, 'exec')
-        exec(code, config)
+        config['__file__'] = path
+        config[GUARD] = body_selected
+        config[EXPLAIN] = explain
+        code = self.cache.compile(path)
+        try:
+            if self.graph is None:
+                self._exec(code, config)
+            else:
+                with self.graph.recording():
+                    self._exec(code, config)
+        except StepTimeout as e:
+            if e.recorded:
+                log.debug('Gave up on %s: %s', path, e)
+            else:
+                # stuck outside of any step, where no one reports it
+                log.warning('Gave up on %s: %s', path, e, exc_info=True)
         return config
+
+    def _exec(self, code, config):
+        if not code.co_flags & CO_COROUTINE:
+            exec(code, config)
+            return
+        config[SCENARIOS] = []
+        config[RUN] = scenario_runner(
+            self.loop, self.concurrency, self.capture_limit)
+        self.loop.run_until_complete(eval(code, config))
+
+    @property
+    def loop(self):
+        if self._loop is None:
+            self._loop = new_event_loop()
+        return self._loop
+
+    def close(self):
+        if self._loop is not None:
+            self._loop.close()
+            self._loop = None
+
+    def _exec_in_pool(self, paths):
+        log.debug('Spreading %d files across %d workers',
+                  len(paths), self.workers)
+        self._collect(paths, multiprocessing.Pool(
+            min(self.workers, len(paths)),
+            initializer=_init_worker,
+            initargs=(self._worker_options(),),
+        ))
+
+    def _exec_in_threads(self, paths):
+        log.debug('Spreading %d files across %d threads',
+                  len(paths), self.threads)
+        self._collect(paths, multiprocessing.pool.ThreadPool(
+            min(self.threads, len(paths)),
+            initializer=_init_worker,
+            initargs=(self._worker_options(),),
+        ))
+
+    def _collect(self, paths, pool):
+        registry = Registry()
+        try:
+            for result in pool.imap(_exec_in_worker, paths):
+                self.cache.merge(result.cache)
+                if self.graph is not None:
+                    self.graph.add(result.edges)
+                for step in result.root_steps:
+                    registry.replay(step)
+                registry.deselect(result.deselected)
+                self.fixtures.merge(result.fixtures)
+                if not result.stopped:
+                    self.executed.append(result.path)
+                if registry.stopped:
+                    break
+        finally:
+            if registry.stopped:
+                pool.terminate()
+            else:
+                pool.close()
+            if not registry.stopped or not isinstance(
+                    pool, multiprocessing.pool.ThreadPool):
+                # threads stuck past a time budget cannot be stopped, but
+                # being daemons they do not hold up the exit either
+                pool.join()
+
+    def _worker_options(self):
+        graph = None
+        if self.graph is not None:
+            graph = DependencyGraph(self.graph.root)
+        profile = None
+        if self.profiler is not None:
+            profile = self.profiler.directory
+        run_timeout = None
+        if self.deadline is not None:
+            run_timeout = max(self.deadline - time.time(), 0)
+        return dict(cache=self.cache.enabled, graph=graph, profile=profile,
+                    capture_limit=self.capture_limit,
+                    concurrency=self.concurrency, select=self.select,
+                    scenarios=self.scenarios,
+                    timeout=self.timeout, run_timeout=run_timeout,
+                    cpu_limit=self.cpu_limit,
+                    memory_limit=self.memory_limit, rewrite=self.rewrite,
+                    fixture_capacity=self.fixture_capacity)
+
+    @staticmethod
+    def _resolve_workers(workers):
+        if workers == 'auto':
+            return multiprocessing.cpu_count()
+        workers = int(workers)
+        if workers < 1:
+            raise ValueError('At least one worker is required')
+        return workers
+
+
+# one runner per worker process or pool thread
+_worker = threading.local()
+
+
+def _init_worker(options):
+    options = dict(options)
+    if options['graph'] is not None:
+        # pool threads share the options, but each records its own edges
+        options['graph'] = DependencyGraph(options['graph'].root)
+    _worker.runner = runner = _StepRunner(**options)
+    if multiprocessing.current_process().name != 'MainProcess':
+        # pool processes exit without running atexit hooks
+        multiprocessing.util.Finalize(None, FIXTURES.clear, exitpriority=0)
+    if runner.run_timeout is not None:
+        runner.deadline = time.time() + runner.run_timeout
+
+
+def _exec_in_worker(path):
+    runner = _worker.runner
+    stopped = Registry().stopped
+    in_process = multiprocessing.current_process().name != 'MainProcess'
+    # steps of a pool thread's previous file may still be read by reporters
+    registry = Registry().reset(
+        capture_limit=runner.capture_limit, close=in_process).select(
+        runner.selector)
+    if runner.profiler is not None:
+        registry.subscribe(runner.profiler)
+    cache = runner.cache
+    before = cache.stats()
+    fixtures = FIXTURES.totals.stats()
+    watchdog = None
+    restore = None
+    if in_process:
+        watchdog = runner._watchdog(runner.cpu_limit)
+        if runner.cpu_limit or runner.memory_limit:
+            restore = limit_resources(runner.cpu_limit, runner.memory_limit)
+    try:
+        if not stopped:
+            runner._exec_in(path)
+    except StopRun:
+        # a pool thread, stopped by the failures the main thread counted
+        stopped = True
+    finally:
+        if restore is not None:
+            restore()
+        if watchdog is not None:
+            watchdog.stop()
+        # workers outlive their last file, so they close the loop per file
+        runner.close()
+    delta = _delta(cache.stats(), before)
+    graph = runner.graph
+    edges = graph.drain() if graph is not None else []
+    # pool threads share the fixtures of the main thread, which counts them
+    fixtures = _delta(FIXTURES.totals.stats(), fixtures) if in_process \
+        else (0, 0, 0, 0)
+    return FileResult(
+        path, registry.root_steps, registry.total_steps, delta, edges,
+        stopped, registry.deselected, fixtures)
+
+
+def _delta(after, before):
+    return tuple(a - b for a, b in zip(after, before))
+
+
+class _FailureLimit(Reporter):
+    """
+    Stops the run once `maxfail` scenarios failed or errored.
+    """
+    def __init__(self, maxfail):
+        self.maxfail = maxfail
+        self.failures = 0
+
+    def step_exited(self, step):
+        result = step.result
+        if step.parent is None and not (result.is_success or
+                                        result.is_abort):
+            self.failures += 1
+            if self.failures >= self.maxfail:
+                Registry().stop()
@@ -0,0 +1,77 @@
+import os
+import re
+import ast
+import fnmatch
+
+from ._registry import Registry
+
+GUARD = '__pyspecs_selected__'
+
+
+class Selector(object):
+    """
+    Selects steps by the path of step names leading to them, such as
+    'given two operands / when supplied to add'. Each segment of a pattern
+    matches the step at the same depth, counting from the scenario, either
+    as a case-insensitive substring or, when it has wildcards, as a glob;
+    underscores stand for spaces as they do in step names. A step is
+    selected when every segment down to its depth matches, so that the
+    ancestors of the steps a pattern names run (though only as far as
+    needed to reach them) and their descendants run in full. A step any of
+    the `patterns` selects is selected.
+
+    Given `scenarios`, a mapping of spec file paths to scenario names, only
+    the scenarios with exactly those names in those files (and their steps)
+    are selected, and the patterns, if any, choose among them.
+    """
+    def __init__(self, patterns, scenarios=None):
+        self.patterns = [
+            [_matcher(segment) for segment in pattern.split('/')
+             if segment.strip()]
+            for pattern in patterns
+        ]
+        self.scenarios = None if scenarios is None else dict(
+            (os.path.abspath(filename), frozenset(names))
+            for filename, names in scenarios.items())
+
+    def selects(self, path, filename=None):
+        """
+        `path` holds the names of the step's ancestors and the step itself,
+        outermost first; `filename` is the spec file it is in.
+        """
+        if self.scenarios is not None and path[0] not in self.scenarios.get(
+                os.path.abspath(filename or ''), ()):
+            return False
+        return not self.patterns or any(
+            all(matches(name) for matches, name in zip(segments, path))
+            for segments in self.patterns)
+
+
+def _matcher(segment):
+    segment = segment.strip().replace('_', ' ').lower()
+    if any(wildcard in segment for wildcard in '*?['):
+        pattern = fnmatch.translate(segment)
+    else:
+        pattern = '.*' + re.escape(segment)
+    match = re.compile(pattern, re.IGNORECASE | re.DOTALL).match
+    return lambda name: match(name) is not None
+
+
+def guard_bodies(tree):
+    """
+    Wraps the body of every `with` statement in `if GUARD():`, so that the
+    body of a step the Registry is skipping does not run.
+    """
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.With, getattr(ast, 'AsyncWith', ast.With))):
+            guard = ast.parse('if {0}():\n    pass\n'.format(GUARD)).body[0]
+            guard.body = node.body
+            for created in ast.walk(guard.test):
+                ast.copy_location(created, node)
+            ast.copy_location(guard, node.body[0])
+            node.body = [guard]
+    return tree
+
+
+def body_selected():
+    return not Registry().skipping
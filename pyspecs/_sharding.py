@@ -0,0 +1,82 @@
+import os
+import zlib
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class Sharder(object):
+    """
+    Deterministically splits spec files into `count` shards, of which
+    `select` keeps shard `index` (1-based). Given a history of per-file
+    durations, files are dealt out longest first, each to the shard
+    expected to finish first so far; files missing from the history are
+    expected to take the mean time of those in it. Without any history the
+    files are split by a hash of their path, which is the same on every
+    machine. `loads` holds the (files, expected seconds) of every shard,
+    with None seconds when hashing.
+    """
+    def __init__(self, index, count, history=None):
+        if not 1 <= index <= count:
+            raise ValueError(
+                'Shard {0} is not one of 1 to {1}'.format(index, count))
+        self.index = index
+        self.count = count
+        self.history = history or {}
+        self.loads = []
+
+    @classmethod
+    def parse(cls, shard, history=None):
+        try:
+            index, count = [int(part) for part in shard.split('/')]
+        except ValueError:
+            raise ValueError('Expected the shard as K/N, not {0!r}'
+                             .format(shard))
+        return cls(index, count, history)
+
+    def select(self, working, paths):
+        names = [_relative(working, path) for path in paths]
+        chosen = set(self.split(names)[self.index - 1])
+        return [path for path, name in zip(paths, names) if name in chosen]
+
+    def split(self, names):
+        shards = [[] for _ in range(self.count)]
+        known = [self.history[name] for name in names
+                 if name in self.history]
+        if not known:
+            for name in names:
+                shards[_hash(name) % self.count].append(name)
+            self.loads = [(len(shard), None) for shard in shards]
+            return shards
+
+        default = sum(known) / len(known)
+        expected = [0.0] * self.count
+        for name in sorted(
+                names, key=lambda n: (-self.history.get(n, default), n)):
+            emptiest = min(range(self.count),
+                           key=lambda i: (expected[i], i))
+            shards[emptiest].append(name)
+            expected[emptiest] += self.history.get(name, default)
+        self.loads = list(zip([len(shard) for shard in shards], expected))
+        return shards
+
+    def describe(self):
+        balanced = any(seconds is not None for files, seconds in self.loads)
+        lines = ['shard {0}/{1}, {2}:'.format(
+            self.index, self.count,
+            'balanced by duration history' if balanced else
+            'split by path (no duration history yet)')]
+        for number, (files, seconds) in enumerate(self.loads, 1):
+            lines.append('  {0} shard {1}: {2} files{3}'.format(
+                '*' if number == self.index else ' ', number, files,
+                ', ~{0:.2f}s expected'.format(seconds) if balanced else ''))
+        return '\n'.join(lines)
+
+
+def _relative(working, path):
+    return os.path.relpath(os.path.abspath(path),
+                           os.path.abspath(working)).replace(os.sep, '/')
+
+
+def _hash(name):
+    return zlib.crc32(name.encode('utf-8')) & 0xffffffff
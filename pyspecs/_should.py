@@ -1,7 +1,13 @@
+from ._diff import DiffLimits, describe_difference, shorten
+
+
 class _Should(object):
     """
-    Should-style assertion class.
+    Should-style assertion class. Failure messages show values bounded by
+    `limits` (see DiffLimits), which may be changed for all assertions.
     """
+    limits = DiffLimits()
+
     def __init__(self, value):
         self._value = value
         self._invert = None
@@ -22,73 +28,80 @@ class _Should(object):
     def equal(self, expected):
         self._assert(
             lambda: expected == self._value,
-            lambda: (self._expect + EQUAL).format(self._value, expected)
+            lambda: (self._expect + EQUAL).format(
+                self._shown(self._value), self._shown(expected)) +
+            self._difference(self._value, expected)
         )
 
     def be_a(self, expected_type):
         self._assert(
             lambda: type(self._value) == expected_type,
             lambda: (self._expect + BE_A).format(
-                self._value, expected_type, type(self._value))
+                self._shown(self._value), expected_type, type(self._value))
         )
 
     def contain(self, item):
         self._assert(
             action=lambda: item in self._value,
-            report=lambda: (self._expect + CONTAIN).format(self._value, item)
+            report=lambda: (self._expect + CONTAIN).format(
+                self._shown(self._value), self._shown(item))
         )
 
     def be_in(self, collection):
         self._assert(
             action=lambda: self._value in collection,
-            report=lambda: (self._expect + IN).format(self._value, collection)
+            report=lambda: (self._expect + IN).format(
+                self._shown(self._value), self._shown(collection))
         )
 
     def be_greater_than(self, lesser):
         self._assert(
             action=lambda: self._value > lesser,
-            report=lambda: (
-                self._expect + GREATER_THAN).format(self._value, lesser)
+            report=lambda: (self._expect + GREATER_THAN).format(
+                self._shown(self._value), self._shown(lesser))
         )
 
     def be_less_than(self, greater):
         self._assert(
             action=lambda: self._value < greater,
-            report=lambda: (
-                self._expect + LESS_THAN).format(self._value, greater)
+            report=lambda: (self._expect + LESS_THAN).format(
+                self._shown(self._value), self._shown(greater))
         )
 
     def be_greater_than_or_equal_to(self, lesser):
         self._assert(
             action=lambda: self._value >= lesser,
-            report=lambda: (
-                self._expect + GREATER_THAN_EQUAL).format(self._value, lesser)
+            report=lambda: (self._expect + GREATER_THAN_EQUAL).format(
+                self._shown(self._value), self._shown(lesser))
         )
 
     def be_less_than_or_equal_to(self, greater):
         self._assert(
             action=lambda: self._value <= greater,
-            report=lambda: (
-                self._expect + LESS_THAN_EQUAL).format(self._value, greater)
+            report=lambda: (self._expect + LESS_THAN_EQUAL).format(
+                self._shown(self._value), self._shown(greater))
         )
 
     def be(self, thing):
         self._assert(
             action=lambda: self._value is thing,
-            report=lambda: (self._expect + BE).format(self._value, thing)
+            report=lambda: (self._expect + BE).format(
+                self._shown(self._value), self._shown(thing))
         )
 
     def be_between(self, first, last):
         self._assert(
             action=lambda: first < self._value < last,
-            report=lambda: (
-                self._expect + BETWEEN).format(self._value, first, last)
+            report=lambda: (self._expect + BETWEEN).format(
+                self._shown(self._value), self._shown(first),
+                self._shown(last))
         )
 
     def be_empty(self):
         self._assert(
             action=lambda: not len(self._value),
-            report=lambda: (self._expect + BE_EMPTY).format(self._value)
+            report=lambda: (self._expect + BE_EMPTY).format(
+                self._shown(self._value))
         )
 
     def raise_a(self, exception, message=None):
@@ -115,6 +128,19 @@ class _Should(object):
         """
         self.raise_a(exception, message)
 
+    def _shown(self, value):
+        return shorten(value, self.limits)
+
+    def _difference(self, actual, expected):
+        """
+        Where `actual` differs from `expected`, on lines of its own, if
+        they do differ and their difference is worth spelling out.
+        """
+        if self._invert:
+            return ''
+        return ''.join('\n' + line for line in
+                       describe_difference(actual, expected, self.limits))
+
     def _assert(self, action, report):
         if self._invert is None:
             raise AssertionError(PREPARATION_ERROR)
@@ -1,17 +1,38 @@
+import os
 import sys
 import time
 import logging
+import traceback
 from ._registry import Registry
+from ._budget import StepTimeout, take_timeout
+from ._context import redirect_stdout, restore_stdout
 
 
 log = logging.getLogger(__name__)
 if sys.version < '3':
-    from StringIO import StringIO
+    intern = intern  # noqa
 else:
-    from io import StringIO
+    intern = sys.intern
+
+try:
+    from time import perf_counter_ns as clock
+except ImportError:
+    _perf_counter = getattr(time, 'perf_counter', time.time)
+
+    def clock():
+        return int(_perf_counter() * 1e9)
+
+PACKAGE = os.path.dirname(os.path.abspath(__file__)) + os.sep
 
 
 class Result(object):
+    """
+    The outcome of a step. Outcomes without an exception are shared
+    (see `Result.shared`); only failing steps get a Result of their own.
+    """
+    __slots__ = ('kind', 'exc_type', 'exc_val', 'exc_tb',
+                 '_exc_name', '_message', '_trace')
+
     SUCCESS = 'success'
     ERROR = 'error'
     ERROR = 'error'
@@ -19,12 +40,21 @@ class Result(object):
     ABORT = 'abort'
     NOT_EXECUTED = 'not executed'
     CHILD_ERROR = 'child error'
+    DESELECTED = 'deselected'
+    TIMEOUT = 'timeout'
 
-    def __init__(self):
-        self.kind = self.NOT_EXECUTED
+    def __init__(self, kind=NOT_EXECUTED):
+        self.kind = kind
         self.exc_type = None
         self.exc_val = None
         self.exc_tb = None
+        self._exc_name = None
+        self._message = None
+        self._trace = None
+
+    @classmethod
+    def shared(cls, kind):
+        return _SHARED_RESULTS[kind]
 
     def set_exception(self, exc_type, exc_val, exc_tb):
         self.exc_type = exc_type
@@ -37,9 +67,89 @@ class Result(object):
             self.kind = self.FAILURE
         elif isinstance(exc_val, KeyboardInterrupt):
             self.kind = self.ABORT
+        elif isinstance(exc_val, StepTimeout):
+            self.kind = self.TIMEOUT
         else:
             self.kind = self.ERROR
 
+    @property
+    def exc_name(self):
+        if self.exc_type is None:
+            return self._exc_name
+        return self.exc_type.__name__
+
+    @property
+    def message(self):
+        if self.exc_type is None:
+            return self._message
+        return str(self.exc_val)
+
+    @property
+    def trace(self):
+        """
+        The traceback as (filename, line number, function, code) tuples,
+        which survive being shipped across process boundaries.
+        """
+        if self.exc_tb is None:
+            return self._trace or []
+        return [tuple(frame) for frame in traceback.extract_tb(self.exc_tb)]
+
+    def innermost(self, depth=None):
+        """
+        The `depth` innermost entries of `trace` (all of them for None),
+        reading the source of those only.
+        """
+        if depth is None:
+            return self.trace
+        if not depth:
+            return []
+        if self.exc_tb is None:
+            return (self._trace or [])[-depth:]
+        tb, skip = self.exc_tb, -depth
+        while tb is not None:
+            tb, skip = tb.tb_next, skip + 1
+        tb = self.exc_tb
+        for _ in range(max(skip, 0)):
+            tb = tb.tb_next
+        return [tuple(frame) for frame in traceback.extract_tb(tb)]
+
+    @property
+    def location(self):
+        """
+        The (filename, line number) of the innermost frame of the traceback
+        outside pyspecs itself (the spec or the code it calls), found
+        without extracting the traceback.
+        """
+        if self.exc_tb is None:
+            frames = [tuple(frame[:2]) for frame in self._trace or ()]
+        else:
+            frames = []
+            tb = self.exc_tb
+            while tb is not None:
+                frames.append((tb.tb_frame.f_code.co_filename, tb.tb_lineno))
+                tb = tb.tb_next
+        for frame in reversed(frames):
+            if not os.path.abspath(frame[0]).startswith(PACKAGE):
+                return frame
+        return frames[-1] if frames else None
+
+    def __getstate__(self):
+        return dict(
+            kind=self.kind,
+            exc_name=self.exc_name,
+            message=self.message,
+            trace=self.trace,
+        )
+
+    def __setstate__(self, state):
+        self.kind = state['kind']
+        self.exc_type = None
+        self.exc_val = None
+        self.exc_tb = None
+        self._exc_name = state['exc_name']
+        self._message = state['message']
+        self._trace = state['trace']
+
     @property
     def is_success(self):
         return self.kind == self.SUCCESS
@@ -56,6 +166,10 @@ class Result(object):
     def is_abort(self):
         return self.kind == self.ABORT
 
+    @property
+    def is_timeout(self):
+        return self.kind == self.TIMEOUT
+
     @property
     def has_children_errors(self):
         return self.kind == self.CHILD_ERROR
@@ -64,73 +178,278 @@ class Result(object):
         return self.kind
 
 
+_SHARED_RESULTS = dict(
+    (kind, Result(kind))
+    for kind in (Result.NOT_EXECUTED, Result.SUCCESS, Result.CHILD_ERROR,
+                 Result.DESELECTED)
+)
+_DESELECTED = _SHARED_RESULTS[Result.DESELECTED]
+
+
 class Step(object):
-    def __init__(self, kind, name, registry=None, timer=time.time):
+    """
+    A named, timed scope of a spec. `timer` returns integer nanoseconds from
+    a monotonic clock; `start` and `stop` are taken from it as the step is
+    entered and exited, and `filename`/`line` record where it was entered.
+    Whatever the step prints goes to the registry's shared OutputCapture,
+    of which the step only remembers its start and stop offsets. Steps are
+    async context managers as well, for specs of asyncio code.
+
+    A step its registry's selector does not select is neither registered
+    nor timed, and the registry skips its body (see `guard_bodies`).
+
+    A step can be given a time budget of its own with `within`, which a
+    Watchdog enforces in place of the default budget of the run.
+
+    Suites create a great many steps, most of which pass silently, so steps
+    use slots, leaf steps share an empty `steps` tuple and passing steps
+    share their Result.
+    """
+    __slots__ = ('kind', 'name', 'timer', 'start', 'stop', 'filename',
+                 'line', 'parent', 'steps', 'result', '_stdout_token',
+                 'capture', 'output_start', 'output_stop', 'registry',
+                 '_output', 'budget')
+    _DETACHED = ('kind', 'name', 'start', 'stop', 'filename', 'line',
+                 'parent', 'steps', 'result')
+
+    def __init__(self, kind, name, registry=None, timer=clock):
         self.kind = kind
         self.name = name
         self.timer = timer
-        self.start = timer()
+        self.start = None
         self.stop = None
+        self.filename = None
+        self.line = None
         self.parent = None
-        self.steps = []
-        self.result = Result()
-        self.previous_stdout = sys.stdout
-        self.stdout = StringIO()
+        self.steps = ()
+        self.result = Result.shared(Result.NOT_EXECUTED)
+        self._stdout_token = None
+        self.capture = None
+        self.output_start = None
+        self.output_stop = None
         self.registry = registry or Registry()
+        self._output = ''
+        self.budget = None
+
+    def within(self, seconds):
+        """
+        Gives this step a time budget, as in
+        `with when.reading_the_reply.within(2):`.
+        """
+        self.budget = seconds
+        return self
+
+    def add_step(self, step):
+        if self.steps:
+            self.steps.append(step)
+        else:
+            self.steps = [step]
 
     @property
     def duration(self):
-        return self.stop - self.start
+        """
+        Inclusive wall-clock time in seconds.
+        """
+        return (self.stop - self.start) / 1e9
+
+    @property
+    def self_duration(self):
+        """
+        Exclusive time in seconds: the duration minus the time spent in
+        child steps.
+        """
+        return (self.stop - self.start -
+                sum(x.stop - x.start for x in self.steps)) / 1e9
 
     @property
     def output(self):
-        return (
-            self.stdout.getvalue() +
-            ''.join([x.output for x in self.steps])
-            )
+        """
+        What this step and its descendants printed.
+        """
+        if self.capture is None:
+            return self._output + ''.join([x.output for x in self.steps])
+        return self.capture.read(self.output_start, self.output_stop)
+
+    @property
+    def own_output(self):
+        """
+        What this step printed itself, without its descendants' output.
+        """
+        if self.capture is None:
+            return self._output
+        pieces = []
+        position = self.output_start
+        for child in self.steps:
+            pieces.append(self.capture.read(position, child.output_start))
+            position = child.output_stop
+        pieces.append(self.capture.read(position, self.output_stop))
+        return ''.join(pieces)
+
+    @property
+    def hierarchy(self):
+        """
+        The names of this step's ancestors and itself, outermost first.
+        """
+        names = []
+        step = self
+        while step is not None:
+            names.append(str(step))
+            step = step.parent
+        return names[::-1]
 
     def write(self, stream):
-        self.stdout.write(stream)
+        self.registry.capture.write(stream)
 
     def __enter__(self):
+        self._enter(sys._getframe(1))
+
+    def __aenter__(self):
+        self._enter(sys._getframe(1))
+        return _Ready(None)
+
+    def _enter(self, caller):
         log.debug('Entering in %s', self.name)
+        self.filename = caller.f_code.co_filename
+        self.line = caller.f_lineno
+        if self.registry.selector is not None and \
+                not self.registry.selects(self):
+            self.result = _DESELECTED
+            self.registry.deselect()
+            self.registry.skip()
+            return
         self.parent = self.registry.push(self)
-        sys.stdout = self.stdout
+        self.registry.publish('step_entered', self)
+        self.capture = self.registry.capture
+        if self.parent is None:
+            self.capture.start_scenario()
+        self._stdout_token = redirect_stdout(self.capture)
+        self.output_start = self.capture.tell()
+        self.start = self.timer()
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        timeout = _timeout_of(exc_type)
+        if timeout is not None:
+            return self._exit_timed_out(timeout, exc_tb)
+        return self._exit(exc_type, exc_val, exc_tb)
+
+    def _exit(self, exc_type, exc_val, exc_tb):
+        if self.result is _DESELECTED:
+            self.registry.unskip()
+            return exc_type is None or not issubclass(
+                exc_type, KeyboardInterrupt)
         self.stop = self.timer()
+        self.output_stop = self.capture.tell()
         log.debug('Exiting from %s with %s,%s,%s',
                   self.name, exc_type, exc_val, exc_tb)
 
         self.registry.pop()
-        sys.stdout = self.previous_stdout
+        restore_stdout(self._stdout_token)
+        self._stdout_token = None
 
         self._set_result(exc_type, exc_val, exc_tb)
+        self.registry.publish('step_exited', self)
+        if exc_type is not None and issubclass(exc_type, KeyboardInterrupt):
+            log.debug('Aborting')
+            raise exc_val
+        if isinstance(exc_val, StepTimeout):
+            exc_val.recorded = True
+            # unless it was the budget of an enclosing step (or of the run)
+            return exc_val.owner is self
         return True
 
+    def __aexit__(self, exc_type, exc_val, exc_tb):
+        timeout = _timeout_of(exc_type)
+        if timeout is not None:
+            return _Ready(self._exit_timed_out(timeout, exc_tb))
+        suppress = self._exit(exc_type, exc_val, exc_tb)
+        # recorded like any error, but the task still has to be cancelled
+        return _Ready(suppress and not _is_cancellation(exc_type))
+
+    def _exit_timed_out(self, timeout, exc_tb):
+        # cancelled by a Watchdog, as this step or an enclosing one ran out
+        # of time
+        if self._exit(StepTimeout, timeout, exc_tb):
+            return True
+        raise timeout
+
     def __str__(self):
         return '%s %s' % (self.kind, self.name)
 
+    def __getstate__(self):
+        state = dict((name, getattr(self, name)) for name in self._DETACHED)
+        state['_output'] = self.own_output
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self.timer = clock
+        self._stdout_token = None
+        self.capture = None
+        self.output_start = None
+        self.output_stop = None
+        self.registry = None
+        self.budget = None
+
     def _set_result(self, exc_type, exc_val, exc_tb):
         if self.result.has_children_errors:
             return
+        if exc_type is None:
+            self.result = Result.shared(Result.SUCCESS)
+            return
+        self.result = Result()
         self.result.set_exception(exc_type, exc_val, exc_tb)
         if self.result.is_abort:
-            log.debug('Aborting')
-            raise exc_val
+            return
         if not self.result.is_success and self.parent:
             log.debug('Sending error to parent')
             self.parent.set_child_error()
 
     def set_child_error(self):
-        self.result.kind = Result.CHILD_ERROR
+        self.result = Result.shared(Result.CHILD_ERROR)
         if self.parent:
             self.parent.set_child_error()
 
 
+class _Ready(object):
+    """
+    An awaitable that is done from the start, so stepping into and out of
+    `async with` blocks costs no coroutine.
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __await__(self):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        raise StopIteration(self.value)
+
+    next = __next__
+
+
+def _timeout_of(exc_type):
+    if not _is_cancellation(exc_type):
+        return None
+    return take_timeout()
+
+
+def _is_cancellation(exc_type):
+    if exc_type is None or 'asyncio' not in sys.modules:
+        return False
+    return issubclass(exc_type, sys.modules['asyncio'].CancelledError)
+
+
 class StepFactory(object):
+    __slots__ = ('kind', '_registry')
+
     def __init__(self, kind, registry=None):
-        self.kind = kind
+        self.kind = intern(kind)
         self._registry = registry
 
     def __getattr__(self, name):
@@ -143,5 +462,5 @@ class StepFactory(object):
         return self._create_step(name)
 
     def _create_step(self, name):
-        step = Step(self.kind, name.replace('_', ' '), self._registry)
+        step = Step(self.kind, intern(name.replace('_', ' ')), self._registry)
         return step
@@ -0,0 +1,239 @@
+import os
+import abc
+import sys
+import time
+import errno
+import struct
+import select
+import fnmatch
+import logging
+
+log = logging.getLogger(__name__)
+
+
+IGNORED = (
+    '.*',
+    '__pycache__',
+    'node_modules',
+    'venv',
+    'env',
+    'build',
+    'dist',
+    '*.egg-info',
+)
+WATCHED = ('*.py', '*.pyspecs')
+
+
+class _Watcher(abc.ABCMeta('ABC', (object,), {})):
+    """
+    Blocks until files under `root` change and reports which ones did.
+    Names (of files or directories) matching any `ignore` pattern are never
+    reported, and their subtrees are not watched. A burst of saves is
+    collapsed into a single report once the tree has been quiet for
+    `debounce` seconds.
+    """
+    def __init__(self, root, ignore=IGNORED, watched=WATCHED, debounce=.1):
+        self.root = os.path.abspath(root)
+        self.ignore = tuple(ignore)
+        self.watched = tuple(watched)
+        self.debounce = debounce
+
+    def wait(self):
+        changed = set()
+        while not changed:
+            changed.update(self._next_changes(None))
+        while True:
+            more = self._next_changes(self.debounce)
+            if not more:
+                return changed
+            changed.update(more)
+
+    def close(self):
+        pass
+
+    def is_ignored(self, name):
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.ignore)
+
+    def is_watched(self, name):
+        return not self.is_ignored(name) and any(
+            fnmatch.fnmatch(name, pattern) for pattern in self.watched)
+
+    def walk(self, root):
+        for directory, dirs, files in os.walk(root):
+            dirs[:] = [d for d in dirs if not self.is_ignored(d)]
+            yield directory, files
+
+    @abc.abstractmethod
+    def _next_changes(self, timeout):
+        """
+        Returns the paths changed within `timeout` seconds (or whenever the
+        next change happens, if `timeout` is None).
+        """
+
+
+class PollingWatcher(_Watcher):
+    """
+    Portable fallback: compares per-file (mtime, size) snapshots of the tree
+    every `interval` seconds.
+    """
+    def __init__(self, root, interval=.75, **kwargs):
+        super(PollingWatcher, self).__init__(root, **kwargs)
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for directory, files in self.walk(self.root):
+            for name in files:
+                if not self.is_watched(name):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stats = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (stats.st_mtime, stats.st_size)
+        return snapshot
+
+    def _next_changes(self, timeout):
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            time.sleep(self.interval if deadline is None else
+                       max(0, min(self.interval, deadline - time.time())))
+            snapshot = self._scan()
+            previous, self._snapshot = self._snapshot, snapshot
+            changed = set(
+                path for path in set(previous) | set(snapshot)
+                if previous.get(path) != snapshot.get(path)
+            )
+            if changed or (deadline is not None and time.time() >= deadline):
+                return changed
+
+
+class InotifyWatcher(_Watcher):
+    """
+    Linux watcher built on inotify (through ctypes), which sleeps in the
+    kernel until something actually changes.
+    """
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_ISDIR = 0x40000000
+    IN_CLOEXEC = 0o2000000
+
+    MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+            IN_CREATE | IN_DELETE | IN_ONLYDIR)
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self, root, **kwargs):
+        super(InotifyWatcher, self).__init__(root, **kwargs)
+        self._libc = _libc()
+        self._fd = self._libc.inotify_init1(self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(_errno(), 'inotify_init1 failed')
+        self._directories = {}
+        self._add_tree(self.root)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _add_tree(self, root):
+        added = set()
+        for directory, files in self.walk(root):
+            wd = self._libc.inotify_add_watch(
+                self._fd, _encode(directory), self.MASK)
+            if wd < 0:
+                log.debug('Cannot watch %s (errno %d)', directory, _errno())
+                continue
+            self._directories[wd] = directory
+            added.update(os.path.join(directory, name)
+                         for name in files if self.is_watched(name))
+        return added
+
+    def _next_changes(self, timeout):
+        try:
+            readable = select.select([self._fd], [], [], timeout)[0]
+        except select.error as e:
+            if e.args[0] == errno.EINTR:
+                return set()
+            raise
+        if not readable:
+            return set()
+        return self._parse(os.read(self._fd, 64 * 1024))
+
+    def _parse(self, buffer):
+        changed = set()
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, cookie, length = self.EVENT.unpack_from(buffer, offset)
+            offset += self.EVENT.size
+            name = buffer[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            if mask & self.IN_Q_OVERFLOW:
+                log.warning('inotify queue overflowed; reporting the root')
+                changed.add(self.root)
+                continue
+            if mask & self.IN_IGNORED:
+                self._directories.pop(wd, None)
+                continue
+
+            directory = self._directories.get(wd)
+            if directory is None or not name:
+                continue
+            name = _decode(name)
+            path = os.path.join(directory, name)
+
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO) and \
+                        not self.is_ignored(name):
+                    changed.update(self._add_tree(path))
+            elif self.is_watched(name):
+                changed.add(path)
+        return changed
+
+
+def create_watcher(root, **kwargs):
+    """
+    Prefers inotify where the platform offers it and falls back to polling.
+    """
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(root, **kwargs)
+        except (OSError, AttributeError) as e:
+            log.debug('inotify unavailable (%s); polling instead', e)
+    return PollingWatcher(root, **kwargs)
+
+
+def _libc():
+    import ctypes
+    import ctypes.util
+    libc = ctypes.CDLL(
+        ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    libc.inotify_init1  # raises AttributeError where unsupported
+    return libc
+
+
+def _errno():
+    import ctypes
+    return ctypes.get_errno()
+
+
+def _encode(path):
+    if isinstance(path, bytes):
+        return path
+    return path.encode(sys.getfilesystemencoding())
+
+
+def _decode(name):
+    if str is bytes:
+        return name
+    return name.decode(sys.getfilesystemencoding(), 'surrogateescape')
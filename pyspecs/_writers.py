@@ -0,0 +1,134 @@
+import io
+import re
+import json
+import shutil
+import tempfile
+from xml.sax.saxutils import escape, quoteattr
+
+from ._reporting import Reporter
+
+
+BUFFER_SIZE = 64 * 1024
+_INVALID_XML = re.compile(u'[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def step_record(step):
+    """
+    The plain-data description of a finished step shared by the writers.
+    """
+    result = step.result
+    return dict(
+        kind=step.kind,
+        name=step.name,
+        path=step.hierarchy,
+        file=step.filename,
+        line=step.line,
+        duration=step.duration,
+        self_duration=step.self_duration,
+        result=result.kind,
+        exc_type=result.exc_name,
+        message=result.message,
+        trace=result.trace,
+        output=step.own_output,
+    )
+
+
+def format_trace(trace):
+    return ''.join(
+        u'  File "{0}", line {1}, in {2}\n    {3}\n'.format(
+            filename, line_number, name, code or '')
+        for filename, line_number, name, code in trace
+    )
+
+
+class JsonLinesReporter(Reporter):
+    """
+    Writes one JSON object per step, as each step finishes, to `path`.
+    """
+    def __init__(self, path):
+        self.stream = io.open(path, 'w', encoding='utf-8',
+                              buffering=BUFFER_SIZE)
+
+    def step_exited(self, step):
+        self.stream.write(u'{0}\n'.format(
+            json.dumps(step_record(step), ensure_ascii=False)))
+
+    def render(self, step_runner):
+        self.stream.close()
+
+
+class JUnitXmlReporter(Reporter):
+    """
+    Writes a JUnit XML report with one <testcase> per step to `path`. Test
+    cases are spooled to a temporary file as steps finish, so only the
+    suite totals (which JUnit wants up front) are kept in memory.
+    """
+    SUITE = 'pyspecs'
+
+    def __init__(self, path):
+        self.path = path
+        self.spool = tempfile.TemporaryFile(mode='w+b')
+        self.tests = 0
+        self.failures = 0
+        self.errors = 0
+        self.time = 0
+
+    def step_exited(self, step):
+        record = step_record(step)
+        self.tests += 1
+        if step.parent is None:
+            self.time += record['duration']
+
+        self._spool(u'  <testcase classname={0} name={1} time="{2:.6f}" '
+                    u'file={3} line="{4}">'
+                    .format(_attr(' / '.join(record['path'][:-1]) or
+                                  self.SUITE),
+                            _attr(str(step)), record['duration'],
+                            _attr(record['file'] or ''), record['line']))
+        if step.result.is_failure or step.result.is_error or \
+                step.result.is_timeout:
+            element = 'failure' if step.result.is_failure else 'error'
+            if element == 'failure':
+                self.failures += 1
+            else:
+                self.errors += 1
+            self._spool(u'\n    <{0} type={1} message={2}>{3}</{0}>'.format(
+                element,
+                _attr(record['exc_type'] or ''),
+                _attr(record['message'] or ''),
+                _text(format_trace(record['trace']))))
+        if record['output']:
+            self._spool(u'\n    <system-out>{0}</system-out>\n  '.format(
+                _text(record['output'])))
+        self._spool(u'</testcase>\n')
+
+    def render(self, step_runner):
+        with io.open(self.path, 'wb', buffering=BUFFER_SIZE) as out:
+            out.write(
+                u'<?xml version="1.0" encoding="utf-8"?>\n<testsuites>\n'
+                u'<testsuite name={0} tests="{1}" failures="{2}" '
+                u'errors="{3}" time="{4:.6f}">\n'.format(
+                    _attr(self.SUITE), self.tests, self.failures,
+                    self.errors, self.time).encode('utf-8'))
+            self.spool.seek(0)
+            shutil.copyfileobj(self.spool, out, BUFFER_SIZE)
+            out.write(u'</testsuite>\n</testsuites>\n'.encode('utf-8'))
+        self.spool.close()
+
+    def _spool(self, text):
+        self.spool.write(text.encode('utf-8'))
+
+
+def _text(value):
+    return escape(_INVALID_XML.sub(u'', _unicode(value)))
+
+
+def _attr(value):
+    return quoteattr(_INVALID_XML.sub(u'', _unicode(value)),
+                     {'\n': '&#10;', '\r': '&#13;', '\t': '&#9;'})
+
+
+def _unicode(value):
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    return u'{0}'.format(value)
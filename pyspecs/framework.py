@@ -1,5 +1,8 @@
 from ._should import _Should
+from ._fixtures import fixture
 from ._step import StepFactory
+# imported to register their expectations on _Should
+from . import _approximate, _performance  # noqa: F401
 
 
 given = StepFactory('given')
@@ -35,4 +38,5 @@ def framework():
         it=it,
         this=this,
         that=that,
+        fixture=fixture,
     )
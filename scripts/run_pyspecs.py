@@ -9,29 +9,166 @@ sys.path.append(PARENT_PATH)
 
 import argparse
 from pyspecs import _idle
+from pyspecs._runner import _StepRunner
+from pyspecs._sharding import Sharder
 
 import logging
 logging.basicConfig()
 logging.getLogger().setLevel(logging.INFO)
 
 
+def count(value):
+    """A positive number of workers or threads, or "auto" for one per CPU."""
+    try:
+        return _StepRunner._resolve_workers(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'expected "auto" or a positive number, not {0!r}'.format(value))
+
+
+def shard(value):
+    try:
+        Sharder.parse(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Pyspecs test runner')
-    parser.add_argument('path', nargs='?', default=os.getcwd(),
-                        help='Directory to be processed')
+    parser.add_argument('paths', nargs='*', default=[os.getcwd()],
+                        metavar='path',
+                        help='Directories to be processed (the first one is '
+                             'the working directory, and the one watched)')
     parser.add_argument('-w', '--watch', action='store_true', default=False,
                         help='watch files and run tests under any change')
     parser.add_argument('-v', '--verbose', action='store_true', default=False,
                         help='Switch verbose mode on')
+    parser.add_argument('-k', dest='select', action='append', default=[],
+                        metavar='PATTERN',
+                        help='only run the steps on this path of step names, '
+                             'such as "given two operands / when supplied to '
+                             'add" (may be repeated)')
+    parser.add_argument('-j', '--workers', type=count, default=1,
+                        help='number of worker processes to spread spec '
+                             'files across, or "auto" for one per CPU')
+    parser.add_argument('--threads', type=count, default=1, metavar='N',
+                        help='number of threads to spread spec files '
+                             'across in this process, or "auto" for one per '
+                             'CPU (pays off on free-threaded Python)')
+    parser.add_argument('--concurrency', type=int, default=1, metavar='N',
+                        help='most root scenarios of an async spec file to '
+                             'run at once on the event loop')
+    parser.add_argument('--shard', type=shard, metavar='K/N',
+                        help='only run the K-th of N shards of the spec '
+                             'files, balanced by their recorded durations')
+    parser.add_argument('--history', nargs='?', const='', metavar='PATH',
+                        help='save step and file timings of every run to a '
+                             'SQLite database (default: '
+                             '.pyspecs_history.sqlite in the spec directory)')
+    parser.add_argument('--compare', action='store_true', default=False,
+                        help='report steps and files that got slower than '
+                             'their timing history (implies --history)')
+    parser.add_argument('--compare-threshold', type=float, default=3.0,
+                        metavar='SIGMAS',
+                        help='how many standard deviations above its mean '
+                             'a duration must be to count as a regression')
+    parser.add_argument('--last-failed', action='store_true', default=False,
+                        help='only run the scenarios that failed last time')
+    parser.add_argument('--failed-first', action='store_true', default=False,
+                        help='run the spec files that failed last time '
+                             'before the others')
+    parser.add_argument('--maxfail', type=int, default=0, metavar='N',
+                        help='stop the run (and any parallel work) once N '
+                             'scenarios failed')
+    parser.add_argument('--timeout', type=float, metavar='SECONDS',
+                        help='time budget of every step; steps running out '
+                             'of it are interrupted and reported as timed '
+                             'out')
+    parser.add_argument('--run-timeout', type=float, metavar='SECONDS',
+                        help='time budget of the whole run, after which it '
+                             'stops')
+    parser.add_argument('--cpu-limit', type=float, metavar='SECONDS',
+                        help='most CPU time a worker process may spend on '
+                             'one spec file (with -j)')
+    parser.add_argument('--memory-limit', type=int, metavar='MB',
+                        help='most memory (address space) a worker process '
+                             'may use while running a spec file (with -j)')
+    parser.add_argument('--plain-asserts', dest='rewrite',
+                        action='store_false', default=True,
+                        help='do not rewrite assert statements to explain '
+                             'their failures')
+    parser.add_argument('--no-cache', dest='cache', action='store_false',
+                        default=True,
+                        help='do not read or write compiled spec files in '
+                             '__pycache__')
+    parser.add_argument('--ignore', action='append', default=[],
+                        metavar='PATTERN',
+                        help='file or directory name pattern that spec '
+                             'discovery and the watcher should ignore (may be '
+                             'repeated)')
+    parser.add_argument('--junit-xml', metavar='PATH',
+                        help='also write a JUnit XML report to PATH')
+    parser.add_argument('--jsonl', metavar='PATH',
+                        help='also write one JSON object per step to PATH')
+    parser.add_argument('--durations', type=int, default=0, metavar='N',
+                        help='list the N slowest scenarios and steps')
+    parser.add_argument('--profile', nargs='?', const='.pyspecs_profile',
+                        metavar='DIR',
+                        help='profile each scenario into DIR (default: '
+                             '.pyspecs_profile) and summarize the merged '
+                             'profile')
+    parser.add_argument('--capture-limit', type=int, metavar='BYTES',
+                        default=10 * 1024 * 1024,
+                        help='most output kept per scenario; the rest is '
+                             'dropped (0 keeps everything)')
+    parser.add_argument('--trace-depth', type=int, metavar='N',
+                        help='show only the N innermost entries of the '
+                             'traceback of a failure')
+    parser.add_argument('--fixture-capacity', type=float, metavar='WEIGHT',
+                        help='most fixture values (or weight of them, see '
+                             'fixture(weight=...)) kept at once')
 
     args = parser.parse_args()
+    if args.workers > 1 and args.threads > 1:
+        parser.error('use either -j/--workers or --threads')
+    if args.profile and args.threads > 1:
+        parser.error('--profile is not supported with --threads')
+    if args.profile and args.concurrency > 1:
+        parser.error('--profile is not supported with --concurrency')
 
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
         formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
         logging.getLogger().handlers[0].formatter = formatter
+    options = dict(
+        workers=args.workers,
+        threads=args.threads,
+        concurrency=args.concurrency,
+        shard=args.shard,
+        history=args.history,
+        compare=args.compare,
+        compare_threshold=args.compare_threshold,
+        last_failed=args.last_failed,
+        failed_first=args.failed_first,
+        maxfail=args.maxfail,
+        select=args.select,
+        timeout=args.timeout,
+        run_timeout=args.run_timeout,
+        cpu_limit=args.cpu_limit,
+        memory_limit=args.memory_limit and args.memory_limit * 1024 * 1024,
+        roots=[os.path.abspath(root) for root in args.paths[1:]],
+        cache=args.cache,
+        rewrite=args.rewrite,
+        junit_xml=args.junit_xml,
+        jsonl=args.jsonl,
+        durations=args.durations,
+        profile=args.profile,
+        capture_limit=args.capture_limit or None,
+        trace_depth=args.trace_depth,
+        fixture_capacity=args.fixture_capacity,
+    )
     if args.watch:
-        _idle.watch(args.path)
+        _idle.watch(args.paths[0], ignore=args.ignore, **options)
     else:
-        _idle.run(args.path)
+        _idle.run(args.paths[0], ignore=args.ignore, **options)
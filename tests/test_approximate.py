@@ -0,0 +1,121 @@
+from array import array
+from unittest.case import TestCase, skipIf
+
+from pyspecs._approximate import compare_close, compare_between, numpy
+from pyspecs._should import _Should as this
+from pyspecs import framework  # noqa (registers the expectations)
+
+
+class TestBeCloseTo(TestCase):
+    def test_numbers_within_the_relative_tolerance_pass(self):
+        this(0.1 + 0.2).should.be_close_to(0.3)
+        this(100.0).should.be_close_to(101.0, rel=.01)
+        this(100.0).should_not.be_close_to(102.0, rel=.01)
+
+    def test_numbers_within_the_absolute_tolerance_pass(self):
+        this(1e-9).should.be_close_to(0.0, abs=1e-8)
+        this(1e-9).should_not.be_close_to(0.0)
+
+    def test_failing_numbers(self):
+        with self.assertRaises(AssertionError) as e:
+            this(1.5).should.be_close_to(1.0)
+        self.assertEqual("Expected '1.5' to be close to '1.0' "
+                         "(rel=1e-06, abs=1e-12).", str(e.exception))
+
+    def test_sequences_are_compared_item_by_item(self):
+        this([1.0, 2.0, 3.0]).should.be_close_to((1.0, 2.0000000001, 3.0))
+
+    @skipIf(str is bytes, 'array.array has no buffer interface on Python 2')
+    def test_buffers_are_compared_item_by_item(self):
+        this(array('d', [1.0, 2.0])).should.be_close_to(
+            memoryview(array('d', [1.0, 2.0])))
+
+    def test_sequences_can_be_compared_with_one_number(self):
+        this([1.0, 1.0000000001]).should.be_close_to(1.0)
+        this([1.0, 1.1]).should_not.be_close_to(1.0)
+
+    def test_failures_report_count_worst_and_first_mismatches(self):
+        expected = [float(n) for n in range(100)]
+        actual = list(expected)
+        actual[10] += 1
+        actual[20] += 5
+        actual[30] += 2
+        with self.assertRaises(AssertionError) as e:
+            this(actual).should.be_close_to(expected)
+        self.assertTrue(str(e.exception).endswith(
+            '\n3 of 100 items are not: the worst at [20] (25.0 instead of '
+            '20.0, off by 5), the first at [10, 20, 30].'))
+
+    def test_the_first_mismatches_are_bounded(self):
+        mismatches = compare_close(array('d', range(1000)), -1.0)
+        self.assertEqual(1000, mismatches.count)
+        self.assertTrue(mismatches.describe(3).endswith(
+            'the first at [0, 1, 2, ...].'))
+
+    def test_nan_is_the_worst_mismatch(self):
+        mismatches = compare_close([1.0, 5.0, float('nan')], [2.0, 9.0, 1.0])
+        self.assertEqual(3, mismatches.count)
+        self.assertEqual(2, mismatches.worst)
+
+    def test_sequences_of_different_lengths(self):
+        with self.assertRaises(AssertionError) as e:
+            this([1.0, 2.0]).should.be_close_to([1.0, 2.0, 3.0])
+        self.assertTrue(str(e.exception).endswith(
+            '\nThe lengths differ: 2 instead of 3.'))
+
+    def test_a_number_is_not_close_to_a_sequence(self):
+        with self.assertRaises(AssertionError) as e:
+            this(0.3).should.be_close_to([0.3])
+        self.assertTrue(str(e.exception).endswith(
+            '\nThe lengths differ: a single number instead of 1.'))
+
+    @skipIf(str is bytes, 'array.array has no buffer interface on Python 2')
+    def test_multi_dimensional_buffers_are_flattened(self):
+        view = memoryview(array('d', [1.0, 2.0, 3.0, 4.0])).cast(
+            'B').cast('d', [2, 2])
+        this(view).should.be_close_to([1.0, 2.0, 3.0, 4.0])
+
+
+class TestEachBeBetween(TestCase):
+    def test_passing(self):
+        this([.1, .5, .9]).should.each_be_between(0, 1)
+        this(array('i', [1, 2, 3])).should.each_be_between(0, 4)
+
+    def test_bounds_are_exclusive(self):
+        this([0, .5]).should_not.each_be_between(0, 1)
+
+    def test_failures_report_the_furthest_outside(self):
+        mismatches = compare_between([.5, 1.5, -3, .2, 2], 0, 1)
+        self.assertEqual(3, mismatches.count)
+        self.assertTrue(mismatches.describe(10).endswith(
+            'the worst at [2] (-3, off by 3), the first at [1, 2, 4].'))
+
+
+@skipIf(numpy is None, 'NumPy is not installed')
+class TestNumPyArrays(TestCase):
+    def test_arrays_are_compared_element_wise(self):
+        values = numpy.linspace(0, 1, 1000)
+        this(values).should.be_close_to(values + 1e-12)
+        this(values).should_not.be_close_to(values + 1e-3)
+        this(values.tolist()).should.be_close_to(values)
+
+    def test_failures_report_count_worst_and_first_mismatches(self):
+        actual = numpy.zeros((10, 10))
+        expected = actual.copy()
+        expected[2, 3] = 1
+        expected[5, 5] = 4
+        mismatches = compare_close(actual, expected)
+        self.assertEqual(2, mismatches.count)
+        self.assertTrue(mismatches.describe(10).endswith(
+            'the worst at [(5, 5)] (0.0 instead of 4.0, off by 4), '
+            'the first at [(2, 3), (5, 5)].'))
+
+    def test_arrays_of_different_shapes(self):
+        mismatches = compare_close(numpy.zeros(3), numpy.zeros(4))
+        self.assertEqual(1, mismatches.count)
+
+    def test_each_between(self):
+        values = numpy.array([.5, 2.0, numpy.nan])
+        mismatches = compare_between(values, 0, 1)
+        self.assertEqual(2, mismatches.count)
+        self.assertEqual(2, mismatches.worst)
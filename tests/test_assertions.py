@@ -0,0 +1,62 @@
+import ast
+from unittest import TestCase, skipIf
+
+from pyspecs._assertions import EXPLAIN, NamedExpr, explain, rewrite_asserts
+
+
+@skipIf(NamedExpr is None, 'needs assignment expressions')
+class TestAssertRewriting(TestCase):
+    def run_rewritten(self, source, **names):
+        tree = rewrite_asserts(ast.parse(source), source)
+        namespace = dict(names)
+        namespace[EXPLAIN] = explain
+        exec(compile(ast.fix_missing_locations(tree), '<spec>', 'exec'),
+             namespace)
+        return namespace
+
+    def failure(self, source, **names):
+        with self.assertRaises(AssertionError) as e:
+            self.run_rewritten(source, **names)
+        return str(e.exception)
+
+    def test_explains_the_values_of_sub_expressions(self):
+        message = self.failure('items = [1, 2, 3]\n'
+                               'assert len(items) + 1 == limit\n', limit=3)
+
+        self.assertEqual('assert len(items) + 1 == limit\n'
+                         '  len(items) + 1 = 4\n'
+                         '  len(items) = 3\n'
+                         '  items = [1, 2, 3]\n'
+                         '  limit = 3', message)
+
+    def test_puts_the_message_of_the_assert_first(self):
+        message = self.failure('def check(x):\n'
+                               '    assert x.real > 1, "too small"\n'
+                               'check(1)\n')
+
+        self.assertEqual('too small\n'
+                         'assert x.real > 1\n'
+                         '  x.real = 1\n'
+                         '  x = 1', message)
+
+    def test_evaluates_everything_once_and_keeps_short_circuiting(self):
+        calls = []
+
+        def record(value):
+            calls.append(value)
+            return value
+
+        message = self.failure('assert record(0) or record(False) and '
+                               'record(1)\n', record=record)
+
+        self.assertEqual([0, False], calls)
+        self.assertIn('  record(False) = False', message)
+        self.assertNotIn('record(1) =', message)
+
+    def test_passing_asserts_run_as_before(self):
+        namespace = self.run_rewritten('assert [x for x in range(3)] == '
+                                       'list(range(3))\n'
+                                       'assert (lambda: 1)()\n'
+                                       'result = 42\n')
+
+        self.assertEqual(42, namespace['result'])
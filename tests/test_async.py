@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase, skipUnless
+
+from pyspecs._async import FLAGS
+from pyspecs._registry import Registry
+from pyspecs._runner import _StepRunner
+
+
+SPEC = '''
+import asyncio
+ready = asyncio.Event()
+calls = 0
+
+async with given.a_scenario_waiting_for_the_next_one:
+    print('waiting')
+    await asyncio.wait_for(ready.wait(), 1)
+    calls += 1
+    async with then.it_was_released:
+        print('released')
+
+async with given.the_next_scenario:
+    print('releasing')
+    ready.set()
+    calls += 1
+    async with then.it_fails:
+        the(calls).should.equal(-1)
+
+with given.a_plain_scenario_after_them:
+    with then.both_async_scenarios_ran:
+        the(calls).should.equal(2)
+'''
+
+
+@skipUnless(FLAGS, 'async specs need Python 3.8+')
+class TestAsyncSpecs(TestCase):
+    def setUp(self):
+        self.working = tempfile.mkdtemp()
+        with open(os.path.join(self.working, 'spec.pyspecs'), 'w') as fd:
+            fd.write(SPEC)
+        Registry().reset()
+
+    def tearDown(self):
+        shutil.rmtree(self.working)
+        Registry().reset()
+
+    def run_specs(self, concurrency):
+        _StepRunner(cache=False, concurrency=concurrency).load_steps(
+            self.working)
+        return Registry().root_steps
+
+    def test_concurrent_scenarios_are_recorded_in_definition_order(self):
+        waiting, releasing, plain = self.run_specs(concurrency=2)
+
+        self.assertEqual(
+            ['given a scenario waiting for the next one',
+             'given the next scenario', 'given a plain scenario after them'],
+            [str(step) for step in (waiting, releasing, plain)])
+        self.assertTrue(waiting.result.is_success)
+        self.assertTrue(waiting.steps[0].result.is_success)
+        self.assertTrue(releasing.steps[0].result.is_failure)
+        self.assertTrue(plain.steps[0].result.is_success)
+        self.assertEqual(6, Registry().total_steps)
+
+    def test_concurrent_scenarios_keep_their_own_output(self):
+        waiting, releasing, plain = self.run_specs(concurrency=2)
+
+        self.assertEqual('waiting\nreleased\n', waiting.output)
+        self.assertEqual('released\n', waiting.steps[0].output)
+        self.assertEqual('releasing\n', releasing.output)
+
+    def test_scenarios_run_one_at_a_time_by_default(self):
+        waiting, releasing, plain = self.run_specs(concurrency=1)
+
+        self.assertTrue(waiting.result.is_error)
+        self.assertEqual('TimeoutError', waiting.result.exc_name)
+        self.assertTrue(releasing.steps[0].result.is_failure)
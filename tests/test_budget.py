@@ -0,0 +1,128 @@
+import os
+import time
+import shutil
+import tempfile
+from unittest import TestCase, skipUnless
+
+from pyspecs._async import FLAGS
+from pyspecs._budget import Watchdog, limit_resources, resource
+from pyspecs._registry import Registry
+from pyspecs._runner import _StepRunner
+
+
+SPEC = '''
+import time
+with given.a_step_that_hangs:
+    with when.it_sleeps:
+        time.sleep(5)
+    with then.the_scenario_goes_on:
+        pass
+with given.a_budget_of_its_own.within(0.1):
+    with when.a_child_spins:
+        while True:
+            pass
+    with then.it_is_not_reached:
+        pass
+'''
+
+ASYNC_SPEC = '''
+import asyncio
+async with given.an_async_step_that_hangs:
+    async with when.it_awaits:
+        await asyncio.sleep(5)
+    async with then.the_scenario_goes_on:
+        pass
+'''
+
+
+@skipUnless(Watchdog.available(), 'needs SIGALRM in the main thread')
+class TestTimeBudgets(TestCase):
+    def setUp(self):
+        self.working = tempfile.mkdtemp()
+        Registry().reset()
+
+    def tearDown(self):
+        shutil.rmtree(self.working)
+        Registry().reset()
+
+    def write(self, name, spec):
+        with open(os.path.join(self.working, name), 'w') as fd:
+            fd.write(spec)
+
+    def results(self, step):
+        return [(str(step), step.result.kind)] + [
+            result for child in step.steps for result in self.results(child)]
+
+    def test_interrupts_steps_running_out_of_time(self):
+        self.write('spec.pyspecs', SPEC)
+
+        _StepRunner(cache=False, timeout=0.1).load_steps(self.working)
+
+        hangs, spins = Registry().root_steps
+        self.assertEqual([('given a step that hangs', 'child error'),
+                          ('when it sleeps', 'timeout'),
+                          ('then the scenario goes on', 'success')],
+                         self.results(hangs))
+        self.assertEqual([('given a budget of its own', 'child error'),
+                          ('when a child spins', 'timeout')],
+                         self.results(spins))
+        trace = hangs.steps[0].result.trace
+        self.assertIn('time.sleep(5)', [code for _, _, _, code in trace])
+        self.assertEqual('given a budget of its own ran out of its time '
+                         'budget of 0.1s', spins.steps[0].result.message)
+
+    @skipUnless(FLAGS, 'async specs need Python 3.8+')
+    def test_cancels_async_steps_running_out_of_time(self):
+        self.write('spec.pyspecs', ASYNC_SPEC)
+
+        _StepRunner(cache=False, timeout=0.1).load_steps(self.working)
+
+        self.assertEqual([('given an async step that hangs', 'child error'),
+                          ('when it awaits', 'timeout'),
+                          ('then the scenario goes on', 'success')],
+                         self.results(Registry().root_steps[0]))
+
+    @skipUnless(FLAGS, 'async specs need Python 3.8+')
+    def test_cancels_concurrent_async_steps_running_out_of_time(self):
+        self.write('spec.pyspecs', ASYNC_SPEC + ASYNC_SPEC.replace(
+            'hangs', 'hangs_too').replace('import asyncio', ''))
+        started = time.time()
+
+        _StepRunner(cache=False, timeout=0.1, concurrency=2).load_steps(
+            self.working)
+
+        self.assertLess(time.time() - started, 2)
+        self.assertEqual(
+            [('when it awaits', 'timeout')] * 2,
+            [self.results(step)[1] for step in Registry().root_steps])
+
+    def test_stops_the_run_running_out_of_time(self):
+        self.write('spec1.pyspecs', SPEC)
+        self.write('spec2.pyspecs', SPEC)
+        runner = _StepRunner(cache=False, run_timeout=0.1)
+
+        runner.load_steps(self.working)
+
+        self.assertTrue(runner.out_of_time)
+        self.assertEqual([('given a step that hangs', 'child error'),
+                          ('when it sleeps', 'timeout')],
+                         self.results(Registry().root_steps[0]))
+        self.assertEqual(1, len(Registry().root_steps))
+        self.assertFalse(Registry().stopped)
+
+
+@skipUnless(resource is not None, 'needs the resource module')
+class TestResourceLimits(TestCase):
+    def test_restores_the_previous_limits(self):
+        before = [resource.getrlimit(limit) for limit in
+                  (resource.RLIMIT_CPU, resource.RLIMIT_AS)]
+
+        restore = limit_resources(cpu=100, memory=1 << 40)
+        limited = [resource.getrlimit(limit) for limit in
+                   (resource.RLIMIT_CPU, resource.RLIMIT_AS)]
+        restore()
+
+        self.assertEqual(1 << 40, limited[1][0])
+        self.assertNotEqual(before[0], limited[0])
+        self.assertEqual(before, [resource.getrlimit(limit) for limit in
+                                  (resource.RLIMIT_CPU, resource.RLIMIT_AS)])
@@ -0,0 +1,92 @@
+import os
+import sys
+import shutil
+import tempfile
+from unittest import TestCase, skipUnless
+
+from pyspecs._async import CO_COROUTINE, FLAGS
+from pyspecs._cache import CodeCache
+
+
+class TestCodeCache(TestCase):
+    def setUp(self):
+        self.working = tempfile.mkdtemp()
+        self.path = os.path.join(self.working, 'spec.pyspecs')
+        self.write('value = 1\n')
+        self.dont_write_bytecode = sys.dont_write_bytecode
+        sys.dont_write_bytecode = False
+
+    def tearDown(self):
+        sys.dont_write_bytecode = self.dont_write_bytecode
+        shutil.rmtree(self.working)
+
+    def write(self, source):
+        with open(self.path, 'w') as fd:
+            fd.write(source)
+
+    def run_cached(self, cache):
+        namespace = {}
+        exec(cache.compile(self.path), namespace)
+        return namespace['value']
+
+    def test_second_compile_is_served_from_disk(self):
+        self.run_cached(CodeCache())
+        cache = CodeCache()
+
+        self.assertEqual(1, self.run_cached(cache))
+        self.assertEqual((1, 0), (cache.hits, cache.misses))
+        self.assertTrue(os.path.exists(CodeCache().location(self.path)))
+
+    def test_hits_report_the_path_they_were_loaded_through(self):
+        CodeCache().compile(self.path)
+        relative = os.path.relpath(self.path)
+
+        code = CodeCache().compile(relative)
+
+        self.assertEqual(relative, code.co_filename)
+
+    def test_compile_variants_are_cached_side_by_side(self):
+        variants = [CodeCache(select=True), CodeCache(rewrite=False),
+                    CodeCache()]
+        for cache in variants:
+            cache.compile(self.path)
+
+        for cache in variants:
+            cache.compile(self.path)
+        self.assertEqual([(1, 1)] * 3,
+                         [(cache.hits, cache.misses) for cache in variants])
+        self.assertEqual(3, len(set(cache.location(self.path)
+                                    for cache in variants)))
+
+    def test_changed_file_is_recompiled(self):
+        self.run_cached(CodeCache())
+        self.write('value = 22\n')
+        cache = CodeCache()
+
+        self.assertEqual(22, self.run_cached(cache))
+        self.assertEqual((0, 1), (cache.hits, cache.misses))
+
+    def test_disabled_cache_never_touches_disk(self):
+        cache = CodeCache(enabled=False)
+        self.run_cached(cache)
+        self.run_cached(cache)
+
+        self.assertEqual((0, 2), (cache.hits, cache.misses))
+        self.assertFalse(os.path.exists(CodeCache().location(self.path)))
+
+    def test_honors_dont_write_bytecode(self):
+        sys.dont_write_bytecode = True
+        self.run_cached(CodeCache())
+
+        self.assertFalse(os.path.exists(CodeCache().location(self.path)))
+
+    @skipUnless(FLAGS, 'async specs need Python 3.8+')
+    def test_async_specs_are_cached_as_module_coroutines(self):
+        self.write('async with given.a_scenario:\n    value = 1\n')
+        CodeCache().compile(self.path)
+        cache = CodeCache()
+
+        code = cache.compile(self.path)
+
+        self.assertEqual((1, 0), (cache.hits, cache.misses))
+        self.assertTrue(code.co_flags & CO_COROUTINE)
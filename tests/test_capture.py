@@ -0,0 +1,42 @@
+# coding=utf-8
+from unittest import TestCase
+
+from pyspecs._capture import OutputCapture
+
+
+class TestOutputCapture(TestCase):
+    def test_slices_are_read_back_by_offset(self):
+        capture = OutputCapture()
+        capture.write(u'first ')
+        start = capture.tell()
+        capture.write(u'sécond')
+        stop = capture.tell()
+        capture.write(u' third')
+
+        self.assertEqual(u'sécond', capture.read(start, stop))
+        self.assertEqual(u'sécond third', capture.read(start))
+
+    def test_spills_to_disk_and_keeps_earlier_slices(self):
+        capture = OutputCapture(spill=8)
+        capture.write(u'12345')
+        capture.write(u'6789abc')
+        capture.write(u'def')
+
+        self.assertEqual(u'6789abcdef', capture.read(5))
+        self.assertEqual(15, capture.tell())
+
+    def test_each_scenario_gets_its_own_budget(self):
+        capture = OutputCapture(limit=4)
+        capture.write(u'123456')
+        capture.start_scenario()
+        start = capture.tell()
+        capture.write(u'ab')
+
+        self.assertEqual(u'ab', capture.read(start))
+        self.assertEqual(2, capture.dropped)
+
+    def test_truncation_never_splits_a_character(self):
+        capture = OutputCapture(limit=3)
+        capture.write(u'aé€')
+
+        self.assertTrue(capture.read(0).startswith(u'aé\n[...'))
@@ -0,0 +1,80 @@
+import os
+import sys
+import shutil
+import tempfile
+from unittest import TestCase
+
+from pyspecs._dependencies import DependencyGraph
+from pyspecs._registry import Registry
+from pyspecs._runner import _StepRunner
+
+
+FILES = {
+    'deps_low.py': 'VALUE = 1\n',
+    'deps_high.py': 'from deps_low import VALUE\n',
+    'deps_other.py': 'VALUE = 2\n',
+    'high.pyspecs': 'import deps_high\n',
+    'other.pyspecs': 'import deps_other\n',
+}
+
+
+class TestDependencyGraph(TestCase):
+    def setUp(self):
+        self.working = tempfile.mkdtemp()
+        for name, source in FILES.items():
+            with open(self.path(name), 'w') as fd:
+                fd.write(source)
+        sys.path.insert(0, self.working)
+        self.graph = DependencyGraph(self.working)
+        self.runner = _StepRunner(cache=False, graph=self.graph)
+        self.runner.load_steps(self.working)
+
+    def tearDown(self):
+        sys.path.remove(self.working)
+        for name in ('deps_low', 'deps_high', 'deps_other'):
+            sys.modules.pop(name, None)
+        shutil.rmtree(self.working)
+        Registry().reset()
+
+    def path(self, name):
+        return os.path.join(self.working, name)
+
+    def specs(self):
+        return sorted(self.runner.find_spec_files(self.working))
+
+    def test_records_transitive_imports_of_each_spec(self):
+        self.assertEqual(
+            set([self.path(name) for name in
+                 ('high.pyspecs', 'deps_high.py', 'deps_low.py')]),
+            self.graph.dependencies(self.path('high.pyspecs')))
+
+    def test_only_specs_depending_on_a_change_are_affected(self):
+        affected = self.graph.affected(self.specs(),
+                                       [self.path('deps_low.py')])
+
+        self.assertEqual([self.path('high.pyspecs')], affected)
+
+    def test_changed_spec_is_affected(self):
+        affected = self.graph.affected(self.specs(),
+                                       [self.path('other.pyspecs')])
+
+        self.assertEqual([self.path('other.pyspecs')], affected)
+
+    def test_changed_directory_affects_everything(self):
+        self.assertEqual(
+            self.specs(), self.graph.affected(self.specs(), [self.working]))
+
+    def test_eviction_unloads_changed_modules_and_their_importers(self):
+        self.graph.evict([self.path('deps_low.py')])
+
+        self.assertNotIn('deps_low', sys.modules)
+        self.assertNotIn('deps_high', sys.modules)
+        self.assertIn('deps_other', sys.modules)
+
+    def test_rerun_reports_unaffected_specs_as_skipped(self):
+        runner = _StepRunner(cache=False, graph=self.graph)
+        runner.load_steps(self.working, changed=[self.path('deps_low.py')])
+
+        self.assertEqual([self.path('other.pyspecs')], runner.skipped)
+        self.assertIn(self.path('deps_low.py'),
+                      self.graph.dependencies(self.path('high.pyspecs')))
@@ -0,0 +1,133 @@
+from collections import OrderedDict, deque
+from unittest.case import TestCase
+
+from pyspecs._diff import DiffLimits, describe_difference, shorten
+from pyspecs._should import _Should as this
+
+
+class TestShorten(TestCase):
+    def setUp(self):
+        self.limits = DiffLimits(width=40, items=3, context=1)
+
+    def test_small_values_are_shown_as_formatting_shows_them(self):
+        self.assertEqual('foo', shorten('foo', self.limits))
+        self.assertEqual('[1, 2]', shorten([1, 2], self.limits))
+        self.assertEqual('None', shorten(None, self.limits))
+
+    def test_large_containers_show_their_first_items(self):
+        self.assertEqual('[0, 1, 2, ...]',
+                         shorten(list(range(10 ** 6)), self.limits))
+
+    def test_long_strings_are_cut_in_the_middle(self):
+        shown = shorten('a' * 100 + 'b' * 100, self.limits)
+        self.assertEqual('a' * 20 + '...' + 'b' * 20, shown)
+
+    def test_long_texts_show_their_first_and_last_lines(self):
+        text = '\n'.join(str(number) for number in range(100))
+        self.assertEqual('0\n...\n99', shorten(text, self.limits))
+
+
+class TestDescribeDifference(TestCase):
+    def setUp(self):
+        self.limits = DiffLimits(width=40, items=2, lines=10, context=1)
+
+    def describe(self, actual, expected):
+        return describe_difference(actual, expected, self.limits)
+
+    def test_first_differing_index_of_sequences(self):
+        actual = list(range(1000))
+        expected = list(actual)
+        expected[700] = -1
+        self.assertEqual(['[700]: 700 != -1'], self.describe(actual, expected))
+
+    def test_missing_and_extra_items_of_sequences(self):
+        self.assertEqual(['2 items instead of 5, 3 missing:',
+                          '  [2] 3', '  [3] 4', '  ...'],
+                         self.describe([1, 2], [1, 2, 3, 4, 5]))
+        self.assertEqual(['3 items instead of 2, 1 extra:', '  [2] 3'],
+                         self.describe([1, 2, 3], [1, 2]))
+
+    def test_deques_are_compared_like_other_sequences(self):
+        self.assertEqual(['[1]: 2 != 0', '3 items instead of 2, 1 extra:',
+                          '  [2] 3'],
+                         self.describe(deque([1, 2, 3]), deque([1, 0])))
+
+    def test_nested_differences_are_located_by_path(self):
+        self.assertEqual(["['b'][1]['c']: 'x' != 'y'"],
+                         self.describe({'a': 1, 'b': [0, {'c': 'x'}]},
+                                       {'a': 1, 'b': [0, {'c': 'y'}]}))
+
+    def test_missing_and_extra_keys(self):
+        self.assertEqual(['1 key missing:', "  ['y']: 2",
+                          '1 key extra:', "  ['x']: 1"],
+                         self.describe({'x': 1}, {'y': 2}))
+
+    def test_missing_and_extra_items_of_sets(self):
+        self.assertEqual(['1 item missing:', '  4', '1 item extra:', '  1'],
+                         self.describe({1, 2, 3}, {2, 3, 4}))
+
+    def test_different_types(self):
+        self.assertEqual(['a list instead of a tuple'],
+                         self.describe([1], (1,)))
+
+    def test_short_strings_need_no_description(self):
+        self.assertEqual([], self.describe('foo', 'bar'))
+
+    def test_long_strings_show_where_they_differ(self):
+        self.assertEqual(['strings differ at index 50 (lengths 100 and 100):',
+                          "  ...'aaaaaaaaaaxbbbbbbbbb'...",
+                          "  ...'aaaaaaaaaaybbbbbbbbb'..."],
+                         self.describe('a' * 50 + 'x' + 'b' * 49,
+                                       'a' * 50 + 'y' + 'b' * 49))
+
+    def test_texts_get_a_unified_diff_of_the_lines_that_differ(self):
+        expected = '\n'.join('line {0}'.format(n) for n in range(1000))
+        actual = expected.replace('line 500', 'line five hundred')
+        self.assertEqual(['lines differ from line 500:',
+                          '--- expected', '+++ actual',
+                          '@@ -500,3 +500,3 @@',
+                          ' line 499', '-line 500', '+line five hundred',
+                          ' line 501'],
+                         self.describe(actual, expected))
+
+    def test_descriptions_are_cut_to_the_line_limit(self):
+        # differing keys are described in the order of the expected ones
+        actual = OrderedDict(('k{0}'.format(n), n) for n in range(10))
+        expected = OrderedDict(('k{0}'.format(n), -n - 1) for n in range(10))
+        lines = describe_difference(actual, expected,
+                                    DiffLimits(items=10, lines=3))
+        self.assertEqual(["['k0']: 0 != -1", "['k1']: 1 != -2",
+                          "['k2']: 2 != -3", '...'], lines)
+
+
+class TestShouldFailureMessages(TestCase):
+    def test_failed_equality_describes_the_difference(self):
+        with self.assertRaises(AssertionError) as e:
+            this([1, 2, 3]).should.equal([1, 5, 3])
+        self.assertEqual("Expected '[1, 2, 3]' to equal '[1, 5, 3]'.\n"
+                         "[1]: 2 != 5", str(e.exception))
+
+    def test_large_values_are_bounded(self):
+        with self.assertRaises(AssertionError) as e:
+            this(list(range(10 ** 5))).should.contain(-1)
+        self.assertEqual("Expected '[0, 1, 2, 3, 4, 5, 6, 7, 8, 9, ...]' to "
+                         "contain '-1'.", str(e.exception))
+
+    def test_limits_can_be_changed(self):
+        limits = this.limits
+        this.limits = DiffLimits(items=2)
+        try:
+            with self.assertRaises(AssertionError) as e:
+                this(5).should.be_in([1, 2, 3])
+        finally:
+            this.limits = limits
+        self.assertEqual("Expected '5' to be in '[1, 2, ...]'.",
+                         str(e.exception))
+
+    def test_passing_assertions_describe_nothing(self):
+        class Unshowable(object):
+            def __repr__(self):
+                raise AssertionError('shown')
+            __str__ = __repr__
+        value = Unshowable()
+        this([value]).should.equal([value])
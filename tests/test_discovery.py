@@ -0,0 +1,98 @@
+import os
+import time
+import shutil
+import tempfile
+from unittest import TestCase
+
+from pyspecs._discovery import SpecFinder
+
+
+class TestSpecFinder(TestCase):
+    def setUp(self):
+        self.working = tempfile.mkdtemp()
+        for path in ('a.pyspecs', 'notes.txt', 'pkg/b.pyspecs',
+                     'pkg/deep/c.pyspecs', 'node_modules/d.pyspecs',
+                     '.git/e.pyspecs', 'generated/f.pyspecs',
+                     'pkg/fixtures/g.pyspecs', 'fixtures.pyspecs'):
+            self.create(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.working)
+
+    def create(self, path, content=''):
+        path = os.path.join(self.working, path)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as stream:
+            stream.write(content)
+        return path
+
+    def find(self, finder=None, roots=None):
+        finder = finder or SpecFinder(cached=False)
+        return [os.path.relpath(path, self.working)
+                for path in finder.find(roots or [self.working])]
+
+    def touch_directory(self, path):
+        # mtimes may not have moved within the same tick
+        later = time.time() + 10
+        os.utime(os.path.join(self.working, path), (later, later))
+
+    def test_finds_specs_outside_ignored_directories(self):
+        self.assertEqual(
+            ['a.pyspecs', 'fixtures.pyspecs', 'generated/f.pyspecs',
+             'pkg/b.pyspecs', 'pkg/deep/c.pyspecs', 'pkg/fixtures/g.pyspecs'],
+            self.find())
+
+    def test_honors_ignore_globs(self):
+        finder = SpecFinder(ignore=('generated', 'deep'), cached=False)
+
+        self.assertEqual(
+            ['a.pyspecs', 'fixtures.pyspecs', 'node_modules/d.pyspecs',
+             'pkg/b.pyspecs', 'pkg/fixtures/g.pyspecs'],
+            [path for path in self.find(finder) if '.git' not in path])
+
+    def test_honors_ignore_files(self):
+        self.create('.pyspecsignore', '# comment\ngenerated\nfixtures/\n')
+        self.create('pkg/.gitignore', '/deep/c.pyspecs\n')
+
+        self.assertEqual(['a.pyspecs', 'fixtures.pyspecs', 'pkg/b.pyspecs'],
+                         self.find())
+
+    def test_searches_several_roots(self):
+        roots = [os.path.join(self.working, 'pkg', 'deep'),
+                 os.path.join(self.working, 'generated')]
+
+        self.assertEqual(['pkg/deep/c.pyspecs', 'generated/f.pyspecs'],
+                         self.find(roots=roots))
+
+    def test_index_only_lists_changed_directories(self):
+        SpecFinder.RACY, racy = 0, SpecFinder.RACY
+        try:
+            self.find(SpecFinder())
+            # storing the first index added __pycache__ to the root
+            self.find(SpecFinder())
+            self.create('pkg/new.pyspecs')
+            self.touch_directory('pkg')
+            finder = SpecFinder()
+
+            found = self.find(finder)
+        finally:
+            SpecFinder.RACY = racy
+
+        self.assertTrue('pkg/new.pyspecs' in found)
+        self.assertEqual(1, finder.listed)
+        self.assertEqual(4, finder.reused)
+
+    def test_index_notices_edited_ignore_files(self):
+        SpecFinder.RACY, racy = 0, SpecFinder.RACY
+        try:
+            self.create('pkg/.pyspecsignore', 'nothing\n')
+            self.touch_directory('pkg')
+            self.find(SpecFinder())
+            self.create('pkg/.pyspecsignore', 'b.pyspecs\n')
+
+            found = self.find(SpecFinder())
+        finally:
+            SpecFinder.RACY = racy
+
+        self.assertFalse('pkg/b.pyspecs' in found)
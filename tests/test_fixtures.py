@@ -0,0 +1,151 @@
+import threading
+from unittest import TestCase
+
+from mock import patch
+
+from pyspecs import framework
+from pyspecs._fixtures import Fixtures, fixture
+
+
+class TestFixtures(TestCase):
+    def setUp(self):
+        self.session = Fixtures()
+        self.events = []
+
+    def tearDown(self):
+        self.session.clear()
+
+    def declare(self, maxsize=None, weight=None):
+        events = self.events
+
+        def resource(name, size=1):
+            events.append(('set up', name))
+            yield name * size
+            events.append(('tear down', name))
+        return self.session.declare(resource, maxsize, weight)
+
+    def test_values_are_set_up_once_per_arguments(self):
+        resource = self.declare()
+
+        self.assertEqual('aa', resource('a', size=2))
+        self.assertEqual('aa', resource('a', size=2))
+        self.assertEqual('b', resource('b'))
+
+        self.assertEqual([('set up', 'a'), ('set up', 'b')], self.events)
+        self.assertEqual((2, 1), self.session.totals.stats()[:2])
+
+    def test_declaring_again_reuses_the_values(self):
+        self.declare()('a')
+        self.declare()('a')
+
+        self.assertEqual([('set up', 'a')], self.events)
+
+    def test_values_are_torn_down_when_cleared(self):
+        resource = self.declare()
+        resource('a')
+        resource('b')
+
+        self.session.clear()
+
+        self.assertEqual(0, len(self.session))
+        self.assertEqual([('tear down', 'b'), ('tear down', 'a')],
+                         self.events[2:])
+
+    def test_plain_functions_need_no_teardown(self):
+        resource = self.session.declare(lambda: object())
+        self.assertIs(resource(), resource())
+
+    def test_least_recently_used_values_beyond_maxsize_are_evicted(self):
+        resource = self.declare(maxsize=2)
+        resource('a')
+        resource('b')
+        resource('a')
+        resource('c')
+
+        self.assertIn(('tear down', 'b'), self.events)
+        self.assertNotIn(('tear down', 'a'), self.events)
+        self.assertEqual(2, len(self.session))
+
+    def test_values_beyond_the_capacity_are_evicted(self):
+        self.session.capacity = 5
+        resource = self.declare(weight=len)
+        resource('a', size=3)
+        resource('b', size=3)
+
+        self.assertEqual([('set up', 'a'), ('set up', 'b'),
+                          ('tear down', 'a')], self.events)
+
+    def test_changed_source_drops_the_old_values(self):
+        resource = self.declare()
+        resource('a')
+
+        with patch('pyspecs._fixtures._fingerprint', return_value='new'):
+            changed = self.declare()
+        changed('a')
+
+        self.assertEqual([('set up', 'a'), ('tear down', 'a'),
+                          ('set up', 'a')], self.events)
+
+    def test_setup_time_is_counted_as_saved_when_reused(self):
+        resource = self.declare()
+        with patch('pyspecs._fixtures.time.time', side_effect=[0, 2]):
+            resource('a')
+        resource('a')
+        resource('a')
+
+        self.assertEqual((1, 2, 2, 4), self.session.totals.stats())
+
+    def test_failed_setups_are_not_kept(self):
+        calls = []
+
+        def failing():
+            calls.append(1)
+            raise IOError()
+        resource = self.session.declare(failing)
+        for _ in range(2):
+            with self.assertRaises(IOError):
+                resource()
+        self.assertEqual(2, len(calls))
+
+
+    def test_unhashable_arguments_are_reported_with_the_fixture(self):
+        resource = self.declare()
+
+        with self.assertRaises(TypeError) as e:
+            resource(['a'])
+        self.assertIn('resource', str(e.exception))
+        self.assertIn('unhashable', str(e.exception))
+
+    def test_other_values_are_set_up_while_one_is(self):
+        released = threading.Event()
+        setups = []
+        waits = []
+
+        def resource(name):
+            setups.append(name)
+            if name == 'slow':
+                # waits for the setup of 'fast' in the other thread
+                waits.append(released.wait(5))
+            else:
+                released.set()
+            return name
+        resource = self.session.declare(resource)
+        threads = [threading.Thread(target=resource, args=(name,))
+                   for name in ('slow', 'slow', 'fast')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(['fast', 'slow'], sorted(setups))
+        self.assertEqual([True], waits)
+        self.assertEqual(2, len(self.session))
+
+
+class TestFixtureDecorator(TestCase):
+    def test_is_part_of_the_framework(self):
+        self.assertIs(fixture, framework.framework()['fixture'])
+
+    def test_takes_options(self):
+        declared = fixture(maxsize=3)(lambda: None)
+        self.assertEqual(3, declared.maxsize)
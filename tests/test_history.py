@@ -0,0 +1,116 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import TestCase
+from mock import Mock
+
+from pyspecs._history import TimingHistory
+from pyspecs._reporting import StringIO
+
+
+class TestTimingHistory(TestCase):
+    def setUp(self):
+        self.working = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.working)
+
+    def step(self, name, duration, parent=None, kind='success'):
+        step = Mock(filename=os.path.join(self.working, 'spec.pyspecs'),
+                    duration=duration, self_duration=duration,
+                    hierarchy=(parent.hierarchy if parent else []) + [name])
+        step.parent = parent
+        step.result.kind = kind
+        return step
+
+    def record(self, duration, compare=False, kind='success',
+               name='then it is timed'):
+        history = TimingHistory(self.working, compare=compare,
+                                out=StringIO())
+        scenario = self.step('given a scenario', 0, kind=kind)
+        history.step_exited(self.step(name, duration, scenario, kind))
+        scenario.duration = duration
+        history.step_exited(scenario)
+        history.render(None)
+        return history
+
+    def test_saves_steps_and_files_of_every_run(self):
+        self.record(.1)
+        self.record(.2)
+
+        connection = sqlite3.connect(
+            os.path.join(self.working, TimingHistory.FILENAME))
+        self.assertEqual(2, connection.execute(
+            'SELECT COUNT(*) FROM runs').fetchone()[0])
+        self.assertEqual(
+            [('spec.pyspecs', 'given a scenario / then it is timed', .2)],
+            connection.execute(
+                'SELECT file, path, duration FROM steps WHERE run = 2 '
+                'AND path LIKE "%timed"').fetchall())
+        self.assertEqual([('spec.pyspecs', .2, 'success')], connection.execute(
+            'SELECT file, duration, result FROM files WHERE run = 2'
+        ).fetchall())
+        connection.close()
+
+    def test_flags_durations_far_above_their_history(self):
+        for duration in (.10, .11, .09, .10, .11, .09):
+            self.record(duration)
+
+        history = self.record(.5, compare=True)
+
+        self.assertEqual(
+            ['given a scenario / then it is timed', 'spec.pyspecs'],
+            [entry[0] for entry in history.regressions])
+        self.assertTrue('2 timing regressions' in history.out.getvalue())
+
+    def test_needs_enough_history_to_compare(self):
+        for duration in (.10, .11, .09):
+            self.record(duration)
+
+        self.assertEqual([], self.record(.5, compare=True).regressions)
+
+    def test_ignores_usual_durations_and_failing_steps(self):
+        for duration in (.10, .11, .09, .10, .11, .09):
+            self.record(duration)
+
+        self.assertEqual([], self.record(.11, compare=True).regressions)
+        self.assertEqual(
+            [], self.record(5, compare=True, kind='failure').regressions)
+
+    def test_compares_with_the_last_passing_runs_of_each_step(self):
+        for duration in (.10, .11, .09, .10, .11, .09):
+            self.record(duration)
+        for _ in range(TimingHistory.WINDOW):
+            self.record(.1, name='then something else runs')
+
+        history = self.record(.5, compare=True)
+
+        self.assertEqual(
+            set(['given a scenario / then it is timed', 'spec.pyspecs']),
+            set(entry[0] for entry in history.regressions))
+
+    def test_keeps_only_the_last_runs(self):
+        self.addCleanup(setattr, TimingHistory, 'RETAIN',
+                        TimingHistory.RETAIN)
+        TimingHistory.RETAIN = 3
+        for duration in (.1, .2, .3, .4, .5):
+            self.record(duration)
+
+        connection = sqlite3.connect(
+            os.path.join(self.working, TimingHistory.FILENAME))
+        self.assertEqual([(3,), (4,), (5,)], connection.execute(
+            'SELECT id FROM runs ORDER BY id').fetchall())
+        self.assertEqual([(.3,), (.4,), (.5,)], connection.execute(
+            'SELECT duration FROM files ORDER BY run').fetchall())
+        self.assertEqual(6, connection.execute(
+            'SELECT COUNT(*) FROM steps').fetchone()[0])
+        connection.close()
+
+    def test_knows_the_last_duration_of_every_file(self):
+        self.assertEqual({}, TimingHistory(self.working).file_durations())
+        self.record(.1)
+        self.record(.2)
+
+        self.assertEqual({'spec.pyspecs': .2},
+                         TimingHistory(self.working).file_durations())
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from mock import Mock
+
+from pyspecs._lastfailed import LastFailed
+
+
+class TestLastFailed(TestCase):
+    def setUp(self):
+        self.working = tempfile.mkdtemp()
+        for name in ('a.pyspecs', 'b.pyspecs', 'c.pyspecs'):
+            open(os.path.join(self.working, name), 'w').close()
+
+    def tearDown(self):
+        shutil.rmtree(self.working)
+
+    def scenario(self, filename, name, success=False):
+        step = Mock(filename=os.path.join(self.working, filename))
+        step.parent = None
+        step.result.is_success = success
+        step.result.is_abort = False
+        step.__str__ = Mock(return_value=name)
+        return step
+
+    def run_files(self, executed, *scenarios, **options):
+        failures = LastFailed(self.working)
+        for scenario in scenarios:
+            failures.step_exited(scenario)
+        failures.render(Mock(executed=[
+            os.path.join(self.working, name) for name in executed],
+            selector=options.get('selector')))
+        return LastFailed(self.working)
+
+    def test_remembers_failed_scenarios_by_file(self):
+        failures = self.run_files(
+            ['a.pyspecs', 'b.pyspecs'],
+            self.scenario('a.pyspecs', 'given one'),
+            self.scenario('a.pyspecs', 'given two', success=True),
+            self.scenario('b.pyspecs', 'given three'))
+
+        self.assertEqual({'a.pyspecs': ['given one'],
+                          'b.pyspecs': ['given three']}, failures.failed)
+        self.assertEqual(
+            [os.path.join(self.working, 'a.pyspecs'),
+             os.path.join(self.working, 'b.pyspecs')], failures.paths())
+
+    def test_files_that_did_not_run_keep_their_failures(self):
+        self.run_files(['a.pyspecs', 'b.pyspecs'],
+                       self.scenario('a.pyspecs', 'given one'),
+                       self.scenario('b.pyspecs', 'given three'))
+        os.remove(os.path.join(self.working, 'b.pyspecs'))
+
+        failures = self.run_files(
+            ['c.pyspecs'], self.scenario('c.pyspecs', 'given four'))
+
+        self.assertEqual({'a.pyspecs': ['given one'],
+                          'c.pyspecs': ['given four']}, failures.failed)
+
+    def test_files_that_ran_again_forget_fixed_failures(self):
+        self.run_files(['a.pyspecs'], self.scenario('a.pyspecs', 'given one'))
+
+        self.assertEqual({}, self.run_files(['a.pyspecs']).failed)
+
+    def test_deselected_scenarios_keep_their_failures(self):
+        self.run_files(['a.pyspecs'], self.scenario('a.pyspecs', 'given one'),
+                       self.scenario('a.pyspecs', 'given two'))
+
+        failures = self.run_files(
+            ['a.pyspecs'], self.scenario('a.pyspecs', 'given two', True),
+            selector=Mock())
+
+        self.assertEqual({'a.pyspecs': ['given one']}, failures.failed)
+        self.assertEqual({os.path.join(self.working, 'a.pyspecs'):
+                          ['given one']}, failures.scenarios())
@@ -0,0 +1,51 @@
+import time
+from unittest import TestCase, skipIf
+
+from pyspecs._performance import Timings, tracemalloc
+from pyspecs._should import _Should as this
+
+
+class TestTimings(TestCase):
+    def test_drops_outliers_beyond_the_fences(self):
+        timings = Timings([.010, .011, .012, .011, .010, .5, .012, .0001])
+
+        self.assertEqual(2, timings.outliers)
+        self.assertEqual([.010, .010, .011, .011, .012, .012],
+                         timings.samples)
+
+    def test_interpolates_percentiles(self):
+        timings = Timings([1, 2, 3, 4, 5])
+
+        self.assertEqual(3, timings.percentile(50))
+        self.assertAlmostEqual(4.6, timings.percentile(90))
+        self.assertEqual(5, timings.percentile(100))
+
+
+class TestPerformanceExpectations(TestCase):
+    def test_passes_calls_completing_within_the_budget(self):
+        this(lambda: None).should.complete_within(10, repeat=5)
+        this(lambda: time.sleep(.002)).should_not.complete_within(
+            1, repeat=5, warmup=0)
+
+    def test_puts_the_distribution_in_the_failure(self):
+        def sleep():
+            time.sleep(.002)
+
+        with self.assertRaises(AssertionError) as e:
+            this(sleep).should.complete_within(1, repeat=5, percentile=50)
+
+        message = str(e.exception)
+        self.assertTrue(message.startswith(
+            "Expected 'sleep' to complete within 1ms (50th percentile), but "
+            "took "), message)
+        self.assertIn('5 samples', message)
+        self.assertIn('median', message)
+
+    @skipIf(tracemalloc is None, 'needs tracemalloc')
+    def test_traces_the_allocations_of_calls(self):
+        this(lambda: bytearray(1000)).should.allocate_less_than(10000)
+
+        with self.assertRaises(AssertionError) as e:
+            this(lambda: bytearray(100000)).should.allocate_less_than(10000)
+        self.assertIn('to allocate less than 10000 bytes', str(e.exception))
+        self.assertFalse(tracemalloc.is_tracing())
@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from pyspecs._profiling import ScenarioProfiler
+from pyspecs._registry import Registry
+from pyspecs._step import Step
+
+
+def busy_function():
+    return sum(range(1000))
+
+
+class TestScenarioProfiler(TestCase):
+    def setUp(self):
+        self.working = tempfile.mkdtemp()
+        self.profiler = ScenarioProfiler(self.working)
+        self.profiler.clear()
+        self.registry = Registry().reset().subscribe(self.profiler)
+
+    def tearDown(self):
+        shutil.rmtree(self.working)
+        Registry().reset()
+
+    def test_writes_one_profile_per_scenario(self):
+        for name in ('first', 'second'):
+            with Step('given', name, self.registry):
+                with Step('then', 'nested', self.registry):
+                    busy_function()
+
+        self.assertEqual(2, len(os.listdir(self.profiler.scenarios)))
+
+    def test_merges_the_run_and_summarizes_top_functions(self):
+        with Step('given', 'a busy scenario', self.registry):
+            busy_function()
+
+        stats = self.profiler.merge()
+
+        self.assertTrue(os.path.exists(
+            os.path.join(self.working, ScenarioProfiler.MERGED)))
+        self.assertIn('busy_function',
+                      [name for file, line, name in stats.stats])
+        self.assertIn('busy_function', self.profiler.summary())
+
+    def test_clear_removes_profiles_of_previous_runs_only(self):
+        unrelated = os.path.join(self.working, 'mine.pstats')
+        open(unrelated, 'w').close()
+        with Step('given', 'a scenario', self.registry):
+            pass
+        self.profiler.merge()
+
+        self.profiler.clear()
+
+        self.assertEqual([], os.listdir(self.profiler.scenarios))
+        self.assertEqual(sorted(['mine.pstats', ScenarioProfiler.SCENARIOS]),
+                         sorted(os.listdir(self.working)))
@@ -1,6 +1,7 @@
+import threading
 from unittest import TestCase
 from mock import Mock
-from pyspecs._registry import Registry
+from pyspecs._registry import Registry, StopRun
 
 
 class RegistryTests(TestCase):
@@ -55,3 +56,82 @@ class RegistryTests(TestCase):
         registry.push(step2)
 
         self.assertEquals([step1, step2], registry.root_steps)
+
+    def test_publishes_events_to_subscribers(self):
+        listener = Mock()
+        registry = Registry().reset().subscribe(listener)
+        step = Mock()
+
+        registry.publish('step_exited', step)
+
+        listener.step_exited.assert_called_once_with(step)
+
+    def test_reset_drops_subscribers(self):
+        Registry().reset().subscribe(Mock())
+
+        self.assertEqual([], Registry().reset().listeners)
+
+    def test_reset_closes_the_previous_capture(self):
+        capture = Registry().reset().capture
+
+        Registry().reset()
+
+        self.assertRaises(ValueError, capture.write, 'late output')
+
+    def test_reset_can_leave_the_previous_capture_open(self):
+        capture = Registry().reset().capture
+
+        Registry().reset(close=False)
+
+        capture.write('still read by an enclosing context')
+        capture.close()
+
+    def test_does_not_retain_root_steps_when_asked_not_to(self):
+        registry = Registry().reset(retain=False)
+
+        registry.push(Mock())
+
+        self.assertEqual([], registry.root_steps)
+        self.assertEqual(1, registry.total_steps)
+
+    def test_replays_finished_steps_depth_first(self):
+        listener = Mock()
+        registry = Registry().reset().subscribe(listener)
+        child = Mock(steps=[])
+        root = Mock(steps=[child])
+        root.parent = None
+
+        registry.replay(root)
+
+        self.assertEqual([root], registry.root_steps)
+        self.assertEqual(2, registry.total_steps)
+        self.assertEqual(
+            [('step_entered', root), ('step_entered', child),
+             ('step_exited', child), ('step_exited', root)],
+            [(name, args[0]) for name, args, kwargs in listener.mock_calls])
+
+    def test_each_thread_records_into_its_own_state(self):
+        registry = Registry().reset()
+        registry.push(Mock())
+        seen = []
+
+        def record():
+            Registry().reset().push(Mock())
+            seen.append(Registry().total_steps)
+
+        thread = threading.Thread(target=record)
+        thread.start()
+        thread.join()
+
+        self.assertEqual([1], seen)
+        self.assertEqual(1, registry.total_steps)
+        self.assertEqual(1, len(registry.root_steps))
+
+    def test_stopped_registry_refuses_new_steps_until_resumed(self):
+        registry = Registry().reset()
+        registry.stop()
+
+        self.assertRaises(StopRun, registry.push, Mock())
+        registry.resume()
+        registry.push(Mock())
+        self.assertEqual(1, registry.total_steps)
@@ -0,0 +1,145 @@
+from unittest import TestCase
+
+from mock import Mock
+
+from pyspecs import the
+from pyspecs._registry import Registry
+from pyspecs._reporting import ConsoleReporter, DurationsReporter
+from pyspecs._step import Step
+
+if str is bytes:
+    from StringIO import StringIO
+else:
+    from io import StringIO
+
+
+class TestStreamingConsoleReporter(TestCase):
+    def setUp(self):
+        self.out = StringIO()
+        self.reporter = ConsoleReporter(out=self.out)
+        self.registry = Registry().reset(retain=False)
+        self.registry.subscribe(self.reporter)
+        self.runner = Mock()
+        self.runner.cache.enabled = False
+        self.runner.profiler = None
+
+    def tearDown(self):
+        Registry().reset()
+
+    def test_successful_scenario_is_printed_as_soon_as_it_finishes(self):
+        with Step('given', 'a passing scenario', self.registry):
+            with Step('then', 'it passes', self.registry):
+                pass
+
+        self.assertIn('given a passing scenario', self.out.getvalue())
+        self.assertIn('then it passes', self.out.getvalue())
+
+    def test_failed_scenarios_are_held_back_for_the_failure_section(self):
+        with Step('given', 'a failing scenario', self.registry):
+            with Step('then', 'it fails', self.registry):
+                assert False, 'reason'
+        self.assertEqual('', self.out.getvalue())
+
+        self.reporter.render(self.runner)
+
+        report = self.out.getvalue()
+        self.assertIn('FAILURES', report)
+        self.assertIn('MESSAGE: reason', report)
+        self.assertIn('2 steps, 1 scenarios', report)
+
+    def test_finished_scenarios_are_not_kept_by_the_registry(self):
+        with Step('given', 'a passing scenario', self.registry):
+            pass
+
+        self.assertEqual([], self.registry.root_steps)
+
+    def test_summary_counts_each_steps_own_outcome(self):
+        with Step('given', 'a scenario', self.registry):
+            with Step('then', 'it passes', self.registry):
+                pass
+            with Step('then', 'it fails', self.registry):
+                raise AssertionError()
+            with Step('then', 'it errors', self.registry):
+                raise KeyError()
+
+        self.reporter.render(self.runner)
+
+        self.assertIn('2 passed, 1 failed, 1 errors', self.out.getvalue())
+
+    def test_failures_of_the_same_cause_are_printed_once(self):
+        def connect(port):
+            raise IOError('connection to port {0} refused'.format(port))
+        for number in range(3):
+            with Step('given', 'scenario {0}'.format(number), self.registry):
+                with Step('then', 'it connects', self.registry):
+                    connect(8000 + number)
+        with Step('given', 'another scenario', self.registry):
+            assert False, 'another reason'
+
+        self.reporter.render(self.runner)
+
+        report = self.out.getvalue()
+        self.assertEqual(1, report.count('MESSAGE: connection to port'))
+        self.assertIn('MESSAGE: connection to port 8000 refused', report)
+        self.assertIn('STEPS:   given scenario 0 / then it connects\n'
+                      'E |          given scenario 1 / then it connects\n'
+                      'E |          given scenario 2 / then it connects\n',
+                      report)
+        self.assertIn('STEPS:   given another scenario\n', report)
+        self.assertIn('MESSAGE: another reason', report)
+
+    def test_assertions_are_grouped_by_their_values_and_spec_line(self):
+        for number in (1, 1, 0):
+            with Step('given', 'scenario {0}'.format(number), self.registry):
+                the(number).should.equal(5)
+        with Step('given', 'another scenario', self.registry):
+            the(1).should.equal(5)
+
+        self.reporter.render(self.runner)
+
+        report = self.out.getvalue()
+        self.assertEqual(3, report.count('MESSAGE:'))
+        self.assertIn('STEPS:   given scenario 1\n'
+                      'F |          given scenario 1\n', report)
+
+    def test_tracebacks_are_cut_to_their_innermost_entries(self):
+        self.reporter.trace_depth = 1
+
+        def fail():
+            raise KeyError('key')
+        with Step('given', 'a failing scenario', self.registry):
+            fail()
+
+        self.reporter.render(self.runner)
+
+        report = self.out.getvalue()
+        self.assertEqual(1, report.count('TRACE>File'))
+        self.assertIn('in fail', report)
+
+
+class TestDurationsReporter(TestCase):
+    def setUp(self):
+        self.out = StringIO()
+        self.reporter = DurationsReporter(1, out=self.out)
+        self.registry = Registry().reset(retain=False)
+        self.registry.subscribe(self.reporter)
+
+    def tearDown(self):
+        Registry().reset()
+
+    def test_lists_only_the_slowest_scenario_and_step(self):
+        ticks = iter([0, 10, 1990, 2000, 3000, 3010])
+        timer = lambda: next(ticks)
+        with Step('given', 'a slow scenario', self.registry, timer):
+            with Step('then', 'a slow step', self.registry, timer):
+                pass
+        with Step('given', 'a quick scenario', self.registry, timer):
+            pass
+
+        self.reporter.render(Mock())
+
+        report = self.out.getvalue()
+        self.assertIn('given a slow scenario', report)
+        self.assertIn('then a slow step', report)
+        self.assertNotIn('given a quick scenario', report)
+        self.assertIn('test_reporting.py:', report)
@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from pyspecs._registry import Registry
+from pyspecs._runner import _StepRunner
+
+
+SPEC = '''
+with given.a_spec_in_file_{0}:
+    with then.it_passes:
+        pass
+    with then.it_fails:
+        the({0}).should.equal(-1)
+'''
+
+
+class TestParallelRunner(TestCase):
+    def setUp(self):
+        self.working = tempfile.mkdtemp()
+        for number in range(4):
+            path = os.path.join(self.working, 'spec%d.pyspecs' % number)
+            with open(path, 'w') as fd:
+                fd.write(SPEC.format(number))
+        Registry().reset()
+
+    def tearDown(self):
+        shutil.rmtree(self.working)
+        Registry().reset()
+
+    def test_rejects_fewer_than_one_worker(self):
+        self.assertRaises(ValueError, _StepRunner, 0)
+
+    def test_workers_send_back_the_same_steps_as_a_serial_run(self):
+        serial = _StepRunner(cache=False)
+        serial.load_steps(self.working)
+        expected = [(str(step), step.result.kind)
+                    for step in Registry().root_steps]
+        Registry().reset()
+
+        parallel = _StepRunner(workers=2, cache=False)
+        parallel.load_steps(self.working)
+
+        received = [(str(step), step.result.kind)
+                    for step in Registry().root_steps]
+        self.assertEqual(expected, received)
+        self.assertEqual(12, Registry().total_steps)
+
+    def test_threads_record_the_same_steps_as_a_serial_run(self):
+        serial = _StepRunner(cache=False)
+        serial.load_steps(self.working)
+        expected = [(str(step), step.result.kind)
+                    for step in Registry().root_steps]
+        Registry().reset()
+
+        threaded = _StepRunner(threads=3, cache=False)
+        threaded.load_steps(self.working)
+
+        received = [(str(step), step.result.kind)
+                    for step in Registry().root_steps]
+        self.assertEqual(expected, received)
+        self.assertEqual(12, Registry().total_steps)
+
+    def test_rejects_workers_and_threads_together(self):
+        self.assertRaises(ValueError, _StepRunner, workers=2, threads=2)
+
+    def test_rejects_profiling_with_threads(self):
+        self.assertRaises(ValueError, _StepRunner, threads=2, profile='p')
+        self.assertRaises(ValueError, _StepRunner, concurrency=2,
+                          profile='p')
+
+    def test_runs_only_the_given_files_with_the_first_ones_ahead(self):
+        paths = list(_StepRunner().find_spec_files(self.working))
+
+        runner = _StepRunner(cache=False, only=paths[1:],
+                             first=[paths[3]])
+        runner.load_steps(self.working)
+
+        self.assertEqual([paths[3], paths[1], paths[2]], runner.executed)
+
+    def test_maxfail_stops_the_run(self):
+        runner = _StepRunner(cache=False, maxfail=2)
+        runner.load_steps(self.working)
+
+        self.assertTrue(runner.stopped)
+        self.assertEqual(2, len(Registry().root_steps))
+        self.assertEqual(2, len(runner.unfinished))
+        self.assertFalse(Registry().stopped)
+
+    def test_maxfail_cancels_the_outstanding_pool_work(self):
+        for options in (dict(workers=2), dict(threads=2)):
+            Registry().reset()
+            runner = _StepRunner(cache=False, maxfail=1, **options)
+            runner.load_steps(self.working)
+
+            self.assertTrue(runner.stopped)
+            self.assertEqual(1, len(runner.executed))
+            self.assertEqual(1, len(Registry().root_steps))
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from pyspecs._registry import Registry
+from pyspecs._runner import _StepRunner
+from pyspecs._selection import Selector
+
+
+SPEC = '''
+ran = []
+with given.two_operands:
+    ran.append('given')
+    with when.supplied_to_add:
+        ran.append('add')
+        with then.the_sum_is_returned:
+            ran.append('sum')
+    with when.supplied_to_subtract:
+        ran.append('subtract')
+        the(ran).should.be_empty
+with given.no_operands:
+    ran.append('none')
+'''
+
+
+class TestSelector(TestCase):
+    def test_matches_segments_as_substrings_from_the_scenario_down(self):
+        selector = Selector(['two operands / supplied_to add'])
+
+        self.assertTrue(selector.selects(['given two operands']))
+        self.assertTrue(selector.selects(['given two operands',
+                                          'when supplied to add',
+                                          'then the sum is returned']))
+        self.assertFalse(selector.selects(['given two operands',
+                                           'when supplied to subtract']))
+        self.assertFalse(selector.selects(['given no operands']))
+
+    def test_matches_segments_with_wildcards_as_globs(self):
+        selector = Selector(['given * operands', 'GIVEN NO*'])
+
+        self.assertTrue(selector.selects(['given two operands']))
+        self.assertTrue(selector.selects(['given no operands']))
+        self.assertFalse(selector.selects(['when two operands']))
+
+    def test_selects_scenarios_by_their_exact_names(self):
+        scenarios = {'spec.pyspecs': ['given two operands']}
+        selector = Selector([], scenarios)
+
+        self.assertTrue(selector.selects(['given two operands',
+                                          'when supplied to add'],
+                                         'spec.pyspecs'))
+        self.assertFalse(selector.selects(['given two operands too'],
+                                          'spec.pyspecs'))
+        self.assertFalse(selector.selects(['given two operands'],
+                                          'other.pyspecs'))
+        self.assertFalse(Selector(['add'], scenarios).selects(
+            ['given two operands', 'when supplied to subtract'],
+            'spec.pyspecs'))
+
+
+class TestSelectedRun(TestCase):
+    def setUp(self):
+        self.working = tempfile.mkdtemp()
+        self.path = os.path.join(self.working, 'spec.pyspecs')
+        with open(self.path, 'w') as fd:
+            fd.write(SPEC)
+        Registry().reset()
+
+    def tearDown(self):
+        shutil.rmtree(self.working)
+        Registry().reset()
+
+    def run_selected(self, **options):
+        runner = _StepRunner(select=['two operands / add'], **options)
+        runner.load_steps(self.working)
+        return runner
+
+    def test_skips_the_bodies_of_steps_not_selected(self):
+        runner = self.run_selected(cache=False)
+
+        results = [(str(step), step.result.kind)
+                   for step in Registry().root_steps]
+        self.assertEqual([('given two operands', 'success')], results)
+        self.assertEqual(2, runner.deselected)
+        self.assertEqual(3, Registry().total_steps)
+
+    def test_deselects_the_same_steps_when_cached_or_in_workers(self):
+        self.run_selected()
+        Registry().reset()
+        cached = self.run_selected()
+        self.assertEqual(2, cached.deselected)
+        Registry().reset()
+
+        parallel = self.run_selected(workers=2, cache=False)
+
+        self.assertEqual(2, parallel.deselected)
+        self.assertEqual(['given two operands'],
+                         [str(step) for step in Registry().root_steps])
+
+    def test_runs_only_the_named_scenarios(self):
+        runner = _StepRunner(scenarios={self.path: ['given no operands']},
+                             cache=False)
+        runner.load_steps(self.working)
+
+        self.assertEqual(['given no operands'],
+                         [str(step) for step in Registry().root_steps])
+        self.assertEqual(1, runner.deselected)
@@ -0,0 +1,49 @@
+import os
+from unittest import TestCase
+
+from pyspecs._sharding import Sharder
+
+
+NAMES = ['spec%d.pyspecs' % number for number in range(20)]
+
+
+class TestSharder(TestCase):
+    def test_parses_k_of_n(self):
+        sharder = Sharder.parse('2/3')
+
+        self.assertEqual((2, 3), (sharder.index, sharder.count))
+
+    def test_rejects_malformed_or_out_of_range_shards(self):
+        self.assertRaises(ValueError, Sharder.parse, 'two')
+        self.assertRaises(ValueError, Sharder.parse, '0/3')
+        self.assertRaises(ValueError, Sharder.parse, '4/3')
+
+    def test_without_history_every_file_lands_in_exactly_one_shard(self):
+        shards = Sharder(1, 3).split(NAMES)
+
+        self.assertEqual(sorted(NAMES), sorted(sum(shards, [])))
+        self.assertEqual(shards, Sharder(2, 3).split(NAMES))
+
+    def test_history_balances_expected_time(self):
+        history = {'slow': 10, 'medium': 6, 'fast': 4, 'tiny': 1}
+        sharder = Sharder(1, 2, history)
+
+        shards = sharder.split(['tiny', 'fast', 'medium', 'slow'])
+
+        self.assertEqual([['slow', 'tiny'], ['medium', 'fast']], shards)
+        self.assertEqual([(2, 11), (2, 10)], sharder.loads)
+
+    def test_unknown_files_are_expected_to_take_the_mean_time(self):
+        sharder = Sharder(1, 2, {'known': 4, 'other': 2})
+
+        sharder.split(['known', 'other', 'new'])
+
+        self.assertEqual([(1, 4), (2, 5)], sharder.loads)
+
+    def test_selects_the_paths_of_its_shard(self):
+        paths = [os.path.join('/specs', name) for name in NAMES]
+
+        selected = [Sharder(k, 3).select('/specs', paths) for k in (1, 2, 3)]
+
+        self.assertEqual(sorted(paths), sorted(sum(selected, [])))
+
@@ -1,6 +1,11 @@
+import sys
+import pickle
+import threading
 from unittest import TestCase, skip
 from mock import Mock, MagicMock
 
+from pyspecs._context import _ContextStdout
+from pyspecs._registry import Registry
 from pyspecs._step import Step
 
 
@@ -68,3 +73,118 @@ class TestExitScope(TestCase):
                 raise KeyboardInterrupt()
 
         self.assertTrue(self.step.result.is_abort)
+
+
+class TestDetachedStep(TestCase):
+    def setUp(self):
+        self.registry = Registry().reset()
+        self.step = Step('kind', 'name', self.registry)
+
+    def tearDown(self):
+        Registry().reset()
+
+    def test_pickled_step_keeps_result_output_and_trace(self):
+        with self.step:
+            print('captured')
+            raise ZeroDivisionError('Fake zero division')
+
+        copy = pickle.loads(pickle.dumps(self.step))
+
+        self.assertTrue(copy.result.is_error)
+        self.assertEqual('ZeroDivisionError', copy.result.exc_name)
+        self.assertEqual('Fake zero division', copy.result.message)
+        self.assertEqual(self.step.result.trace, copy.result.trace)
+        self.assertEqual('captured\n', copy.output)
+        self.assertEqual(self.step.duration, copy.duration)
+
+
+class TestTiming(TestCase):
+    def setUp(self):
+        self.registry = Mock()
+        self.registry.push = MagicMock(return_value=None)
+        ticks = iter([0, 1000, 4000, 10000])
+        self.timer = lambda: next(ticks)
+
+    def test_inclusive_and_self_time(self):
+        parent = Step('kind', 'parent', self.registry, timer=self.timer)
+        child = Step('kind', 'child', self.registry, timer=self.timer)
+        with parent:
+            with child:
+                pass
+            parent.add_step(child)
+
+        self.assertEqual(1e-5, parent.duration)
+        self.assertEqual(3e-6, child.duration)
+        self.assertAlmostEqual(7e-6, parent.self_duration)
+
+    def test_records_where_the_step_was_entered(self):
+        step = Step('kind', 'name', self.registry, timer=self.timer)
+        with step:
+            line = sys._getframe().f_lineno - 1
+
+        self.assertEqual(__file__.rstrip('c'), step.filename)
+        self.assertEqual(line, step.line)
+
+
+class TestSharedOutputCapture(TestCase):
+    def setUp(self):
+        self.registry = Registry().reset()
+
+    def tearDown(self):
+        Registry().reset()
+
+    def test_output_is_sliced_from_the_shared_buffer(self):
+        parent = Step('kind', 'parent', self.registry)
+        child = Step('kind', 'child', self.registry)
+        with parent:
+            print('before')
+            with child:
+                print('inside')
+            print('after')
+
+        self.assertEqual('before\ninside\nafter\n', parent.output)
+        self.assertEqual('before\nafter\n', parent.own_output)
+        self.assertEqual('inside\n', child.output)
+        self.assertTrue(sys.stdout is not self.registry.capture)
+
+    def test_chatty_scenario_is_truncated_at_the_limit(self):
+        registry = Registry().reset(capture_limit=10)
+        step = Step('kind', 'chatty', registry)
+        with step:
+            print('x' * 100)
+            print('more')
+
+        self.assertTrue(step.output.startswith('x' * 10 + '\n[...'))
+        self.assertEqual(100 + 1 - 10 + 5, registry.capture.dropped)
+
+    def test_concurrent_steps_capture_their_own_output(self):
+        # threading.Barrier is missing on Python 2
+        arrived = [0]
+        condition = threading.Condition()
+        steps = {}
+
+        def meet(count):
+            with condition:
+                arrived[0] += 1
+                condition.notify_all()
+                while arrived[0] < count:
+                    condition.wait()
+
+        def run(name):
+            registry = Registry().reset()
+            steps[name] = step = Step('kind', name, registry)
+            with step:
+                meet(2)
+                print(name)
+                meet(4)
+
+        threads = [threading.Thread(target=run, args=(name,))
+                   for name in ('first', 'second')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual('first\n', steps['first'].output)
+        self.assertEqual('second\n', steps['second'].output)
+        self.assertFalse(isinstance(sys.stdout, _ContextStdout))
@@ -0,0 +1,70 @@
+import os
+import sys
+import shutil
+import tempfile
+import threading
+from unittest import TestCase, skipUnless
+
+from pyspecs._watcher import InotifyWatcher, PollingWatcher
+
+
+class WatcherContract(object):
+    """
+    Tests every watcher has to pass; test cases mix it in and provide
+    `create_watcher(root)`.
+    """
+    def setUp(self):
+        self.working = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.working, '.git'))
+        os.mkdir(os.path.join(self.working, 'package'))
+        self.write('package', 'module.py')
+        self.write('.git', 'hook.py')
+        self.watcher = self.create_watcher(self.working)
+
+    def tearDown(self):
+        self.watcher.close()
+        shutil.rmtree(self.working)
+
+    def write(self, *parts):
+        path = os.path.join(self.working, *parts)
+        with open(path, 'a') as fd:
+            fd.write('x = 1\n')
+        return path
+
+    def wait_after(self, *changes):
+        timer = threading.Timer(.05, lambda: [self.write(*parts)
+                                              for parts in changes])
+        timer.start()
+        try:
+            return self.watcher.wait()
+        finally:
+            timer.join()
+
+    def test_reports_exactly_the_changed_files(self):
+        changed = self.wait_after(('package', 'module.py'),
+                                  ('package', 'spec.pyspecs'))
+
+        self.assertEqual(set([
+            os.path.join(self.working, 'package', 'module.py'),
+            os.path.join(self.working, 'package', 'spec.pyspecs'),
+        ]), changed)
+
+    def test_ignores_hidden_directories_and_unwatched_files(self):
+        changed = self.wait_after(('.git', 'hook.py'),
+                                  ('package', 'notes.txt'),
+                                  ('package', 'module.py'))
+
+        self.assertEqual(
+            set([os.path.join(self.working, 'package', 'module.py')]),
+            changed)
+
+
+class TestPollingWatcher(WatcherContract, TestCase):
+    def create_watcher(self, root):
+        return PollingWatcher(root, interval=.02, debounce=.1)
+
+
+@skipUnless(sys.platform.startswith('linux'), 'inotify is linux-only')
+class TestInotifyWatcher(WatcherContract, TestCase):
+    def create_watcher(self, root):
+        return InotifyWatcher(root, debounce=.1)
@@ -0,0 +1,74 @@
+import os
+import json
+import shutil
+import tempfile
+from unittest import TestCase
+from xml.dom import minidom
+
+from mock import Mock
+
+from pyspecs._registry import Registry
+from pyspecs._step import Step
+from pyspecs._writers import JsonLinesReporter, JUnitXmlReporter
+
+
+class WriterTest(TestCase):
+    def setUp(self):
+        self.working = tempfile.mkdtemp()
+        self.path = os.path.join(self.working, 'report')
+        self.registry = Registry().reset(retain=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.working)
+        Registry().reset()
+
+    def run_scenario(self, reporter):
+        self.registry.subscribe(reporter)
+        with Step('given', 'a scenario', self.registry):
+            with Step('then', 'it passes', self.registry):
+                print('chatty')
+            with Step('then', 'it fails', self.registry):
+                raise AssertionError('the <reason>')
+            with Step('then', 'it errors', self.registry):
+                raise KeyError('missing')
+        reporter.render(Mock())
+
+
+class TestJsonLinesReporter(WriterTest):
+    def test_writes_one_record_per_finished_step(self):
+        self.run_scenario(JsonLinesReporter(self.path))
+
+        with open(self.path) as fd:
+            records = [json.loads(line) for line in fd]
+
+        self.assertEqual(['then', 'then', 'then', 'given'],
+                         [record['kind'] for record in records])
+        passed, failed, errored, root = records
+        self.assertEqual(['given a scenario', 'then it passes'],
+                         passed['path'])
+        self.assertEqual('chatty\n', passed['output'])
+        self.assertEqual('failure', failed['result'])
+        self.assertEqual('AssertionError', failed['exc_type'])
+        self.assertEqual('the <reason>', failed['message'])
+        self.assertEqual('KeyError', errored['exc_type'])
+        self.assertEqual('child error', root['result'])
+
+
+class TestJUnitXmlReporter(WriterTest):
+    def test_writes_a_test_case_per_step_with_suite_totals(self):
+        self.run_scenario(JUnitXmlReporter(self.path))
+
+        document = minidom.parse(self.path)
+        suite = document.getElementsByTagName('testsuite')[0]
+        cases = document.getElementsByTagName('testcase')
+
+        self.assertEqual('4', suite.getAttribute('tests'))
+        self.assertEqual('1', suite.getAttribute('failures'))
+        self.assertEqual('1', suite.getAttribute('errors'))
+        self.assertEqual(4, len(cases))
+        self.assertEqual('given a scenario', cases[0].getAttribute('classname'))
+        failure = cases[1].getElementsByTagName('failure')[0]
+        self.assertEqual('the <reason>', failure.getAttribute('message'))
+        self.assertEqual(
+            'chatty\n',
+            cases[0].getElementsByTagName('system-out')[0].firstChild.data)